@@ -46,6 +46,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # trigram and full text lookups on postgres
+    'django.contrib.postgres',
     'rentals',
     'django.contrib.humanize',
     'vehicles',
@@ -146,6 +148,9 @@ STATICFILES_DIRS = [BASE_DIR, 'static',]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Finished files from the background report worker
+REPORT_ROOT = os.path.join(BASE_DIR, 'reports')
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
@@ -5,10 +5,35 @@ from .models import Production, Department, Vendor, Rental, Service, VendorCateg
 
 # Register your models here.
 
-admin.site.register(Production)
-admin.site.register(Department)
-admin.site.register(Vendor)
-admin.site.register(Rental)
-admin.site.register(Service)
-admin.site.register(VendorCategory)
 
+# searched by the autocomplete boxes on the rental, service and vehicle forms
+@admin.register(Production)
+class ProductionAdmin(admin.ModelAdmin):
+    search_fields = ['production_company', 'show_name']
+
+
+@admin.register(Department)
+class DepartmentAdmin(admin.ModelAdmin):
+    search_fields = ['department_name']
+
+
+@admin.register(Vendor)
+class VendorAdmin(admin.ModelAdmin):
+    search_fields = ['name', 'services']
+    autocomplete_fields = ['category']
+
+
+@admin.register(VendorCategory)
+class VendorCategoryAdmin(admin.ModelAdmin):
+    search_fields = ['name']
+
+
+# autocomplete boxes instead of a <select> of every vendor, department and production
+@admin.register(Rental)
+class RentalAdmin(admin.ModelAdmin):
+    autocomplete_fields = ['department', 'production', 'vendor']
+
+
+@admin.register(Service)
+class ServiceAdmin(admin.ModelAdmin):
+    autocomplete_fields = ['department', 'production', 'vendor']
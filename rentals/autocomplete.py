@@ -0,0 +1,214 @@
+"""
+Prefix autocomplete for the vendor, department, production and driver fields
+of the rental, service and vehicle forms.
+Each source keeps a sorted in-memory list of every word boundary of every
+label, so "grip" finds "Acme Grip Co" with a binary search instead of a
+LIKE over the table. A source is loaded on first use, then kept up to date
+row by row from the save and delete signals of this process. Saves made by
+another process show up as a new data version (see cache.py) and the source
+is loaded again.
+"""
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.apps import apps
+
+from .cache import data_versions
+
+# suggestions returned per lookup
+LIMIT = 10
+
+# autocomplete sources by name
+SOURCES = {}
+
+# form fields shared by the rental, service and vehicle forms and their sources
+FORM_FIELDS = {'department': 'departments', 'production': 'productions', 'vendor': 'vendors'}
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+class PrefixIndex:
+    """
+    Sorted (text, key) entries for every word boundary of every label.
+    """
+
+    def __init__(self, rows=()):
+        # rows are (key, label)
+        self.labels = {}
+        # rows per label, to tell labels shared by several rows
+        self.counts = Counter()
+        self.entries = []
+        for key, label in rows:
+            self.labels[key] = label
+            self.counts[label] += 1
+            self.entries.extend((suffix, key) for suffix in self.suffixes(label))
+        self.entries.sort()
+
+    @staticmethod
+    def suffixes(label):
+        words = normalize(label).split()
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def add(self, key, label):
+        self.remove(key)
+        self.labels[key] = label
+        self.counts[label] += 1
+        for suffix in self.suffixes(label):
+            insort(self.entries, (suffix, key))
+
+    def remove(self, key):
+        label = self.labels.pop(key, None)
+        if label is None:
+            return
+        self.counts[label] -= 1
+        if not self.counts[label]:
+            del self.counts[label]
+        for suffix in self.suffixes(label):
+            position = bisect_left(self.entries, (suffix, key))
+            if position < len(self.entries) and self.entries[position] == (suffix, key):
+                del self.entries[position]
+
+    def search(self, prefix, limit=LIMIT, distinct=False):
+        """
+        (key, label) of the labels with a word starting with prefix, in
+        alphabetical order of the match. distinct drops repeated labels.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found = {}
+        seen = set()
+        for text, key in self.entries[bisect_left(self.entries, (prefix,)):]:
+            if not text.startswith(prefix) or len(found) >= limit:
+                break
+            label = self.labels[key]
+            if key in found or (distinct and label in seen):
+                continue
+            found[key] = label
+            seen.add(label)
+        return list(found.items())
+
+
+class Source:
+    """
+    One autocomplete source: a model and the columns joined into its label.
+    distinct sources suggest text (a driver name) rather than rows.
+    """
+
+    def __init__(self, name, label, fields, distinct=False):
+        self.name = name
+        self.label = label.lower()
+        self.fields = fields
+        self.distinct = distinct
+        self.version = None
+        self.index = None
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def row_label(self, values):
+        return ' - '.join(str(value) for value in values if value)
+
+    def load(self, version):
+        rows = self.model.objects.values_list('pk', *self.fields).iterator()
+        self.index = PrefixIndex((row[0], self.row_label(row[1:])) for row in rows)
+        self.version = version
+
+    def current(self, version=None):
+        """
+        The index, loaded again when another process changed the table.
+        """
+        if version is None:
+            version = data_versions([self.label])[self.label]
+        if self.index is None or self.version != version:
+            self.load(version)
+        return self.index
+
+    def suggest(self, prefix, limit=LIMIT):
+        """
+        Suggestions as dicts of id and text for the JSON endpoint.
+        """
+        index = self.current()
+        hits = index.search(prefix, limit, self.distinct)
+        if self.distinct:
+            return [{'id': label, 'text': label} for key, label in hits]
+        return [{'id': key, 'text': self.option_text(index, key, label)} for key, label in hits]
+
+    def option_text(self, index, key, label):
+        """
+        Text of a row's suggestion. The widget picks the row by this text, so
+        rows sharing a label (two vendors of the same name) get their id added.
+        """
+        if index.counts[label] > 1:
+            return f"{label} (#{key})"
+        return label
+
+    def label_for(self, key):
+        """
+        Text of one row for a form widget, or '' when it is gone.
+        """
+        index = self.current()
+        try:
+            key = int(key)
+        except (TypeError, ValueError):
+            return ''
+        if key not in index.labels:
+            return ''
+        return self.option_text(index, key, index.labels[key])
+
+
+def register(name, label, fields, distinct=False):
+    """
+    Add an autocomplete source. label is 'app_label.ModelName' and fields
+    the columns joined into the text shown.
+    """
+    SOURCES[name] = Source(name, label, fields, distinct)
+
+
+def loaded_sources(sender):
+    """
+    Sources on the written model that have an index loaded, with the new
+    data version of the model. Handlers run after the data version handler,
+    so the version already counts this write.
+    """
+    label = sender._meta.label_lower
+    sources = [source for source in SOURCES.values() if source.label == label and source.index is not None]
+    if not sources:
+        return [], None
+    version = data_versions([label])[label]
+    for source in sources:
+        if version != source.version + 1:
+            # another process wrote in between, load it again on next use
+            source.index = None
+    return [source for source in sources if source.index is not None], version
+
+
+def record_saved(sender, instance, raw=False, **kwargs):
+    """
+    post_save handler that puts the saved row's label in the loaded indexes.
+    """
+    if raw:
+        return
+    sources, version = loaded_sources(sender)
+    for source in sources:
+        source.index.add(instance.pk, source.row_label(getattr(instance, field) for field in source.fields))
+        source.version = version
+
+
+def record_deleted(sender, instance, **kwargs):
+    """
+    post_delete handler that takes the row out of the loaded indexes.
+    """
+    sources, version = loaded_sources(sender)
+    for source in sources:
+        source.index.remove(instance.pk)
+        source.version = version
+
+
+register('vendors', 'rentals.Vendor', ['name', 'services'])
+register('departments', 'rentals.Department', ['department_name'])
+register('productions', 'rentals.Production', ['production_company', 'show_name'])
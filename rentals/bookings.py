@@ -0,0 +1,110 @@
+"""
+Double-booking checks for rental items and vehicles.
+A booking rule names the columns that identify one bookable thing (the plate
+of a vehicle, the item and vendor of a rental) and its date columns. Two
+bookings of the same thing whose dates overlap, end dates included, are a
+conflict.
+The create and update forms check one booking with an index lookup on
+(key columns, start date), so only that thing's bookings starting before the
+new end date are read. The conflict report of a whole production sorts its
+bookings once and sweeps them with a heap of the bookings still out.
+"""
+import heapq
+from itertools import groupby
+
+from django.apps import apps
+
+# shown with the conflicting bookings in the form
+LIMIT = 5
+
+# booking rules by name
+RULES = {}
+
+
+class BookingRule:
+    """
+    Bookings that must not overlap. key_fields identify the booked thing and
+    blank lists key values that mean "not filled in yet" and never conflict.
+    """
+
+    def __init__(self, name, label, key_fields, start_field, end_field, blank=('',)):
+        self.name = name
+        self.label = label
+        self.key_fields = key_fields
+        self.start_field = start_field
+        self.end_field = end_field
+        self.blank = blank
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def key(self, values):
+        """
+        Key of a booking from a dict of its values, or None when it has none.
+        """
+        key = tuple(values.get(field) for field in self.key_fields)
+        if any(value is None or value in self.blank for value in key):
+            return None
+        return key
+
+    def conflicts(self, values, exclude=None):
+        """
+        Saved bookings of the same thing overlapping the dates in values
+        (form cleaned_data), leaving out the booking being edited.
+        """
+        key = self.key(values)
+        start, end = values.get(self.start_field), values.get(self.end_field)
+        if key is None or start is None or end is None:
+            return self.model.objects.none()
+        queryset = self.model.objects.filter(
+            **dict(zip(self.key_fields, key)),
+            **{f'{self.start_field}__lte': end, f'{self.end_field}__gte': start},
+        )
+        if exclude is not None:
+            queryset = queryset.exclude(pk=exclude)
+        return queryset.order_by(self.start_field, 'pk')
+
+    def production_conflicts(self, production):
+        """
+        Every pair of overlapping bookings in a production, as dicts of the
+        key and the two bookings, in date order.
+        """
+        fields = ('pk', *self.key_fields, self.start_field, self.end_field)
+        rows = (self.model.objects.filter(production=production)
+                .exclude(**{f'{self.start_field}__isnull': True})
+                .exclude(**{f'{self.end_field}__isnull': True})
+                .order_by(*self.key_fields, self.start_field, 'pk')
+                .values(*fields))
+        found = []
+        for key, bookings in groupby(rows.iterator(), key=self.key):
+            if key is None:
+                continue
+            # (end, pk, booking) of the bookings still out at the current start
+            out = []
+            for booking in bookings:
+                start = booking[self.start_field]
+                while out and out[0][0] < start:
+                    heapq.heappop(out)
+                for _, _, other in sorted(out, key=lambda item: (item[2][self.start_field], item[1])):
+                    found.append(self.pair(key, other, booking))
+                heapq.heappush(out, (booking[self.end_field], booking['pk'], booking))
+        return sorted(found, key=lambda pair: (pair['second']['start'], pair['first']['id'], pair['second']['id']))
+
+    def pair(self, key, first, second):
+        def booking(values):
+            return {'id': values['pk'], 'start': values[self.start_field], 'end': values[self.end_field]}
+        return {'key': dict(zip(self.key_fields, key)), 'first': booking(first), 'second': booking(second)}
+
+
+def register(rule):
+    """
+    Add a booking rule.
+    """
+    RULES[rule.name] = rule
+    return rule
+
+
+# the default rental_item is a placeholder, not an item
+register(BookingRule('rentals', 'rentals.Rental', ('vendor', 'rental_item'), 'start_rental_date', 'end_rental_date',
+                     blank=('', 'item')))
@@ -0,0 +1,90 @@
+"""
+Export everything: one ZIP download with every registered report.
+The reports are built at the same time on a thread pool, each worker with
+its own database connection, and every finished report goes through the
+report cache (see cache.py), so a bundle and the single downloads reuse each
+other's files. The ZIP is streamed to the client member by member as the
+reports finish, instead of after the last one.
+"""
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.db import connections
+
+from .cache import cached_file, data_versions, read_chunks
+from .reports import REPORTS
+
+# formats put in the bundle when the request does not ask for others
+BUNDLE_FORMATS = ('csv', 'pdf')
+# reports built at the same time
+WORKERS = 4
+
+
+class ZipStream:
+    """
+    Write-only file for ZipFile that hands the written bytes over to the
+    response as they come, instead of keeping the archive.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def bundle_members(formats=BUNDLE_FORMATS):
+    """
+    (report, format) for every registered report in each format it has.
+    """
+    return [(report, fmt) for report in REPORTS.values() for fmt in formats if fmt in report.formats]
+
+
+def build_member(report, fmt, versions):
+    """
+    Cached file for one report, run on a worker thread.
+    """
+    try:
+        return cached_file(report, fmt, {name: versions[name] for name in report.depends_on})
+    finally:
+        # worker threads are not request threads, nothing else closes their connection
+        connections.close_all()
+
+
+def zip_chunks(members, workers=WORKERS):
+    """
+    Build members concurrently and generate the ZIP archive of them as byte
+    chunks, each report added as soon as it is ready.
+    """
+    # one version query for every table the bundle prints
+    versions = data_versions(sorted({name for report, fmt in members for name in report.depends_on}))
+    stream = ZipStream()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-bundle')
+    try:
+        futures = {pool.submit(build_member, report, fmt, versions): (report, fmt) for report, fmt in members}
+        with zipfile.ZipFile(stream, 'w') as archive:
+            for future in as_completed(futures):
+                report, fmt = futures[future]
+                info = zipfile.ZipInfo(report.get_filename(fmt), date_time=time.localtime()[:6])
+                # pdf streams are compressed already
+                info.compress_type = zipfile.ZIP_STORED if fmt == 'pdf' else zipfile.ZIP_DEFLATED
+                with archive.open(info, 'w') as member:
+                    for chunk in read_chunks(future.result()):
+                        member.write(chunk)
+                        if data := stream.take():
+                            yield data
+        # the central directory
+        yield stream.take()
+    finally:
+        # a cancelled download stops the reports that have not started
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,182 @@
+"""
+Report cache for the rental application.
+A finished report is kept on disk under REPORT_ROOT/cache, keyed by report
+name, format, filters and the data version of every table the report prints.
+Saving or deleting a row bumps its table's version (see signals.py), so the
+next download of an affected report misses the cache and rebuilds it while
+reports on other tables keep their cached copy.
+"""
+import hashlib
+import json
+import os
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .exports import accepts_gzip, streaming_response
+from .models import DataVersion
+from .reports import get_report
+
+# bytes read per chunk when serving a cached csv or text file
+READ_SIZE = 64 * 1024
+
+
+def data_versions(names):
+    """
+    Current version of each table in names with one query. Tables that were
+    never written have version 0.
+    """
+    versions = dict(DataVersion.objects.filter(name__in=names).values_list('name', 'version'))
+    return {name: versions.get(name, 0) for name in names}
+
+
+def bump_version(name):
+    """
+    Move a table to its next data version.
+    """
+    now = timezone.now()
+    if DataVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(name=name, updated_at=now)
+    except IntegrityError:
+        # another request created the row first
+        DataVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+
+
+def digest(data):
+    """
+    Short stable hash of a json-able value.
+    """
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def cache_path(report, fmt, filters=None, versions=None):
+    """
+    Path of the cached file for a report at the current data versions.
+    """
+    if versions is None:
+        versions = data_versions(report.depends_on)
+    name = f"{fmt}-{digest(filters or {})}-{digest(versions)}.{fmt}"
+    return os.path.join(settings.REPORT_ROOT, 'cache', report.name, name)
+
+
+def remove_stale(path):
+    """
+    Delete older versions of the same cached report once a new one is written.
+    """
+    folder, name = os.path.split(path)
+    prefix = name.rsplit('-', 1)[0] + '-'
+    for other in os.listdir(folder):
+        if other.startswith(prefix) and other != name and not other.endswith('.tmp'):
+            try:
+                os.remove(os.path.join(folder, other))
+            except FileNotFoundError:
+                pass
+
+
+def temp_path(path):
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def save_as_you_go(chunks, path):
+    """
+    Pass chunks through to the client and write them to the cache at the same
+    time. The file only replaces the cache entry once every chunk was sent,
+    so a cancelled download never leaves a half written report behind.
+    """
+    tmp = temp_path(path)
+    with open(tmp, 'wb') as output:
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                yield chunk
+        except BaseException:
+            output.close()
+            os.remove(tmp)
+            raise
+    os.replace(tmp, path)
+    remove_stale(path)
+
+
+def read_chunks(path):
+    """
+    Read a cached file in chunks.
+    """
+    with open(path, 'rb') as cached:
+        while chunk := cached.read(READ_SIZE):
+            yield chunk
+
+
+def build_file(report, fmt, path, queryset=None):
+    """
+    Build a report straight into the cache.
+    """
+    tmp = temp_path(path)
+    try:
+        with open(tmp, 'wb') as output:
+            report.write(fmt, output, None if queryset is None else queryset.iterator(chunk_size=2000))
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    remove_stale(path)
+
+
+def cached_file(report, fmt, versions=None):
+    """
+    Path of the cached copy of a whole report, built first when there is none
+    at the current data versions.
+    """
+    path = cache_path(report, fmt, None, versions)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        build_file(report, fmt, path)
+    return path
+
+
+def report_response(request, name, fmt, filters=None, queryset=None, compress=False):
+    """
+    Download response for a registered report, served from the cache when the
+    data has not changed since it was last built. filters and queryset are for
+    reports narrowed down by the request; filters must describe queryset.
+    The data versions double as the ETag, so a browser that already has this
+    report gets a 304 after the one version query.
+    """
+    report = get_report(name)
+    filename = report.get_filename(fmt)
+    versions = data_versions(report.depends_on)
+    gzipped = fmt != 'pdf' and compress and accepts_gzip(request)
+    etag = quote_etag(digest([report.name, fmt, filters or {}, versions, gzipped]))
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    path = cache_path(report, fmt, filters, versions)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if fmt == 'pdf':
+        if not os.path.exists(path):
+            build_file(report, 'pdf', path, queryset)
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+    else:
+        content_type = 'text/csv' if fmt == 'csv' else 'text/plain'
+        if os.path.exists(path) and not gzipped:
+            response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                                    content_type=content_type)
+        else:
+            if os.path.exists(path):
+                chunks = read_chunks(path)
+            else:
+                rows = None if queryset is None else queryset.iterator(chunk_size=2000)
+                chunks = save_as_you_go(report.chunks(fmt, rows), path)
+            response = streaming_response(request, chunks, content_type, filename, compress)
+    if compress:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['ETag'] = etag
+    return response
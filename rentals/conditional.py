@@ -0,0 +1,67 @@
+"""
+Conditional GET support for the rental application.
+List and detail pages send an ETag and a Last-Modified header worked out from
+the data versions (see cache.py) of the tables they print: the model of the
+page and the related rows whose names show on it. When the browser asks
+again and none of those tables changed, the view answers 304 Not Modified
+after one small lookup on the data version table, without reading the
+page's rows, running the page queries or rendering the template.
+"""
+import hashlib
+
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+# related rows whose names show on the rental, service and vehicle pages
+PAGE_RELATED = ('vendor', 'department', 'production')
+
+
+def page_tables(model, related=()):
+    """
+    Data version names of a model and of the related models named in related.
+    """
+    tables = [model._meta.label_lower]
+    tables += [model._meta.get_field(name).related_model._meta.label_lower for name in related]
+    return tables
+
+
+def last_change(tables):
+    """
+    Data versions of the tables and when the latest of them moved, in one
+    query. Tables that were never written have version 0.
+    """
+    versions = dict.fromkeys(tables, 0)
+    latest = None
+    for name, version, updated_at in (DataVersion.objects.filter(name__in=tables)
+                                      .values_list('name', 'version', 'updated_at')):
+        versions[name] = version
+        if latest is None or updated_at > latest:
+            latest = updated_at
+    return {'versions': versions, 'latest': latest}
+
+
+def conditional_page(model, related=()):
+    """
+    Decorator for views that show rows of model. related names its foreign
+    keys whose text also shows on the page, such as the vendor. The page
+    varies by user (the nav bar shows who is logged in), so the user is part
+    of the ETag.
+    """
+    def state(request, *args, **kwargs):
+        # condition() asks for the etag and the last modified date separately,
+        # keep the answer on the request so the query only runs once
+        if not hasattr(request, '_last_change'):
+            request._last_change = last_change(page_tables(model, related))
+        return request._last_change
+
+    def etag(request, *args, **kwargs):
+        versions = state(request, *args, **kwargs)['versions']
+        stamp = ','.join(f"{name}:{version}" for name, version in sorted(versions.items()))
+        key = f"{request.get_full_path()}|{stamp}|{request.user.pk}"
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def last_modified(request, *args, **kwargs):
+        return state(request, *args, **kwargs)['latest']
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
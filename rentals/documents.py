@@ -0,0 +1,157 @@
+"""
+Disk cache for the per-record detail downloads (rental, service and vehicle
+txt and pdf).
+A document is stored under REPORT_ROOT/documents, named by a hash of the text
+it prints. Saving the record, or renaming the vendor or department it shows,
+changes the text and so the file name, and the next download builds a new
+file. An unchanged record is served straight from disk without running
+ReportLab, and the hash doubles as the ETag.
+"""
+import os
+import shutil
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .cache import digest, remove_stale, temp_path
+from .pdf import money, write_detail_pdf
+
+CONTENT_TYPES = {'txt': 'text/plain', 'pdf': 'application/pdf'}
+
+
+def document_folder(label, pk):
+    return os.path.join(settings.REPORT_ROOT, 'documents', label, str(pk))
+
+
+def document_path(label, pk, fmt, lines):
+    """
+    Path of the document of one record with this text.
+    """
+    return os.path.join(document_folder(label, pk), f"{fmt}-{digest([fmt, lines])}.{fmt}")
+
+
+def build_document(fmt, lines, path):
+    tmp = temp_path(path)
+    try:
+        with open(tmp, 'wb') as output:
+            if fmt == 'pdf':
+                write_detail_pdf(lines, output)
+            else:
+                output.write(''.join(lines).encode())
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    remove_stale(path)
+
+
+def document_response(request, obj, fmt, lines, filename):
+    """
+    Download response for the detail document of obj, built only when the
+    text changed since the last download.
+    """
+    label = obj._meta.label_lower
+    path = document_path(label, obj.pk, fmt, lines)
+    etag = quote_etag(os.path.basename(path))
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        build_document(fmt, lines, path)
+    # FileResponse hands the open file to the server, which can use sendfile
+    response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                            content_type=CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    return response
+
+
+######### DETAIL PAGES #########
+
+def rental_pdf_lines(rental):
+    """
+    Lines of the rental detail pdf, also one page of a packet.
+    """
+    lines = []
+    lines.append("")
+    lines.append(f'{rental.production}')
+    lines.append('___________________________')
+    lines.append('')
+    lines.append(f"Rental Item: {rental.rental_item}")
+    lines.append(f"First Name: {rental.first_name}")
+    lines.append(f"Last Name: {rental.last_name}")
+    lines.append(f"Title: {rental.title}")
+    lines.append(f"Department: {rental.department}")
+    lines.append(f"Production: {rental.production}")
+    lines.append(f"Vendor: {rental.vendor}")
+    lines.append(f"Purpose/Scene Info: {rental.scene_info}")
+    lines.append(f"Start Rental Date: {rental.start_rental_date}")
+    lines.append(f"End Rental Date: {rental.end_rental_date}")
+    lines.append(f"Drop Off Location: {rental.drop_off_location}")
+    lines.append(f"Drop Off Time: {rental.drop_off_time}")
+    lines.append(f"Pick Up Location: {rental.pick_up_location}")
+    lines.append(f"Pick Up Time: {rental.pick_up_time}")
+    lines.append(f"Rental Type: {rental.rental_type}")
+    lines.append(f"Category: {rental.category}")
+    lines.append(f"Additional Tax Fees: {money(rental.addl_tax_fees)}")
+    lines.append(f"Total Cost: {money(rental.total_cost)}")
+    lines.append(f"Purchase Order: {rental.purchase_order}")
+    lines.append(f"Quote Number: {rental.quote_number}")
+    lines.append(f"Notes 1: {rental.notes1}")
+    lines.append(f"Notes 2: {rental.notes2}")
+    lines.append(f"Notes 3: {rental.notes3}")
+    lines.append("")
+    return lines
+
+
+def service_pdf_lines(service):
+    """
+    Lines of the service detail pdf, also one page of a packet.
+    """
+    lines = []
+    lines.append('')
+    lines.append('SERVICE DETAILS')
+    lines.append('___________________')
+    lines.append('')
+    lines.append(f'Production: {service.production}')
+    lines.append(f'Service: {service.service}')
+    lines.append(f'Description: {service.description}')
+    lines.append(f'Rate: {money(service.rate)}')
+    lines.append(f'Total: {money(service.total)}')
+    lines.append(f'Start Service Date: {service.start_service_date}')
+    lines.append(f'End Service Date: {service.end_service_date}')
+    lines.append(f'Vendor: {service.vendor}')
+    lines.append(f'Service Location: {service.service_location}')
+    lines.append(f'Requestor: {service.requestor}')
+    lines.append(f'Title: {service.title}')
+    lines.append(f'Department: {service.department}')
+    lines.append(f'Purchase Order: {service.purchase_order}')
+    lines.append(f'Payment Type: {service.payment_type}')
+    lines.append(f'Notes 1: {service.notes1}')
+    lines.append(f'Notes 2: {service.notes2}')
+    lines.append(f'Notes 3: {service.notes3}')
+    lines.append("")
+    return lines
+
+
+def rental_text_lines(rental):
+    """
+    Text of the rental detail txt download.
+    """
+    return [f"Rental Item: {rental.rental_item}\n First Name: {rental.first_name}\n Last Name: {rental.last_name}\n Title: {rental.title}\n Department: {rental.department}\n Production: {rental.production}\n Vendor: {rental.vendor}\n Scene Info: {rental.scene_info}\n Start Rental Date: {rental.start_rental_date}\n End Rental Date: {rental.end_rental_date}\n Drop Off Location: {rental.drop_off_location}\n Drop Off Time: {rental.drop_off_time}\n Pick Up Location: {rental.pick_up_location}\n Pick Up Time: {rental.pick_up_time}\n Rental Type: {rental.rental_type}\n Category: {rental.category}\n Additional Tax Fees: {money(rental.addl_tax_fees)}\n Total Cost: {money(rental.total_cost)}\n Purchase Order: {rental.purchase_order}\n Quote Number: {rental.quote_number}\n Notes 1: {rental.notes1}\n Notes 2: {rental.notes2}\n Notes 3: {rental.notes3}"]
+
+
+def service_text_lines(service):
+    """
+    Text of the service detail txt download.
+    """
+    return [f"\n\n\n SERVICE DETAILS\n Production: {service.production}\n Service: {service.service}\n Description: {service.description}\n Rate: {money(service.rate)}\n Total: {money(service.total)}\n Start Service Date: {service.start_service_date}\n End Service Date: {service.end_service_date}\n Vendor: {service.vendor}\n Service Location: {service.service_location}\n Requestor: {service.requestor}\n Title: {service.title}\n Production: {service.production}\n Department: {service.department}\n Purchase Order: {service.purchase_order}\n Payment Type: {service.payment_type}\n Notes 1: {service.notes1}\n Notes 2: {service.notes2}\n Notes 3: {service.notes3}"]
+
+
+def record_deleted(sender, instance, **kwargs):
+    """
+    post_delete handler that removes the cached documents of a deleted record.
+    """
+    shutil.rmtree(document_folder(sender._meta.label_lower, instance.pk), ignore_errors=True)
@@ -0,0 +1,99 @@
+"""
+Streaming report exports for the rental application.
+Exports read the queryset in chunks and send each chunk as soon as it is
+written, so memory stays flat no matter how many rows a report has.
+"""
+import csv
+import re
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from .layouts import field_text, field_value
+
+# rows fetched per database round trip (server side cursor on postgres)
+CHUNK_SIZE = 2000
+# bytes collected before a chunk is sent to the client
+BUFFER_SIZE = 64 * 1024
+
+accepts_gzip_re = re.compile(r'\bgzip\b')
+
+
+class Echo:
+    """
+    File-like object for csv.writer that hands back each line instead of
+    storing it.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset):
+    """
+    Read a queryset in chunks without caching the results.
+    """
+    return queryset.iterator(chunk_size=CHUNK_SIZE)
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """
+    Join small strings into byte chunks of about size bytes.
+    """
+    buffer = []
+    length = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def csv_lines(columns, rows):
+    """
+    Generate the csv heading line and then one line per row.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([heading for heading, _ in columns])
+    for row in rows:
+        yield writer.writerow([field_value(row, path) for _, path in columns])
+
+
+def text_lines(fields, rows):
+    """
+    Generate one text block per row, each field on its own line and a blank
+    line after every record.
+    """
+    for row in rows:
+        block = ''.join(f"{label}: {field_text(row, path)}\n" for label, path in fields)
+        yield block + '\n'
+
+
+def accepts_gzip(request):
+    """
+    Check if the client can take a gzip encoded response.
+    """
+    return bool(accepts_gzip_re.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+
+def streaming_response(request, chunks, content_type, filename, compress=False):
+    """
+    Build a download response that streams byte chunks to the client.
+    With compress=True the body is gzipped on the fly for clients that accept it.
+    """
+    gzipped = compress and accepts_gzip(request)
+    if gzipped:
+        chunks = compress_sequence(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if compress:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
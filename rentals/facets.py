@@ -0,0 +1,105 @@
+"""
+Faceted filtering for the rental and service search pages.
+Each facet is a column people narrow a search by (category, department,
+vendor...). The chosen values come in as query parameters next to the search
+box entry, and the counts for every facet value under the current filter come
+from one GROUP BY query per facet (see TotalsQuerySet.facet_counts).
+"""
+from django.core.exceptions import ValidationError
+
+# query parameters that belong to the page, not to a facet
+PAGE_PARAMS = ('after', 'before')
+
+
+class Facet:
+    """
+    One facet. param is the query parameter, column the model column it
+    filters on and name_column the column shown as its label (None to show
+    the choice label or the value itself).
+    """
+
+    def __init__(self, param, title, column, name_column=None):
+        self.param = param
+        self.title = title
+        self.column = column
+        self.name_column = name_column
+
+    def label(self, model, value, name):
+        if self.name_column is None:
+            choices = dict(model._meta.get_field(self.column).flatchoices)
+            return str(choices.get(value, value))
+        return str(name)
+
+
+def selected(params, facets):
+    """
+    {facet: value} for the facets chosen in the query parameters.
+    """
+    return {facet: params[facet.param] for facet in facets if params.get(facet.param)}
+
+
+def apply_facets(queryset, params, facets):
+    """
+    Narrow a queryset to the facet values chosen in the query parameters.
+    """
+    for facet, value in selected(params, facets).items():
+        try:
+            queryset = queryset.filter(**{facet.column: value})
+        except (ValueError, ValidationError):
+            # hand typed url with a value the column cannot hold
+            return queryset.none()
+    return queryset
+
+
+def toggle_query(params, param, value):
+    """
+    Query string that picks a facet value, or drops it when it is already
+    picked. Goes back to the first page.
+    """
+    params = params.copy()
+    for name in PAGE_PARAMS:
+        params.pop(name, None)
+    if params.get(param) == value:
+        params.pop(param)
+    else:
+        params[param] = value
+    return params.urlencode()
+
+
+def facet_groups(queryset, params, facets):
+    """
+    Facets with their values and row counts over queryset, for the template.
+    """
+    chosen = {facet.param: value for facet, value in selected(params, facets).items()}
+    counts = queryset.facet_counts({facet.column: facet.name_column for facet in facets})
+    groups = []
+    for facet in facets:
+        values = []
+        for value, name, count in counts[facet.column]:
+            if value is None:
+                continue
+            value = str(value)
+            values.append({
+                'value': value,
+                'label': facet.label(queryset.model, value, name),
+                'count': count,
+                'selected': chosen.get(facet.param) == value,
+                'query': toggle_query(params, facet.param, value),
+            })
+        groups.append({'param': facet.param, 'title': facet.title, 'values': values})
+    return groups
+
+
+RENTAL_FACETS = [
+    Facet('category', 'Category', 'category'),
+    Facet('department', 'Department', 'department', 'department__department_name'),
+    Facet('vendor', 'Vendor', 'vendor', 'vendor__name'),
+    Facet('rental_type', 'Rental Type', 'rental_type'),
+    Facet('payment_type', 'Payment', 'payment_type'),
+]
+
+SERVICE_FACETS = [
+    Facet('department', 'Department', 'department', 'department__department_name'),
+    Facet('vendor', 'Vendor', 'vendor', 'vendor__name'),
+    Facet('payment_type', 'Payment', 'payment_type'),
+]
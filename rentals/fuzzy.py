@@ -0,0 +1,245 @@
+"""
+Fuzzy lookup of paperwork identifiers: plate, PO, contract and quote numbers.
+Identifiers are compared by their trigrams (runs of three characters), the
+same measure pg_trgm uses, so a typo or a partial number still finds the
+closest records with a similarity score between 0 and 1.
+
+On Postgres the lookup uses pg_trgm and a GIN trigram index per identifier
+column. Elsewhere each process keeps an in-memory trigram index per model,
+loaded on first use and then kept up to date row by row from the save and
+delete signals of this process. Saves made by another process show up as a
+new data version (see cache.py) and the index is loaded again.
+"""
+import operator
+import re
+from collections import Counter, defaultdict, namedtuple
+from functools import reduce
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .cache import data_versions
+
+# lowest similarity that counts as a match, pg_trgm's default threshold
+SIMILARITY = 0.3
+
+# identifier columns by model label
+IDENTIFIER_FIELDS = {}
+# detail page url name by model label
+DETAIL_URLS = {}
+
+Match = namedtuple('Match', 'obj field value score')
+
+
+def register(label, fields, url_name):
+    """
+    Make a model's identifier columns fuzzy searchable. label is
+    'app_label.ModelName' and url_name its detail page.
+    """
+    IDENTIFIER_FIELDS[label.lower()] = fields
+    DETAIL_URLS[label.lower()] = url_name
+
+
+def trigrams(text):
+    """
+    Trigrams of each word in text, padded like pg_trgm: two spaces in front
+    and one behind, so short numbers and word starts still count.
+    """
+    grams = set()
+    for word in re.findall(r'[0-9a-z]+', text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    In-memory inverted index from trigram to the identifiers that contain it.
+    """
+    # trigrams in more than this share of the identifiers (the "PO" of every
+    # purchase order) do not pick candidates on their own
+    common_share = 0.25
+
+    def __init__(self, rows=()):
+        # rows are (pk, field, value)
+        self.entries = {}
+        self.numbers = defaultdict(list)
+        self.postings = defaultdict(set)
+        self.next_number = 0
+        for pk, field, value in rows:
+            self.insert(pk, field, value)
+
+    def insert(self, pk, field, value):
+        if not value:
+            return
+        grams = trigrams(value)
+        number = self.next_number
+        self.next_number += 1
+        self.entries[number] = (pk, field, value, len(grams))
+        self.numbers[pk].append(number)
+        for gram in grams:
+            self.postings[gram].add(number)
+
+    def add(self, pk, values):
+        """
+        Put a record's (field, value) identifiers in the index, replacing the
+        ones it had.
+        """
+        self.remove(pk)
+        for field, value in values:
+            self.insert(pk, field, value)
+
+    def remove(self, pk):
+        for number in self.numbers.pop(pk, ()):
+            _, _, value, _ = self.entries.pop(number)
+            for gram in trigrams(value):
+                self.postings[gram].discard(number)
+                if not self.postings[gram]:
+                    del self.postings[gram]
+
+    def search(self, text, limit=10, threshold=SIMILARITY):
+        """
+        Best (pk, field, value, score) per record, best first. score is shared
+        trigrams over all trigrams of both strings.
+        """
+        grams = trigrams(text)
+        if not grams:
+            return []
+        postings = [self.postings.get(gram, frozenset()) for gram in grams]
+        limit_size = self.common_share * len(self.entries)
+        rare = [numbers for numbers in postings if 0 < len(numbers) <= limit_size]
+        common = [numbers for numbers in postings if len(numbers) > limit_size]
+        shared = Counter()
+        # candidates share at least one rare trigram, the common ones only
+        # add to their count
+        for numbers in rare or common:
+            shared.update(numbers)
+        if rare:
+            candidates = frozenset(shared)
+            for numbers in common:
+                shared.update(numbers & candidates)
+        # score can only reach the threshold with this many shared trigrams
+        need = threshold * len(grams)
+        best = {}
+        for number, count in shared.items():
+            if count < need:
+                continue
+            pk, field, value, size = self.entries[number]
+            score = count / (len(grams) + size - count)
+            if score >= threshold and (pk not in best or score > best[pk][3]):
+                best[pk] = (pk, field, value, score)
+        return sorted(best.values(), key=lambda hit: (-hit[3], hit[0]))[:limit]
+
+
+# model label -> (data version, TrigramIndex)
+_indexes = {}
+
+
+def local_index(model, version):
+    """
+    The in-memory index for a model, loaded again when another process
+    changed the table.
+    """
+    label = model._meta.label_lower
+    cached = _indexes.get(label)
+    if cached is None or cached[0] != version:
+        fields = IDENTIFIER_FIELDS[label]
+        rows = ((row[0], field, value) for row in model.objects.values_list('pk', *fields).iterator()
+                for field, value in zip(fields, row[1:]))
+        cached = (version, TrigramIndex(rows))
+        _indexes[label] = cached
+    return cached[1]
+
+
+def loaded_index(sender):
+    """
+    The loaded index of the written model, with the new data version of the
+    model. The handlers run after the data version handler, so the version
+    already counts this write.
+    """
+    label = sender._meta.label_lower
+    cached = _indexes.get(label)
+    if cached is None:
+        return None, None
+    version = data_versions([label])[label]
+    if version != cached[0] + 1:
+        # another process wrote in between, load it again on next use
+        del _indexes[label]
+        return None, None
+    return cached[1], version
+
+
+def record_saved(sender, instance, raw=False, **kwargs):
+    """
+    post_save handler that puts the saved row's identifiers in the loaded index.
+    """
+    if raw:
+        return
+    index, version = loaded_index(sender)
+    if index is None:
+        return
+    fields = IDENTIFIER_FIELDS[sender._meta.label_lower]
+    index.add(instance.pk, [(field, getattr(instance, field)) for field in fields])
+    _indexes[sender._meta.label_lower] = (version, index)
+
+
+def record_deleted(sender, instance, **kwargs):
+    """
+    post_delete handler that takes the row out of the loaded index.
+    """
+    index, version = loaded_index(sender)
+    if index is None:
+        return
+    index.remove(instance.pk)
+    _indexes[sender._meta.label_lower] = (version, index)
+
+
+def postgres_lookup(model, text, limit):
+    from django.contrib.postgres.search import TrigramSimilarity
+    fields = IDENTIFIER_FIELDS[model._meta.label_lower]
+    scores = {f'_similarity_{field}': TrigramSimilarity(field, text) for field in fields}
+    best = Greatest(*map(F, scores)) if len(fields) > 1 else F(next(iter(scores)))
+    # the % operator is what the GIN trigram index answers
+    matches = reduce(operator.or_, [Q(**{f'{field}__trigram_similar': text}) for field in fields])
+    rows = model.objects.filter(matches).annotate(**scores).annotate(_similarity=best).order_by('-_similarity', 'pk')
+    found = []
+    for row in rows[:limit]:
+        field = max(fields, key=lambda name: getattr(row, f'_similarity_{name}') or 0)
+        found.append(Match(row, field, getattr(row, field), row._similarity))
+    return found
+
+
+def fuzzy_lookup(model, text, limit=10, version=None):
+    """
+    Closest records of model to text over its identifier columns, as
+    Matches best first.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if connections[model.objects.db].vendor == 'postgresql':
+        return postgres_lookup(model, text, limit)
+    label = model._meta.label_lower
+    if version is None:
+        version = data_versions([label])[label]
+    hits = local_index(model, version).search(text, limit)
+    objects = model.objects.in_bulk([hit[0] for hit in hits])
+    return [Match(objects[pk], field, value, score) for pk, field, value, score in hits if pk in objects]
+
+
+def closest_matches(text, limit=10):
+    """
+    Closest rentals, services and vehicles to text, best first.
+    """
+    versions = data_versions(list(IDENTIFIER_FIELDS))
+    found = []
+    for label in IDENTIFIER_FIELDS:
+        found += fuzzy_lookup(apps.get_model(label), text, limit, versions[label])
+    found.sort(key=lambda match: -match.score)
+    return found[:limit]
+
+
+register('rentals.Rental', ['purchase_order', 'quote_number'], 'rental_detail')
+register('rentals.Service', ['purchase_order'], 'service_detail')
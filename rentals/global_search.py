@@ -0,0 +1,155 @@
+"""
+Global search across rentals, services, vendors and vehicles.
+Each entity type is searched on its own worker thread (with its own database
+connection) at the same time, through the same full text index and query
+tokens as its search page. The worker threads keep their connections open
+between searches for CONNECTION_AGE seconds, so a search does not pay for
+new connections inside its budget. Results come back grouped by type, best first,
+capped per type. A type that does not answer inside the latency budget is
+reported as timed out instead of holding up the response.
+The budget only stops the wait. On Postgres a statement_timeout also stops
+the query on the database side, on other databases a slow query keeps its
+worker thread and connection until it finishes.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.db import DatabaseError, close_old_connections, connections, transaction
+from django.urls import reverse
+
+from .models import Rental, Service, Vendor
+from .query_parser import RENTAL_QUERY, SERVICE_QUERY, apply_query
+from .search import search
+
+logger = logging.getLogger(__name__)
+
+# seconds the whole search may take
+BUDGET = 0.5
+# hits returned per entity type
+PER_TYPE = 5
+# global searches one process runs at the same time without queueing, each
+# takes a worker thread and connection per entity type
+CONCURRENT_SEARCHES = 4
+# seconds a worker thread keeps its database connection open
+CONNECTION_AGE = 60
+
+# entity types in the order they are shown
+TARGETS = []
+
+_executor = None
+
+
+class SearchTarget:
+    """
+    One entity type in the global search. queryset is a callable returning
+    the rows to search, spec the QuerySpec for structured tokens (None for
+    free text only) and url_name the detail page.
+    """
+
+    def __init__(self, key, title, queryset, url_name, spec=None):
+        self.key = key
+        self.title = title
+        self.queryset = queryset
+        self.url_name = url_name
+        self.spec = spec
+
+    def find(self, text, limit):
+        queryset = self.queryset()
+        if self.spec is not None:
+            queryset = apply_query(queryset, text, self.spec)
+        else:
+            queryset = search(queryset, text)
+        if 'search_rank' in queryset.query.annotations:
+            queryset = queryset.order_by('-search_rank', '-pk')
+        else:
+            queryset = queryset.order_by('-pk')
+        return list(queryset[:limit + 1])
+
+    def hit(self, obj):
+        return {
+            'id': obj.pk,
+            'label': str(obj),
+            'url': reverse(self.url_name, args=[obj.pk]),
+            'rank': round(getattr(obj, 'search_rank', 0) or 0, 4),
+        }
+
+
+def register(target):
+    """
+    Add an entity type to the global search.
+    """
+    TARGETS.append(target)
+    return target
+
+
+def executor():
+    """
+    Worker threads shared by every global search in this process.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=(len(TARGETS) or 1) * CONCURRENT_SEARCHES,
+                                       thread_name_prefix='global-search')
+    return _executor
+
+
+def worker_connection():
+    """
+    The connection of the current worker thread, kept open for the next
+    searches on the thread. Worker threads are not request threads, so they
+    drop broken and old connections themselves before each search.
+    """
+    close_old_connections()
+    connection = connections['default']
+    if connection.connection is None:
+        connection.connect()
+        # CONN_MAX_AGE stays 0 for request threads, only these threads keep theirs
+        connection.close_at = time.monotonic() + CONNECTION_AGE
+    return connection
+
+
+def run_target(target, text, limit, budget):
+    """
+    Search one entity type on a worker thread.
+    """
+    connection = worker_connection()
+    if connection.vendor != 'postgresql':
+        return target.find(text, limit)
+    with transaction.atomic():
+        # stop the query on the database side too once the budget is gone
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL statement_timeout = %s', [int(budget * 1000)])
+        return target.find(text, limit)
+
+
+def global_search(text, per_type=PER_TYPE, budget=BUDGET):
+    """
+    Search every entity type at once. Returns one group per type with its
+    hits, whether there are more, and whether it ran out of time.
+    """
+    futures = {executor().submit(run_target, target, text, per_type, budget): target for target in TARGETS}
+    done, _ = wait(futures, timeout=budget)
+    groups = []
+    for future, target in futures.items():
+        group = {'type': target.key, 'title': target.title, 'hits': [], 'more': False, 'timed_out': False}
+        if future not in done:
+            # only drops a search still queued, a running one finishes on its thread
+            future.cancel()
+            group['timed_out'] = True
+        else:
+            try:
+                rows = future.result()
+            except DatabaseError:
+                logger.exception("Global search of %s failed", target.key)
+                group['timed_out'] = True
+            else:
+                group['hits'] = [target.hit(obj) for obj in rows[:per_type]]
+                group['more'] = len(rows) > per_type
+        groups.append(group)
+    return groups
+
+
+register(SearchTarget('rentals', 'Rentals', lambda: Rental.objects.select_related('department', 'vendor'), 'rental_detail', RENTAL_QUERY))
+register(SearchTarget('services', 'Services', lambda: Service.objects.select_related('department', 'vendor'), 'service_detail', SERVICE_QUERY))
+register(SearchTarget('vendors', 'Vendors', lambda: Vendor.objects.select_related('category'), 'vendor_detail'))
@@ -0,0 +1,157 @@
+"""
+Background report jobs for the rental application.
+Report views queue a ReportJob row, the run_report_worker management command
+picks jobs up one at a time and writes the finished file to settings.REPORT_ROOT.
+Large paperwork packets (see packets.py) are queued the same way, as a job
+whose report name starts with PACKET_PREFIX and whose params pick the records.
+No broker is needed, the database is the queue.
+"""
+import datetime
+import logging
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ReportJob
+from .packets import PACKETS
+from .pdf import write_packet_pdf
+from .reports import get_report
+
+logger = logging.getLogger(__name__)
+
+# rows written between progress updates
+PROGRESS_EVERY = 500
+# report name of a packet job, followed by the packet type
+PACKET_PREFIX = 'packet:'
+# running jobs started longer ago than this belong to a worker that died
+STALE_AFTER = datetime.timedelta(hours=1)
+
+
+def submit_job(report, fmt):
+    """
+    Queue a report for the worker. Raises KeyError for unknown reports and
+    ValueError for formats the report does not support.
+    """
+    if fmt not in get_report(report).formats:
+        raise ValueError(f"{report} has no {fmt} format")
+    return ReportJob.objects.create(report=report, format=fmt)
+
+
+def submit_packet(kind, ids=None, query=''):
+    """
+    Queue a paperwork packet for the worker. Raises KeyError for unknown
+    packet types.
+    """
+    packet = PACKETS[kind]
+    return ReportJob.objects.create(report=f"{PACKET_PREFIX}{packet.name}", format='pdf',
+                                    params={'ids': ids or [], 'q': query})
+
+
+def claim_next_job():
+    """
+    Take the oldest queued job and mark it running. Returns None when the queue
+    is empty. The status check in the update makes sure two workers never run
+    the same job.
+    """
+    with transaction.atomic():
+        job = (ReportJob.objects.select_for_update(skip_locked=True)
+               .filter(status=ReportJob.QUEUED).order_by('created_at').first())
+        if job is None:
+            return None
+        claimed = ReportJob.objects.filter(pk=job.pk, status=ReportJob.QUEUED).update(
+            status=ReportJob.RUNNING, started_at=timezone.now())
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def track_progress(job, rows):
+    """
+    Pass rows through and save the row count on the job as they are written.
+    """
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_EVERY == 0:
+            ReportJob.objects.filter(pk=job.pk).update(rows_done=done)
+    job.rows_done = done
+
+
+def job_file_path(job):
+    """
+    Where the finished file for a job is written.
+    """
+    return os.path.join(settings.REPORT_ROOT, f"job_{job.pk}.{job.format}")
+
+
+def job_source(job):
+    """
+    (queryset, write, filename) of a job: the rows it reads, a callable
+    writing them to an open file and the download name.
+    """
+    if job.report.startswith(PACKET_PREFIX):
+        packet = PACKETS[job.report[len(PACKET_PREFIX):]]
+        queryset = packet.select(job.params.get('ids'), job.params.get('q'))
+
+        def write(output, rows):
+            write_packet_pdf((packet.lines(obj) for obj in rows), output)
+        return queryset, write, f"{packet.filename}.pdf"
+    report = get_report(job.report)
+
+    def write(output, rows):
+        report.write(job.format, output, rows)
+    return report.get_queryset(), write, report.get_filename(job.format)
+
+
+def run_job(job):
+    """
+    Build the report for a running job and record the result.
+    """
+    path = job_file_path(job)
+    try:
+        queryset, write, filename = job_source(job)
+        job.rows_total = queryset.count()
+        job.save(update_fields=['rows_total'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            write(output, track_progress(job, queryset.iterator(chunk_size=2000)))
+    except Exception as error:
+        logger.exception("Report job %s failed", job.pk)
+        job.status = ReportJob.FAILED
+        job.error = str(error)
+    else:
+        job.status = ReportJob.DONE
+        job.file_path = path
+        job.filename = filename
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def fail_stale_jobs(now=None):
+    """
+    Mark failed the running jobs whose worker stopped without finishing them.
+    They are not queued again, a job that took its worker down would only
+    take the next one down too. Returns the number of jobs failed.
+    """
+    now = now or timezone.now()
+    return ReportJob.objects.filter(status=ReportJob.RUNNING, started_at__lt=now - STALE_AFTER).update(
+        status=ReportJob.FAILED, error="The worker stopped before the report was finished.", finished_at=now)
+
+
+def run_pending():
+    """
+    Run queued jobs until the queue is empty. Returns the number of jobs run.
+    """
+    fail_stale_jobs()
+    count = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
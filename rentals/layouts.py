@@ -0,0 +1,176 @@
+"""
+Report layouts for the rental application.
+Each layout is a list of (column heading, attribute path) pairs. A dotted path
+like 'vendor.name' follows the relation; a missing relation prints as blank.
+The *_CSV layouts are the csv columns, the *_FIELDS layouts are the full
+record used by the text reports. The *_PDF layouts add a width weight for
+the pdf table columns.
+"""
+
+# Rental csv columns
+RENTAL_CSV = [
+    ('Rental Item', 'rental_item'),
+    ('First Name', 'first_name'),
+    ('Last Name', 'last_name'),
+    ('Title', 'title'),
+    ('Department', 'department'),
+    ('Vendor', 'vendor.name'),
+    ('Purpose', 'scene_info'),
+    ('Start Rental', 'start_rental_date'),
+    ('End Rental', 'end_rental_date'),
+    ('Rental Type', 'rental_type'),
+    ('Category', 'category'),
+    ('Total Cost', 'total_cost'),
+    ('Purchase Order', 'purchase_order'),
+    ('Quote Number', 'quote_number'),
+]
+
+# Service csv columns
+SERVICE_CSV = [
+    ('Service', 'service'),
+    ('Description', 'description'),
+    ('Total', 'total'),
+    ('Start Date', 'start_service_date'),
+    ('End Date', 'end_service_date'),
+    ('Vendor', 'vendor.name'),
+    ('Service Location', 'service_location'),
+    ('Requestor', 'requestor'),
+    ('Title', 'title'),
+    ('Department', 'department'),
+    ('Purchase Order', 'purchase_order'),
+    ('Payment Type', 'payment_type'),
+]
+
+# Vendor csv columns
+VENDOR_CSV = [
+    ('Vendor Name', 'name'),
+    ('Services', 'services'),
+    ('Address', 'address'),
+    ('Contact', 'contact'),
+    ('Phone', 'phone'),
+    ('Email', 'email'),
+    ('Notes', 'notes'),
+]
+
+# Rental record fields
+RENTAL_FIELDS = [
+    ('Rental Item', 'rental_item'),
+    ('First Name', 'first_name'),
+    ('Last Name', 'last_name'),
+    ('Title', 'title'),
+    ('Department', 'department'),
+    ('Production', 'production'),
+    ('Vendor', 'vendor'),
+    ('Scene Info', 'scene_info'),
+    ('Start Rental Date', 'start_rental_date'),
+    ('End Rental Date', 'end_rental_date'),
+    ('Drop Off Location', 'drop_off_location'),
+    ('Drop Off Time', 'drop_off_time'),
+    ('Pick Up Location', 'pick_up_location'),
+    ('Pick Up Time', 'pick_up_time'),
+    ('Rental Type', 'rental_type'),
+    ('Category', 'category'),
+    ('Additional Tax Fees', 'addl_tax_fees'),
+    ('Total Cost', 'total_cost'),
+    ('Purchase Order', 'purchase_order'),
+    ('Quote Number', 'quote_number'),
+    ('Notes 1', 'notes1'),
+    ('Notes 2', 'notes2'),
+    ('Notes 3', 'notes3'),
+]
+
+# Service record fields
+SERVICE_FIELDS = [
+    ('Service', 'service'),
+    ('Description', 'description'),
+    ('Rate', 'rate'),
+    ('Total', 'total'),
+    ('Start Service Date', 'start_service_date'),
+    ('End Service Date', 'end_service_date'),
+    ('Vendor', 'vendor'),
+    ('Service Location', 'service_location'),
+    ('Requestor', 'requestor'),
+    ('Title', 'title'),
+    ('Production', 'production'),
+    ('Department', 'department'),
+    ('Purchase Order', 'purchase_order'),
+    ('Payment Type', 'payment_type'),
+    ('Notes 1', 'notes1'),
+    ('Notes 2', 'notes2'),
+    ('Notes 3', 'notes3'),
+]
+
+# Vendor record fields
+VENDOR_FIELDS = [
+    ('Vendor Name', 'name'),
+    ('Vendor Services', 'services'),
+    ('Address', 'address'),
+    ('Contact', 'contact'),
+    ('Phone', 'phone'),
+    ('Email', 'email'),
+    ('Agreement Signed', 'agreement_signed'),
+    ('Agreement Date', 'agreement_date'),
+    ('COI Issued', 'COI_issued'),
+    ('Notes', 'notes'),
+]
+
+# Rental pdf table columns
+RENTAL_PDF = [
+    ('Rental Item', 'rental_item', 3),
+    ('Requestor', 'last_name', 2),
+    ('Department', 'department', 2),
+    ('Vendor', 'vendor.name', 2.5),
+    ('Start', 'start_rental_date', 1.5),
+    ('End', 'end_rental_date', 1.5),
+    ('Type', 'rental_type', 1.3),
+    ('Category', 'category', 2),
+    ('PO', 'purchase_order', 1.5),
+    ('Quote #', 'quote_number', 1.5),
+    ('Total Cost', 'total_cost', 1.7),
+]
+
+# Service pdf table columns
+SERVICE_PDF = [
+    ('Service', 'service', 3),
+    ('Requestor', 'requestor', 2),
+    ('Department', 'department', 2),
+    ('Vendor', 'vendor.name', 2.5),
+    ('Location', 'service_location', 2.5),
+    ('Start', 'start_service_date', 1.5),
+    ('End', 'end_service_date', 1.5),
+    ('PO', 'purchase_order', 1.5),
+    ('Payment', 'payment_type', 1.5),
+    ('Rate', 'rate', 1.5),
+    ('Total', 'total', 1.7),
+]
+
+# Vendor pdf table columns
+VENDOR_PDF = [
+    ('Vendor Name', 'name', 2.5),
+    ('Services', 'services', 2.5),
+    ('Address', 'address', 3.5),
+    ('Contact', 'contact', 2),
+    ('Phone', 'phone', 1.5),
+    ('Email', 'email', 2.5),
+    ('Notes', 'notes', 3),
+]
+
+
+def field_value(obj, path):
+    """
+    Follow a dotted attribute path on obj. Returns None when a relation on the
+    way is not set.
+    """
+    for name in path.split('.'):
+        if obj is None:
+            return None
+        obj = getattr(obj, name)
+    return obj
+
+
+def field_text(obj, path):
+    """
+    Text for a field in a report. Empty values print as blank.
+    """
+    value = field_value(obj, path)
+    return '' if value is None else str(value)
@@ -0,0 +1,29 @@
+"""
+Background worker for queued report jobs.
+Run it next to gunicorn: python manage.py run_report_worker
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from rentals.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued report jobs and write the finished files to REPORT_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are queued now and exit.")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            # drop connections the database closed while we slept
+            close_old_connections()
+            count = run_pending()
+            if count:
+                self.stdout.write(f"Ran {count} report job(s).")
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
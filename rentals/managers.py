@@ -0,0 +1,180 @@
+"""
+Custom querysets for the rental application.
+Querysets will include:
+Totals queryset shared by Rental, Service and Vehicle
+List and export projections that load related rows in the same query
+Date columns (weekday, duration, days until and past) worked out in the database
+"""
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Case, Count, F, Func, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+# Date expressions
+class DaysBetween(Func):
+    """
+    Whole days from the first date to the second, as an integer.
+    Postgres and Oracle subtract dates directly, sqlite and MySQL need help.
+    """
+    arity = 2
+    output_field = models.IntegerField()
+
+    def __init__(self, start, end, **extra):
+        # the end date goes first, the SQL reads end - start
+        super().__init__(end, start, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' - ',
+                              **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        (end, end_params), (start, start_params) = (compiler.compile(arg) for arg in self.get_source_expressions())
+        return f'CAST(julianday({end}) - julianday({start}) AS integer)', (*end_params, *start_params)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='DATEDIFF', **extra_context)
+
+
+def weekday_name(field):
+    """
+    Day name of a date column, like date.strftime('%A').
+    """
+    return Case(*[When(**{f'{field}__iso_week_day': number, 'then': Value(name)})
+                  for number, name in enumerate(WEEKDAYS, 1)],
+                output_field=models.CharField())
+
+
+# Totals queryset
+class TotalsQuerySet(models.QuerySet):
+    """
+    Queryset that adds up a money column in the database.
+    Subclasses set total_field to the column that holds the row total.
+    """
+    total_field = None
+    # date columns read by with_dates()
+    start_field = None
+    end_field = None
+    # related rows and columns used by for_list() and for_export()
+    list_related = ()
+    list_fields = ()
+    export_related = ()
+
+    def _sum(self, field):
+        """
+        NULL safe sum of a decimal column. Empty sets and NULL rows add up to 0.
+        """
+        return Coalesce(Sum(field), Value(Decimal('0.00')),
+                        output_field=models.DecimalField(max_digits=12, decimal_places=2))
+
+    def totals(self):
+        """
+        Get the list totals with one aggregate query.
+        Returns a dict with the sum of total_field, the row count and the number
+        of rows that have no total yet.
+        """
+        field = self.total_field
+        # aliases are prefixed so they never clash with a model field like Service.total
+        result = self.order_by().aggregate(
+            _total=self._sum(field),
+            _count=Count('pk'),
+            _unpriced=Count('pk', filter=Q(**{f'{field}__isnull': True})),
+        )
+        return {'total': result['_total'], 'count': result['_count'], 'unpriced': result['_unpriced']}
+
+    def total(self):
+        """
+        Get the sum of total_field for the list.
+        """
+        return self.totals()['total']
+
+    def facet_counts(self, columns):
+        """
+        Get the row count per value of several columns, one small GROUP BY
+        query per column so each returns only that column's distinct values.
+        columns maps each column to the column holding its display name
+        (None to show the value itself).
+        Returns {column: [(value, name, count), ...]} with the most rows first.
+        """
+        counts = {}
+        for column, name in columns.items():
+            paths = [column, name] if name else [column]
+            rows = self.order_by().values(*paths).annotate(_count=Count('pk')).order_by()
+            counts[column] = sorted(((row[column], row[name] if name else row[column], row['_count']) for row in rows),
+                                    key=lambda item: (-item[2], str(item[1])))
+        return counts
+
+    def with_dates(self, today=None):
+        """
+        Annotate the date columns the list tables show, worked out in the query
+        against one today instead of per row in Python:
+        start_weekday, end_weekday, duration_days (end - start), days_until
+        (start - today), days_left (end - today) and days_past (today - end).
+        """
+        if today is None:
+            today = timezone.localdate()
+        today = Value(today, output_field=models.DateField())
+        start, end = F(self.start_field), F(self.end_field)
+        return self.annotate(
+            start_weekday=weekday_name(self.start_field),
+            end_weekday=weekday_name(self.end_field),
+            duration_days=DaysBetween(start, end),
+            days_until=DaysBetween(today, start),
+            days_left=DaysBetween(today, end),
+            days_past=DaysBetween(end, today),
+        )
+
+    def for_list(self, today=None):
+        """
+        Projection for the html list tables. Joins the related rows the table
+        shows, only loads the columns listed in list_fields and annotates the
+        date columns (see with_dates).
+        """
+        return self.select_related(*self.list_related).only(*self.list_fields).with_dates(today)
+
+    def for_export(self):
+        """
+        Projection for the txt/csv/pdf exports. Joins every related row the
+        report prints so writing a row never runs another query.
+        """
+        return self.select_related(*self.export_related)
+
+
+# Rental queryset
+class RentalQuerySet(TotalsQuerySet):
+    """
+    Queryset for rentals. Totals add up total_cost.
+    """
+    total_field = 'total_cost'
+    start_field = 'start_rental_date'
+    end_field = 'end_rental_date'
+    list_related = ('department',)
+    list_fields = ('rental_item', 'first_name', 'last_name', 'scene_info', 'start_rental_date',
+                   'end_rental_date', 'rental_type', 'category', 'total_cost', 'purchase_order',
+                   'quote_number', 'department__department_name')
+    export_related = ('department', 'production', 'vendor')
+
+    def for_category(self, category):
+        """
+        Get the rentals in a category ordered by start date.
+        """
+        return self.filter(category=category).order_by('start_rental_date')
+
+
+# Service queryset
+class ServiceQuerySet(TotalsQuerySet):
+    """
+    Queryset for services. Totals add up total.
+    """
+    total_field = 'total'
+    start_field = 'start_service_date'
+    end_field = 'end_service_date'
+    list_related = ('department', 'vendor')
+    list_fields = ('service', 'description', 'rate', 'total', 'requestor', 'service_location',
+                   'start_service_date', 'end_service_date', 'purchase_order',
+                   'department__department_name', 'vendor__name', 'vendor__services')
+    export_related = ('department', 'production', 'vendor')
@@ -0,0 +1,58 @@
+from django.db import DatabaseError, migrations
+
+IDENTIFIERS = [
+    ('rentals_rental', 'purchase_order'),
+    ('rentals_rental', 'quote_number'),
+    ('rentals_service', 'purchase_order'),
+]
+
+
+def create_extension(apps, schema_editor):
+    """
+    Install pg_trgm unless it is there already. Postgres 13 and later let a
+    user with CREATE on the database install it, older versions need a
+    superuser. Without the rights, have a superuser run
+    CREATE EXTENSION pg_trgm; in the database once and migrate again.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone():
+            return
+    try:
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as error:
+        raise DatabaseError(
+            "The pg_trgm extension is missing and this database user may not install it. "
+            "Have a superuser run CREATE EXTENSION pg_trgm; in this database, then migrate again.") from error
+
+
+# the index SQL is written out here rather than imported from rentals.fuzzy,
+# so later changes to the app do not change what this migration does
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in IDENTIFIERS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table}_{column}_trgm" ON "{table}" USING GIN ("{column}" gin_trgm_ops)')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in IDENTIFIERS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_{column}_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0033_search_document'),
+    ]
+
+    operations = [
+        # both no-ops outside postgres
+        migrations.RunPython(create_extension, migrations.RunPython.noop),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0034_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['vendor', 'rental_item', 'start_rental_date'], name='rental_booking_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-17 18:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0035_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='production',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='production',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# (table, column) of the names the vendor:, department: and production:
+# search tokens match by their start
+NAMES = [
+    ('rentals_vendor', 'name'),
+    ('rentals_department', 'department_name'),
+    ('rentals_production', 'show_name'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    # the same expression Django compiles istartswith to on postgres, with
+    # text_pattern_ops so LIKE 'X%' can use it in any locale
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in NAMES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{table}_{column}_prefix" '
+                              f'ON "{table}" (UPPER("{column}"::text) text_pattern_ops)')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in NAMES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_{column}_prefix"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0036_related_timestamps'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
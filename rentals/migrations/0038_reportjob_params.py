@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0037_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -17,7 +17,10 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
 from reportlab.lib.pagesizes import letter
 from django.utils import timezone
+from django.forms import modelform_factory
+from .bookings import LIMIT, RULES
 from .models import Rental, Vendor
+from .widgets import AutocompleteInput, AutocompleteSelect
 
 
 
@@ -32,17 +35,14 @@ class RentalListMixin:
         """
         Get the queryset of rentals filtered by category.
         """
-        return Rental.objects.filter(category=category)
+        return Rental.objects.for_category(category)
 
     # calculate total cost of rentals
     def calculate_total_cost(self, rentals):
         """
-        Calculate the total cost of rentals.
+        Calculate the total cost of rentals with one aggregate query.
         """
-        total_cost = 0
-        for rental in rentals:
-            total_cost += rental.total_cost
-        return total_cost
+        return rentals.total()
 
     # Render the template with rentals and total cost
     def render_rentals(self, request, rentals, total_cost):
@@ -53,6 +53,25 @@ class RentalListMixin:
         return render(request, 'rental_list.html', context)
 
 
+# Autocomplete widgets on create and update forms
+class AutocompleteFormMixin:
+    """
+    Mixin for CreateView and UpdateView that renders the fields in
+    autocomplete_fields (field name -> autocomplete source) with autocomplete
+    widgets instead of a <select> of the whole table.
+    """
+    autocomplete_fields = {}
+
+    def get_form_class(self):
+        widgets = {}
+        for name, source in self.autocomplete_fields.items():
+            if self.model._meta.get_field(name).is_relation:
+                widgets[name] = AutocompleteSelect(source)
+            else:
+                widgets[name] = AutocompleteInput(source)
+        return modelform_factory(self.model, fields=self.fields, widgets=widgets)
+
+
 
 
 
@@ -77,3 +96,26 @@ class RentalListMixin:
 
 
 
+
+
+# Double-booking check on create and update forms
+class BookingFormMixin:
+    """
+    Mixin for CreateView and UpdateView that refuses a booking overlapping
+    another booking of the same thing (see bookings.py). booking_rule names
+    the rule, form_valid() calls booking_conflicts() before saving.
+    """
+    booking_rule = None
+
+    def booking_conflicts(self, form):
+        """
+        Add a form error listing the overlapping bookings. Returns True when
+        there are any.
+        """
+        rule = RULES[self.booking_rule]
+        exclude = self.object.pk if getattr(self, 'object', None) is not None else None
+        conflicts = list(rule.conflicts(form.cleaned_data, exclude)[:LIMIT])
+        for other in conflicts:
+            start, end = getattr(other, rule.start_field), getattr(other, rule.end_field)
+            form.add_error(None, f"Already booked {start:%b %d, %Y} to {end:%b %d, %Y}: {other}")
+        return bool(conflicts)
@@ -3,13 +3,28 @@ from django.db import models
 import logging
 import datetime
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .managers import RentalQuerySet, ServiceQuerySet
 
 # Create your models here.
 
 logger = logging.getLogger(__name__)
 
 
-class Production(models.Model):
+class TimeStampedModel(models.Model):
+    """
+    Abstract model that records when a row was created and last changed.
+    updated_at is indexed so rows can be looked up by when they changed.
+    """
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        abstract = True
+
+
+class Production(TimeStampedModel):
     logger.error("Production model initialized")
     production_company = models.CharField(max_length=100, default="company")
     show_name = models.CharField(max_length=100, default="show")
@@ -18,7 +33,7 @@ class Production(models.Model):
         return f"{self.production_company} - {self.show_name}"
 
 
-class Department(models.Model):
+class Department(TimeStampedModel):
     logger.error("Department model initialized")
     department_name = models.CharField(max_length=100, default="department")
 
@@ -32,7 +47,7 @@ class VendorCategory(models.Model):
     def __str__(self):
         return self.name
 
-class Vendor(models.Model):
+class Vendor(TimeStampedModel):
     logger.error("Vendor model initialized")
     name = models.CharField(max_length=100, default="vendor")
     category = models.ForeignKey(VendorCategory, on_delete=models.CASCADE, null=True, blank=True)
@@ -45,12 +60,14 @@ class Vendor(models.Model):
     agreement_date = models.DateField(null=True, blank=True)
     COI_issued = models.BooleanField(default=False)
     notes = models.TextField(null=True, blank=True)
+    # text searched by the search views, kept up to date by search.py
+    search_document = models.TextField(blank=True, default='', editable=False)
 
     def __str__(self):
         return f"{self.name} - {self.services}"
 
 
-class Rental(models.Model):
+class Rental(TimeStampedModel):
     rental_item = models.CharField(max_length=100, default="item")
     first_name = models.CharField(max_length=100, default="first")
     last_name = models.CharField(max_length=100, default="last")
@@ -76,6 +93,20 @@ class Rental(models.Model):
     notes1 = models.CharField(max_length=300, null=True, blank=True)
     notes2 = models.CharField(max_length=300, null=True, blank=True)
     notes3 = models.TextField(null=True, blank=True)
+    # text searched by the search views, kept up to date by search.py
+    search_document = models.TextField(blank=True, default='', editable=False)
+
+    objects = RentalQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # category lists filter on category and sort by start date
+            models.Index(fields=['category', 'start_rental_date'], name='rental_category_start_idx'),
+            models.Index(fields=['start_rental_date'], name='rental_start_idx'),
+            # double-booking check of one item from one vendor, see bookings.py
+            models.Index(fields=['vendor', 'rental_item', 'start_rental_date'], name='rental_booking_idx'),
+            models.Index(fields=['purchase_order'], name='rental_po_idx'),
+        ]
 
     def __str__(self):
         return f"{self.rental_item} - {self.department} - {self.vendor}"
@@ -148,7 +179,7 @@ class Rental(models.Model):
 
 
 
-class Service(models.Model):
+class Service(TimeStampedModel):
     service = models.CharField(max_length=100, default="item")
     description = models.TextField(null=True, blank=True)
     rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -166,8 +197,16 @@ class Service(models.Model):
     notes1 = models.CharField(max_length=300, null=True, blank=True)
     notes2 = models.CharField(max_length=300, null=True, blank=True)
     notes3 = models.TextField(null=True, blank=True)
+    # text searched by the search views, kept up to date by search.py
+    search_document = models.TextField(blank=True, default='', editable=False)
 
+    objects = ServiceQuerySet.as_manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_service_date'], name='service_start_idx'),
+            models.Index(fields=['purchase_order'], name='service_po_idx'),
+        ]
 
 
     def __str__(self):
@@ -239,3 +278,55 @@ class Service(models.Model):
                 raise ValidationError("Start date cannot be after end date.")
       
         
+
+
+class ReportJob(models.Model):
+    """
+    A report queued for the background report worker.
+    The worker writes the finished file under settings.REPORT_ROOT.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    report = models.CharField(max_length=100)
+    format = models.CharField(max_length=10, choices=[('csv', 'CSV'), ('txt', 'Text'), ('pdf', 'PDF')])
+    # what to put in the file when the report is a packet (see packets.py)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=[(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')], default=QUEUED)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_done = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=300, null=True, blank=True)
+    filename = models.CharField(max_length=200, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.report} {self.format} - {self.status}"
+
+    @property
+    def progress(self):
+        """ Percent of rows written. """
+        if self.status == self.DONE:
+            return 100
+        if self.rows_total:
+            return min(99, self.rows_done * 100 // self.rows_total)
+        return 0
+
+
+class DataVersion(models.Model):
+    """
+    Change counter for a table, bumped on every save and delete.
+    Cached reports are keyed on the versions of the tables they print, and
+    the list and detail pages take their ETag and Last-Modified from them.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=1)
+    # when the version last moved
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,86 @@
+"""
+Paperwork packets: the detail pdf of many rentals, services or vehicles as
+one multi-page file, drawn in a single pass on one canvas.
+Records are picked by id or by a search box entry (see query_parser.py).
+Small packets are drawn in the request. Larger ones are queued as a
+ReportJob and drawn by the report worker (see jobs.py), which reads the
+records in chunks and draws each page as it goes.
+"""
+import tempfile
+
+from .documents import rental_pdf_lines, service_pdf_lines
+from .models import Rental, Service
+from .pdf import write_packet_pdf
+from .query_parser import RENTAL_QUERY, SERVICE_QUERY, apply_query
+
+# packets with more records than this are queued for the report worker
+QUEUE_AFTER = 500
+# packet files larger than this are spooled to disk instead of memory
+SPOOL_SIZE = 1024 * 1024
+
+# packet types by name
+PACKETS = {}
+
+
+class PacketType:
+    """
+    Records that can go in a packet. queryset is a callable returning them
+    with the related rows their pages print, lines builds one page, spec is
+    the QuerySpec for picking records with a search box entry and order the
+    field they are sorted by.
+    """
+
+    def __init__(self, name, queryset, lines, spec, order, filename):
+        self.name = name
+        self.queryset = queryset
+        self.lines = lines
+        self.spec = spec
+        self.order = order
+        self.filename = filename
+
+    def select(self, ids=None, query=None):
+        """
+        Records by id, or matching a search box entry, in date order.
+        """
+        queryset = self.queryset()
+        if ids:
+            queryset = queryset.filter(pk__in=ids)
+        if query:
+            queryset = apply_query(queryset, query, self.spec)
+        return queryset.order_by(self.order, 'pk')
+
+
+def register(packet):
+    """
+    Add a packet type.
+    """
+    PACKETS[packet.name] = packet
+    return packet
+
+
+def parse_ids(values):
+    """
+    Record ids from id=1&id=2 or ids=1,2,3 parameters, skipping junk.
+    """
+    ids = []
+    for value in values:
+        ids += [int(part) for part in value.split(',') if part.strip().isdigit()]
+    return ids
+
+
+def packet_file(pages):
+    """
+    The whole packet as one pdf in a spooled temp file.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    write_packet_pdf(pages, output)
+    output.seek(0)
+    return output
+
+
+RELATED = ('department', 'production', 'vendor')
+
+register(PacketType('rentals', lambda: Rental.objects.select_related(*RELATED), rental_pdf_lines, RENTAL_QUERY,
+                    'start_rental_date', 'rental_packet'))
+register(PacketType('services', lambda: Service.objects.select_related(*RELATED), service_pdf_lines,
+                    SERVICE_QUERY, 'start_service_date', 'service_packet'))
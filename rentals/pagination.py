@@ -0,0 +1,234 @@
+"""
+Keyset pagination for the list and search pages.
+Instead of OFFSET, each page link carries a cursor with the sort values of
+the last (or first) row shown, and the next page is read with a WHERE on those
+values. Every page costs the same as the first one and rows do not shift
+between pages when someone adds a rental in the middle of the list.
+"""
+import base64
+import binascii
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+# rows per page
+PER_PAGE = 50
+
+
+class KeysetPage:
+    """
+    One page of rows with the query strings of the pages around it.
+    """
+
+    def __init__(self, object_list, params, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.params = params
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def page_query(self, key, cursor):
+        """
+        Query string for another page, keeping the search and filter parameters.
+        """
+        params = self.params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[key] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self.page_query('after', self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self.page_query('before', self.previous_cursor)
+
+
+class SortKey:
+    """
+    One column of the keyset: a model field or an annotation such as the
+    search rank, in ascending or descending order.
+    """
+
+    def __init__(self, name, field=None, descending=False):
+        self.name = name
+        self.field = field
+        self.descending = descending
+        self.attname = field.attname if field else name
+        self.null = field.null if field else False
+
+    def to_python(self, value):
+        return self.field.to_python(value) if self.field else value
+
+
+def sort_keys(queryset, ordering):
+    """
+    SortKeys for ordering names ('-' for descending) plus the primary key.
+    """
+    opts = queryset.model._meta
+    keys = []
+    for name in ordering:
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            if name not in queryset.query.annotations:
+                raise
+            field = None
+        keys.append(SortKey(name, field, descending))
+    keys.append(SortKey(opts.pk.name, opts.pk))
+    return keys
+
+
+def encode_cursor(row, fields):
+    """
+    Cursor text for a row: its sort values as url safe base64 json.
+    """
+    values = [getattr(row, field.attname) for field in fields]
+    data = json.dumps(values, cls=DjangoJSONEncoder).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """
+    Sort values from a cursor, or None when the cursor is missing or broken.
+    """
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [None if value is None else field.to_python(value) for field, value in zip(fields, values)]
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+
+
+def beyond(field, value, backwards):
+    """
+    Condition for rows that sort after value, or before it when going
+    backwards. Empty values sort last. Returns None when no row can.
+    """
+    name = field.name
+    later, earlier = ('lt', 'gt') if field.descending else ('gt', 'lt')
+    if backwards:
+        if value is None:
+            return Q(**{f'{name}__isnull': False}) if field.null else None
+        return Q(**{f'{name}__{earlier}': value})
+    if value is None:
+        return None
+    condition = Q(**{f'{name}__{later}': value})
+    if field.null:
+        condition |= Q(**{f'{name}__isnull': True})
+    return condition
+
+
+def keyset_filter(fields, values, backwards=False):
+    """
+    Rows past the cursor values in sort order: (a > x) or (a = x and b > y) or ...
+    """
+    conditions = []
+    equal = Q()
+    for field, value in zip(fields, values):
+        condition = beyond(field, value, backwards)
+        if condition is not None:
+            conditions.append(equal & condition)
+        equal &= Q(**{f'{field.name}__isnull': True}) if value is None else Q(**{field.name: value})
+    return reduce(operator.or_, conditions)
+
+
+def keyset_order_by(fields, backwards=False):
+    """
+    order_by arguments matching keyset_filter.
+    """
+    ordering = []
+    for field in fields:
+        # going backwards reads the list upside down
+        descending = field.descending != backwards
+        nulls = {'nulls_first': True} if backwards else {'nulls_last': True}
+        expression = F(field.name)
+        expression = expression.desc if descending else expression.asc
+        ordering.append(expression(**nulls) if field.null else expression())
+    return ordering
+
+
+def keyset_page(request, queryset, ordering, per_page=PER_PAGE):
+    """
+    The page of queryset asked for by the after/before cursor in the request.
+    ordering is the sort fields or annotations, '-' for descending; the
+    primary key is added to break ties.
+    """
+    fields = sort_keys(queryset, ordering)
+    after = decode_cursor(request.GET.get('after'), fields)
+    before = decode_cursor(request.GET.get('before'), fields) if after is None else None
+    backwards = before is not None
+    cursor = before if backwards else after
+    if cursor is not None:
+        queryset = queryset.filter(keyset_filter(fields, cursor, backwards))
+    # one extra row tells us if there is another page
+    rows = list(queryset.order_by(*keyset_order_by(fields, backwards))[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_next, has_previous = True, more
+    else:
+        has_next, has_previous = more, cursor is not None
+    page = KeysetPage(rows, request.GET)
+    if rows:
+        if has_next:
+            page.next_cursor = encode_cursor(rows[-1], fields)
+        if has_previous:
+            page.previous_cursor = encode_cursor(rows[0], fields)
+    return page
+
+
+class KeysetListMixin:
+    """
+    ListView mixin that shows one keyset page of the queryset. Totals worked
+    out in get_queryset still cover every matching row.
+    """
+    keyset_ordering = ()
+    per_page = PER_PAGE
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def get_context_data(self, **kwargs):
+        page = keyset_page(self.request, self.object_list, self.get_keyset_ordering(), self.per_page)
+        context = super().get_context_data(object_list=page.object_list, **kwargs)
+        context['page'] = page
+        return context
+
+
+class SearchListMixin(KeysetListMixin):
+    """
+    KeysetListMixin for the search views. With a full text search the best
+    matches come first, then keyset_ordering breaks ties.
+    """
+
+    def get_keyset_ordering(self):
+        if 'search_rank' in self.object_list.query.annotations:
+            return ('-search_rank',) + tuple(self.keyset_ordering)
+        return self.keyset_ordering
@@ -0,0 +1,181 @@
+"""
+PDF report engine for the rental application.
+Reports are drawn row by row as a table with a heading on every page, page
+breaks when a page fills up, and page, running and grand totals at the bottom.
+ReportLab keeps every page of a document in memory until the canvas is saved,
+so building a report takes memory in step with its page count. The finished
+file is written straight into the report cache (see cache.py).
+"""
+import datetime
+from decimal import Decimal
+
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from .layouts import field_value
+
+def money(value):
+    """
+    Money with a dollar sign and cents, blank when there is no amount.
+    """
+    if value is None:
+        return ''
+    return f"${value:,.2f}"
+
+
+def cell_text(value):
+    """
+    Text for a table cell. Money prints with a dollar sign and cents.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, Decimal):
+        return money(value)
+    return str(value)
+
+
+class PDFReport:
+    """
+    Table report that lays out one row per record.
+    columns is a list of (heading, attribute path, width weight) and
+    total_path is the money field added up in the totals.
+    """
+    font = 'Helvetica'
+    bold_font = 'Helvetica-Bold'
+    font_size = 8
+    row_height = 14
+    margin = 0.5 * inch
+
+    def __init__(self, title, columns, total_path=None, pagesize=landscape(letter)):
+        self.title = title
+        self.columns = columns
+        self.total_path = total_path
+        self.width, self.height = pagesize
+        self.pagesize = pagesize
+        # scale the column weights to the printable width
+        usable = self.width - 2 * self.margin
+        weight = sum(column[2] for column in columns)
+        self.widths = [usable * column[2] / weight for column in columns]
+        self.printed = datetime.date.today()
+
+    def fit(self, text, width, font=None):
+        """
+        Cut text down so it fits inside a column.
+        """
+        font = font or self.font
+        limit = width - 4
+        if stringWidth(text, font, self.font_size) <= limit:
+            return text
+        while text and stringWidth(text + '...', font, self.font_size) > limit:
+            text = text[:-1]
+        return text + '...'
+
+    def draw_row(self, p, y, values, font=None):
+        """
+        Draw one table row at height y. Money is right aligned.
+        """
+        font = font or self.font
+        p.setFont(font, self.font_size)
+        x = self.margin
+        for value, width in zip(values, self.widths):
+            text = self.fit(cell_text(value), width, font)
+            if isinstance(value, Decimal):
+                p.drawRightString(x + width - 2, y, text)
+            else:
+                p.drawString(x + 2, y, text)
+            x += width
+
+    def start_page(self, p, page, carried):
+        """
+        Draw the page heading and the table heading. Returns the y of the first row.
+        """
+        top = self.height - self.margin
+        p.setFont(self.bold_font, 14)
+        p.drawString(self.margin, top - 14, self.title)
+        p.setFont(self.font, self.font_size)
+        p.drawRightString(self.width - self.margin, top - 14, f"Printed {self.printed}  -  Page {page}")
+        y = top - 36
+        self.draw_row(p, y, [column[0] for column in self.columns], self.bold_font)
+        p.line(self.margin, y - 4, self.width - self.margin, y - 4)
+        y -= self.row_height
+        if page > 1 and self.total_path:
+            p.setFont(self.font, self.font_size)
+            p.drawRightString(self.width - self.margin, y, f"Brought forward: {cell_text(carried)}")
+            y -= self.row_height
+        return y
+
+    def finish_page(self, p, page_total, running_total):
+        """
+        Draw the page total and running total under the table.
+        """
+        if not self.total_path:
+            return
+        y = self.margin
+        p.line(self.margin, y + self.row_height - 4, self.width - self.margin, y + self.row_height - 4)
+        p.setFont(self.bold_font, self.font_size)
+        p.drawRightString(self.width - self.margin, y,
+                          f"Page total: {cell_text(page_total)}    Running total: {cell_text(running_total)}")
+
+    def build(self, rows, output):
+        """
+        Draw every row into output, starting a new page whenever one fills up.
+        """
+        p = canvas.Canvas(output, pagesize=self.pagesize)
+        p.setTitle(self.title)
+        page = 1
+        count = 0
+        running_total = Decimal('0.00')
+        page_total = Decimal('0.00')
+        # leave room for the totals line at the bottom
+        bottom = self.margin + 2 * self.row_height
+        y = self.start_page(p, page, running_total)
+        for row in rows:
+            if y < bottom:
+                self.finish_page(p, page_total, running_total)
+                p.showPage()
+                page += 1
+                page_total = Decimal('0.00')
+                y = self.start_page(p, page, running_total)
+            self.draw_row(p, y, [field_value(row, column[1]) for column in self.columns])
+            if self.total_path:
+                amount = field_value(row, self.total_path) or 0
+                page_total += amount
+                running_total += amount
+            count += 1
+            y -= self.row_height
+        self.finish_page(p, page_total, running_total)
+        # record count and grand total on the last page, left of the page totals
+        p.setFont(self.bold_font, self.font_size)
+        summary = f"{count} records"
+        if self.total_path:
+            summary += f"    Grand total: {cell_text(running_total)}"
+        p.drawString(self.margin, self.margin, summary)
+        p.showPage()
+        p.save()
+
+
+def write_detail_pdf(lines, output):
+    """
+    Single page detail document of one record, one line of text per line.
+    """
+    write_packet_pdf([lines], output)
+
+
+def write_packet_pdf(pages, output):
+    """
+    Detail documents of many records in one file, a page per record. The
+    canvas, its font and the document resources are set up once and shared
+    by every page.
+    """
+    p = canvas.Canvas(output, pagesize=letter, bottomup=0)
+    for lines in pages:
+        textob = p.beginText()
+        textob.setTextOrigin(inch, inch)
+        textob.setFont("Helvetica", 14)
+        for line in lines:
+            textob.textLine(line)
+        p.drawText(textob)
+        p.showPage()
+    p.save()
@@ -0,0 +1,180 @@
+"""
+Search box query parsing for the rental application.
+Structured tokens are turned into plain column comparisons the database can
+answer from its indexes, and whatever is left over goes to the full text
+search (search.py):
+
+    >500  <=1,200  =250       amount comparisons
+    100..250  ..99            amount ranges, either end can be left open
+    2025-03-01..2025-03-31    on rental at any point in the date range
+    2025-03-05                on rental that day
+    start:2025-03-01..        start (or end:) date in a range
+    category:set_equipment    exact column value
+    vendor:"Acme Grip"        related name starts with, quotes for names with spaces
+
+A token that does not parse (an unknown key, a bad number or date) is kept
+as free text.
+"""
+import datetime
+import re
+import shlex
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.apps import apps
+from django.db.models import Q
+
+from .search import search
+
+NUMBER = r'\$?-?\d[\d,]*(?:\.\d+)?'
+DATE = r'\d{4}-\d{2}-\d{2}'
+
+comparison_re = re.compile(rf'^(>=|<=|>|<|=)({NUMBER})$')
+number_range_re = re.compile(rf'^({NUMBER})?\.\.({NUMBER})?$')
+date_range_re = re.compile(rf'^({DATE})?\.\.({DATE})?$')
+date_re = re.compile(rf'^{DATE}$')
+
+LOOKUPS = {'>': 'gt', '>=': 'gte', '<': 'lt', '<=': 'lte', '=': 'exact'}
+
+ParsedQuery = namedtuple('ParsedQuery', 'filters text')
+
+
+class QuerySpec:
+    """
+    What the tokens mean for one model. amount is the money column, start and
+    end the date columns. fields maps keys to columns compared exactly and
+    related maps keys to a (relation, related model, name field) matched by
+    the start of the name.
+    """
+
+    def __init__(self, amount, start, end, fields=None, related=None):
+        self.amount = amount
+        self.start = start
+        self.end = end
+        self.fields = fields or {}
+        self.related = related or {}
+
+
+def to_decimal(text):
+    if not text:
+        return None
+    return Decimal(text.replace('$', '').replace(',', ''))
+
+
+def to_date(text):
+    if not text:
+        return None
+    return datetime.date.fromisoformat(text)
+
+
+def between(field, low, high):
+    """
+    field within low..high, either end can be None.
+    """
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lte': high})
+    return condition
+
+
+def compile_token(token, spec):
+    """
+    Q for one structured token, or None when the token is free text.
+    """
+    if match := comparison_re.match(token):
+        return Q(**{f'{spec.amount}__{LOOKUPS[match[1]]}': to_decimal(match[2])})
+    if (match := number_range_re.match(token)) and (match[1] or match[2]):
+        low, high = to_decimal(match[1]), to_decimal(match[2])
+        return between(spec.amount, low, high)
+    if (match := date_range_re.match(token)) and (match[1] or match[2]):
+        low, high = to_date(match[1]), to_date(match[2])
+        # on rental at any point in the range
+        condition = Q()
+        if high is not None:
+            condition &= Q(**{f'{spec.start}__lte': high})
+        if low is not None:
+            condition &= Q(**{f'{spec.end}__gte': low})
+        return condition
+    if date_re.match(token):
+        day = to_date(token)
+        return Q(**{f'{spec.start}__lte': day, f'{spec.end}__gte': day})
+    key, sep, value = token.partition(':')
+    key = key.lower()
+    if not sep or not value:
+        return None
+    if key in ('start', 'end'):
+        field = spec.start if key == 'start' else spec.end
+        if match := date_range_re.match(value):
+            return between(field, to_date(match[1]), to_date(match[2]))
+        if date_re.match(value):
+            return Q(**{field: to_date(value)})
+        return None
+    if key in spec.fields:
+        return Q(**{spec.fields[key]: value})
+    if key in spec.related:
+        relation, label, name = spec.related[key]
+        # names to ids on the small related table (prefix index on postgres,
+        # see migration 0037), then the foreign key index of this table
+        ids = apps.get_model(label).objects.filter(**{f'{name}__istartswith': value}).values('pk')
+        return Q(**{f'{relation}_id__in': ids})
+    return None
+
+
+def split_tokens(query):
+    try:
+        return shlex.split(query)
+    except ValueError:
+        # unbalanced quote
+        return query.split()
+
+
+def parse_query(query, spec):
+    """
+    Split a search box entry into a Q of the structured tokens and the
+    leftover free text.
+    """
+    filters = Q()
+    words = []
+    for token in split_tokens(query):
+        try:
+            condition = compile_token(token, spec)
+        except (InvalidOperation, ValueError):
+            condition = None
+        if condition is None:
+            words.append(token)
+        else:
+            filters &= condition
+    return ParsedQuery(filters, ' '.join(words))
+
+
+def apply_query(queryset, query, spec):
+    """
+    Filter a queryset by a search box entry. Free text goes through the full
+    text search and brings its search_rank annotation along.
+    """
+    parsed = parse_query(query, spec)
+    queryset = queryset.filter(parsed.filters)
+    if parsed.text:
+        queryset = search(queryset, parsed.text)
+    return queryset
+
+
+# name tokens shared by the rental, service and vehicle searches
+RELATED_NAMES = {
+    'vendor': ('vendor', 'rentals.Vendor', 'name'),
+    'department': ('department', 'rentals.Department', 'department_name'),
+    'production': ('production', 'rentals.Production', 'show_name'),
+}
+
+RENTAL_QUERY = QuerySpec(
+    'total_cost', 'start_rental_date', 'end_rental_date',
+    fields={'category': 'category', 'type': 'rental_type', 'payment': 'payment_type', 'po': 'purchase_order',
+            'quote': 'quote_number'},
+    related=RELATED_NAMES)
+
+SERVICE_QUERY = QuerySpec(
+    'total', 'start_service_date', 'end_service_date',
+    fields={'payment': 'payment_type', 'po': 'purchase_order'},
+    related=RELATED_NAMES)
@@ -0,0 +1,105 @@
+"""
+Report registry for the rental application.
+Every downloadable list report is registered here by name with its queryset
+and its csv, text and pdf layouts, so views and the background report worker
+build the same file the same way.
+"""
+from .exports import buffered, csv_lines, iter_rows, text_lines
+from .layouts import (RENTAL_CSV, RENTAL_FIELDS, RENTAL_PDF, SERVICE_CSV, SERVICE_FIELDS,
+                      SERVICE_PDF, VENDOR_CSV, VENDOR_FIELDS, VENDOR_PDF)
+from .models import Rental, Service, Vendor
+from .pdf import PDFReport
+
+FORMATS = ('csv', 'txt', 'pdf')
+
+# tables printed in the rental and service reports
+RENTAL_TABLES = ('rentals.rental', 'rentals.department', 'rentals.production', 'rentals.vendor')
+SERVICE_TABLES = ('rentals.service', 'rentals.department', 'rentals.production', 'rentals.vendor')
+
+# registered reports by name
+REPORTS = {}
+
+
+class Report:
+    """
+    A list report. queryset is a callable so the query runs when the report
+    is built, not when it is registered.
+    """
+
+    def __init__(self, name, title, queryset, csv=None, txt=None, pdf=None, total_path=None, filename=None,
+                 depends_on=()):
+        self.name = name
+        self.title = title
+        self.queryset = queryset
+        self.layouts = {'csv': csv, 'txt': txt, 'pdf': pdf}
+        self.total_path = total_path
+        self.filename = filename or f"{name}_report"
+        # model labels whose changes make a cached copy of this report stale
+        self.depends_on = depends_on
+
+    @property
+    def formats(self):
+        return [fmt for fmt in FORMATS if self.layouts[fmt]]
+
+    def get_queryset(self):
+        return self.queryset()
+
+    def get_filename(self, fmt):
+        return f"{self.filename}.{fmt}"
+
+    def write(self, fmt, output, rows=None):
+        """
+        Write the report in fmt to a binary file. rows defaults to a chunked
+        read of the queryset.
+        """
+        if rows is None:
+            rows = iter_rows(self.get_queryset())
+        if fmt == 'pdf':
+            PDFReport(self.title, self.layouts['pdf'], self.total_path).build(rows, output)
+            return
+        for chunk in self.chunks(fmt, rows):
+            output.write(chunk)
+
+    def chunks(self, fmt, rows=None):
+        """
+        Generate the csv or text report as byte chunks.
+        """
+        if rows is None:
+            rows = iter_rows(self.get_queryset())
+        layout = self.layouts[fmt]
+        lines = csv_lines(layout, rows) if fmt == 'csv' else text_lines(layout, rows)
+        return buffered(lines)
+
+
+def register(report):
+    """
+    Add a report to the registry.
+    """
+    REPORTS[report.name] = report
+    return report
+
+
+def get_report(name):
+    """
+    Look up a registered report. Raises KeyError for unknown names.
+    """
+    return REPORTS[name]
+
+
+register(Report('rentals', 'RENTAL LIST', lambda: Rental.objects.for_export().order_by('start_rental_date'),
+                csv=RENTAL_CSV, txt=RENTAL_FIELDS, pdf=RENTAL_PDF, total_path='total_cost',
+                filename='rental_report', depends_on=RENTAL_TABLES))
+
+for category, label in Rental._meta.get_field('category').choices:
+    register(Report(category, f"{label.replace('_', ' ').upper()} RENTAL LIST",
+                    lambda category=category: Rental.objects.for_category(category).for_export(),
+                    csv=RENTAL_CSV, txt=RENTAL_FIELDS, pdf=RENTAL_PDF, total_path='total_cost',
+                    depends_on=RENTAL_TABLES))
+
+register(Report('services', 'SERVICE LIST', lambda: Service.objects.for_export().order_by('start_service_date'),
+                csv=SERVICE_CSV, txt=SERVICE_FIELDS, pdf=SERVICE_PDF, total_path='total',
+                filename='service_report', depends_on=SERVICE_TABLES))
+
+register(Report('vendors', 'VENDOR LIST', lambda: Vendor.objects.order_by('name'),
+                csv=VENDOR_CSV, txt=VENDOR_FIELDS, pdf=VENDOR_PDF, filename='vendor_list',
+                depends_on=('rentals.vendor',)))
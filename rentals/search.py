@@ -0,0 +1,249 @@
+"""
+Full text search for the rental application.
+Each searchable model keeps a search_document column with the text of the
+fields people search on, including joined names like the vendor and the
+department, so a search reads one table instead of OR-ing LIKEs over joins.
+The document is rebuilt when the row is saved and when a related row it
+copies text from is renamed. The receivers are connected per model when it
+is registered, so saves of other models never reach them.
+
+On Postgres the column has a GIN index on its tsvector. On SQLite it is
+mirrored into an FTS5 table kept in sync by triggers. Results come back with
+a search_rank annotation, higher is better. Other databases fall back to
+LIKE on the document.
+"""
+import re
+from functools import lru_cache
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import FloatField, Func, F, Value
+from django.db.models.signals import post_save, pre_save
+from django.db.models.expressions import RawSQL
+
+from .layouts import field_text
+
+# text search configuration used for the Postgres index and queries
+SEARCH_CONFIG = 'english'
+
+# fields copied into each search document
+RENTAL_SEARCH = ['rental_item', 'first_name', 'last_name', 'title', 'category', 'rental_type', 'total_cost',
+                 'purchase_order', 'quote_number', 'department.department_name', 'vendor.name']
+SERVICE_SEARCH = ['service', 'requestor', 'title', 'purchase_order', 'department.department_name', 'vendor.name']
+VENDOR_SEARCH = ['name', 'services', 'contact', 'category.name']
+
+# searchable models by label, with the paths in their search document
+SEARCH_PATHS = {}
+
+
+def register(label, paths):
+    """
+    Make a model searchable. label is 'app_label.ModelName'.
+    """
+    label = label.lower()
+    SEARCH_PATHS[label] = paths
+    dependents.cache_clear()
+    model = apps.get_model(label)
+    pre_save.connect(document_changed, sender=model, dispatch_uid=f'search_document_{label}')
+    for relation in {path.split('.')[0] for path in paths if '.' in path}:
+        related = model._meta.get_field(relation).related_model
+        related_label = related._meta.label_lower
+        pre_save.connect(related_saving, sender=related, dispatch_uid=f'search_related_old_{related_label}')
+        post_save.connect(related_changed, sender=related, dispatch_uid=f'search_related_{related_label}')
+
+
+def build_document(obj, paths):
+    """
+    Search document text for a row.
+    """
+    return ' '.join(text for text in (field_text(obj, path) for path in paths) if text)
+
+
+@lru_cache(maxsize=None)
+def dependents(label):
+    """
+    (model, relation, paths, copied) for every searchable model whose
+    document copies text from the model with this label. copied are the
+    paths of that text on the related row.
+    """
+    found = []
+    for searchable, paths in SEARCH_PATHS.items():
+        model = apps.get_model(searchable)
+        for relation in sorted({path.split('.')[0] for path in paths if '.' in path}):
+            if model._meta.get_field(relation).related_model._meta.label_lower == label:
+                copied = [path.split('.', 1)[1] for path in paths if path.startswith(f'{relation}.')]
+                found.append((model, relation, paths, copied))
+    return found
+
+
+def copied_text(instance):
+    """
+    Text a row lends to the search documents of other models, by path.
+    """
+    return {path: field_text(instance, path)
+            for _, _, _, copied in dependents(instance._meta.label_lower) for path in copied}
+
+
+def document_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    pre_save handler that rebuilds the search document of a searchable row.
+    """
+    if raw:
+        return
+    if update_fields is not None and 'search_document' not in update_fields:
+        return
+    instance.search_document = build_document(instance, SEARCH_PATHS[sender._meta.label_lower])
+
+
+def related_saving(sender, instance, raw=False, **kwargs):
+    """
+    pre_save handler that keeps the text a saved row lent to other search
+    documents before the save, so related_changed can tell a rename.
+    """
+    if raw or instance.pk is None:
+        return
+    old = sender._default_manager.filter(pk=instance.pk).first()
+    if old is not None:
+        instance._search_copied = copied_text(old)
+
+
+def related_changed(sender, instance, created=False, raw=False, **kwargs):
+    """
+    post_save handler that rebuilds the documents that copy text from a
+    renamed vendor, department or category. Saves that leave that text as it
+    was rebuild nothing.
+    """
+    old = instance.__dict__.pop('_search_copied', None)
+    if raw or created:
+        # a new row has nothing pointing at it yet
+        return
+    for model, relation, paths, copied in dependents(sender._meta.label_lower):
+        if old is not None and all(old[path] == field_text(instance, path) for path in copied):
+            continue
+        refresh_documents(model.objects.filter(**{relation: instance}), paths)
+
+
+def refresh_documents(queryset, paths, batch_size=500):
+    """
+    Rebuild the search documents of every row in queryset.
+    """
+    related = sorted({path.rsplit('.', 1)[0] for path in paths if '.' in path})
+    batch = []
+    for row in queryset.select_related(*related).iterator(chunk_size=batch_size):
+        row.search_document = build_document(row, paths)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            queryset.model.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    if batch:
+        queryset.model.objects.bulk_update(batch, ['search_document'])
+
+
+def search_terms(text):
+    """
+    Words in a search box entry, lower case.
+    """
+    return re.findall(r'\w+', text.lower())
+
+
+def fts_table(table):
+    return f"{table}_fts"
+
+
+class Document(Func):
+    """
+    to_tsvector of the search document, written exactly like the expression
+    the GIN index is built on so Postgres uses the index.
+    """
+    template = f"to_tsvector('{SEARCH_CONFIG}'::regconfig, %(expressions)s)"
+
+    def __init__(self, **extra):
+        from django.contrib.postgres.search import SearchVectorField
+        super().__init__(F('search_document'), output_field=SearchVectorField(), **extra)
+
+
+def search(queryset, text):
+    """
+    Rows of queryset that contain every word of text (as a prefix, so a
+    partly typed word still matches), annotated with search_rank.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        query = SearchQuery(' & '.join(f"{term}:*" for term in terms), config=SEARCH_CONFIG, search_type='raw')
+        return (queryset.annotate(search_rank=SearchRank(Document(), query))
+                .alias(document=Document()).filter(document=query))
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite' and has_fts(connection, table):
+        fts = fts_table(table)
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # bm25 is lower for better matches, flip it so higher is better everywhere
+        rank = RawSQL(f'SELECT -bm25("{fts}") FROM "{fts}" WHERE "{fts}" MATCH %s AND rowid = "{table}"."id"',
+                      [match], output_field=FloatField())
+        ids = RawSQL(f'SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s', [match])
+        return queryset.filter(pk__in=ids).annotate(search_rank=rank)
+    for term in terms:
+        queryset = queryset.filter(search_document__icontains=term)
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+# (database alias, table) -> whether the FTS5 table exists
+_fts_tables = {}
+
+
+def has_fts(connection, table):
+    """
+    Check if the FTS5 table for table exists (SQLite builds without FTS5 skip it).
+    """
+    key = (connection.alias, table)
+    if key not in _fts_tables:
+        _fts_tables[key] = fts_table(table) in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+######### FTS TRIGGERS #########
+
+def create_fts_triggers(execute, table):
+    """
+    Triggers that copy search_document changes into the FTS5 table, then a
+    rebuild of the FTS5 index from the table.
+    """
+    fts = fts_table(table)
+    execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_insert" AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, search_document) VALUES (new.id, new.search_document); END')
+    execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_delete" AFTER DELETE ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, search_document) VALUES (\'delete\', old.id, old.search_document); END')
+    execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_update" AFTER UPDATE ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, search_document) VALUES (\'delete\', old.id, old.search_document); '
+        f'INSERT INTO "{fts}"(rowid, search_document) VALUES (new.id, new.search_document); END')
+    execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+
+
+def restore_fts_triggers(sender, using, **kwargs):
+    """
+    post_migrate handler. SQLite migrations that rebuild a table drop its
+    triggers, so put back any that went missing and rebuild that FTS index.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        for label in SEARCH_PATHS:
+            table = apps.get_model(label)._meta.db_table
+            fts = fts_table(table)
+            _fts_tables[(using, table)] = fts in existing
+            if fts in existing and f"{fts}_update" not in existing:
+                create_fts_triggers(cursor.execute, table)
+
+
+register('rentals.Rental', RENTAL_SEARCH)
+register('rentals.Service', SERVICE_SEARCH)
+register('rentals.Vendor', VENDOR_SEARCH)
@@ -0,0 +1,56 @@
+"""
+Signal handlers for the rental application.
+Every save or delete on a table that shows up in a report bumps that table's
+data version, which retires the cached copies of the reports that print it.
+Saves also keep the search documents (see search.py) and the loaded
+autocomplete and fuzzy lookup indexes (see autocomplete.py and fuzzy.py) up
+to date, and deletes drop the cached detail documents of the deleted row
+(see documents.py).
+Connected in RentalsConfig.ready().
+"""
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+from . import autocomplete, documents, fuzzy, search
+from .cache import bump_version
+
+# tables printed in reports
+VERSIONED_MODELS = [
+    'rentals.Rental',
+    'rentals.Service',
+    'rentals.Vendor',
+    'rentals.Department',
+    'rentals.Production',
+    'vehicles.Vehicle',
+]
+
+# models with cached detail documents (see documents.py)
+DOCUMENT_MODELS = [
+    'rentals.Rental',
+    'rentals.Service',
+    'vehicles.Vehicle',
+]
+
+
+def data_changed(sender, **kwargs):
+    """
+    Bump the data version of the table that was written.
+    """
+    if kwargs.get('raw'):
+        # loading fixtures
+        return
+    bump_version(sender._meta.label_lower)
+
+
+def connect():
+    for model in VERSIONED_MODELS:
+        post_save.connect(data_changed, sender=model, dispatch_uid=f'data_version_save_{model}')
+        post_delete.connect(data_changed, sender=model, dispatch_uid=f'data_version_delete_{model}')
+    for model in DOCUMENT_MODELS:
+        post_delete.connect(documents.record_deleted, sender=model, dispatch_uid=f'documents_delete_{model}')
+    # the search document receivers are connected by search.register()
+    post_migrate.connect(search.restore_fts_triggers, dispatch_uid='search_fts_triggers')
+    # after data_changed, the indexes remember the version they are at
+    post_save.connect(autocomplete.record_saved, dispatch_uid='autocomplete_save')
+    post_delete.connect(autocomplete.record_deleted, dispatch_uid='autocomplete_delete')
+    post_save.connect(fuzzy.record_saved, dispatch_uid='fuzzy_save')
+    post_delete.connect(fuzzy.record_deleted, dispatch_uid='fuzzy_delete')
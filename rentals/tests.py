@@ -1,3 +1,1067 @@
-from django.test import TestCase
+import datetime
+import gzip
+import io
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .bundle import bundle_members
+from .cache import bump_version, cached_file
+from .reports import REPORTS
+from .jobs import run_pending
+from .models import Production, Department, Vendor, Rental, Service, ReportJob
+from . import autocomplete, documents, fuzzy, global_search, packets
+from .bookings import RULES
+from .timeline import daily, timeline
+from .query_parser import RENTAL_QUERY, apply_query, parse_query
+from .search import search
+
 
 # Create your tests here.
+
+def make_rentals(count, category='main_equipment'):
+    """
+    Create rentals that each have their own department, production and vendor,
+    so a missing join shows up as one extra query per row.
+    """
+    today = datetime.date.today()
+    for i in range(count):
+        Rental.objects.create(
+            rental_item=f"item {i}",
+            department=Department.objects.create(department_name=f"department {i}"),
+            production=Production.objects.create(show_name=f"show {i}"),
+            vendor=Vendor.objects.create(name=f"vendor {i}", address="address", phone="555", email="v@example.com"),
+            start_rental_date=today,
+            end_rental_date=today + datetime.timedelta(days=i),
+            category=category,
+            total_cost=100,
+        )
+
+
+def make_services(count):
+    """
+    Create services that each have their own department, production and vendor.
+    """
+    today = datetime.date.today()
+    for i in range(count):
+        Service.objects.create(
+            service=f"service {i}",
+            department=Department.objects.create(department_name=f"department {i}"),
+            production=Production.objects.create(show_name=f"show {i}"),
+            vendor=Vendor.objects.create(name=f"vendor {i}", address="address", phone="555", email="v@example.com"),
+            start_service_date=today,
+            end_service_date=today,
+            total=50,
+        )
+
+
+class ReportRootMixin:
+    """
+    Test mixin that points REPORT_ROOT at a temp folder so cached and queued
+    reports never land in the project.
+    """
+
+    def setUp(self):
+        super().setUp()
+        report_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_root, True)
+        override = self.settings(REPORT_ROOT=report_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class QueryCountMixin(ReportRootMixin):
+    """
+    Test mixin to check that a page or export runs the same number of queries
+    no matter how many rows it renders.
+    """
+
+    def fetch(self, url):
+        """
+        Get a url and read the whole body, including streamed responses.
+        """
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def assertConstantQueries(self, url, add_rows, count=5):
+        """
+        Fetch url, add more rows with add_rows(count) and fetch it again.
+        Both fetches must run the same number of queries.
+        """
+        with CaptureQueriesContext(connection) as before:
+            self.fetch(url)
+        add_rows(count)
+        with CaptureQueriesContext(connection) as after:
+            self.fetch(url)
+        self.assertEqual(
+            len(before), len(after),
+            f"{url} ran {len(before)} queries before and {len(after)} after adding {count} rows",
+        )
+
+
+class RentalListQueryTests(QueryCountMixin, TestCase):
+    """ List pages and exports must not run a query per rental. """
+
+    def setUp(self):
+        super().setUp()
+        make_rentals(2)
+
+    def test_rental_list(self):
+        self.assertConstantQueries(reverse('rental_list'), make_rentals)
+
+    def test_category_list(self):
+        self.assertConstantQueries(reverse('main_equipment'), make_rentals)
+
+    def test_search_rentals(self):
+        self.assertConstantQueries(reverse('search_rentals') + '?q=item', make_rentals)
+
+    def test_rental_exports(self):
+        for name in ('rental_text', 'rental_csv', 'rental_pdf'):
+            with self.subTest(name=name):
+                self.assertConstantQueries(reverse(name), make_rentals)
+
+    def test_category_exports(self):
+        for name in ('main_equipment_text', 'main_equipment_csv', 'main_equipment_pdf'):
+            with self.subTest(name=name):
+                self.assertConstantQueries(reverse(name), make_rentals)
+
+
+class DetailDocumentTests(ReportRootMixin, TestCase):
+    """ Detail downloads are built once per version of the record's text. """
+
+    def setUp(self):
+        super().setUp()
+        # make_rentals leaves addl_tax_fees NULL
+        make_rentals(1)
+        self.rental = Rental.objects.get()
+        self.url = reverse('rental_detail_pdf', args=[self.rental.pk])
+
+    def test_repeat_download_skips_reportlab(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first['Content-Type'], 'application/pdf')
+        body = b''.join(first.streaming_content)
+        with mock.patch('rentals.documents.write_detail_pdf') as write:
+            second = self.client.get(self.url)
+            self.assertEqual(b''.join(second.streaming_content), body)
+        write.assert_not_called()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_service_with_null_amounts(self):
+        make_services(1)
+        service = Service.objects.get()
+        Service.objects.update(rate=None, total=None)
+        for name in ('service_detail_text', 'service_detail_pdf'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=[service.pk]))
+                self.assertEqual(response.status_code, 200)
+                body = b''.join(response.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+
+    def test_save_and_rename_make_a_new_document(self):
+        etag = self.client.get(self.url)['ETag']
+        self.rental.total_cost = 300
+        self.rental.save()
+        changed = self.client.get(self.url)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.rental.vendor.name = 'renamed vendor'
+        self.rental.vendor.save()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], changed['ETag'])
+
+    def test_text_and_delete(self):
+        response = self.client.get(reverse('rental_detail_txt', args=[self.rental.pk]))
+        body = b''.join(response.streaming_content)
+        self.assertIn(b'Rental Item: item 0', body)
+        self.assertIn(b'Additional Tax Fees: \n Total Cost: $100.00', body)
+        folder = documents.document_folder('rentals.rental', self.rental.pk)
+        self.assertTrue(os.path.isdir(folder))
+        self.rental.delete()
+        self.assertFalse(os.path.exists(folder))
+
+
+class DetailPacketTests(ReportRootMixin, TestCase):
+    """ Many detail pages in one pdf. """
+
+    def setUp(self):
+        super().setUp()
+        make_rentals(3)
+        self.rentals = list(Rental.objects.order_by('pk'))
+
+    def test_pages_by_id(self):
+        ids = f"{self.rentals[0].pk},{self.rentals[2].pk}"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('detail_packet', args=['rentals']), {'ids': ids})
+            body = b''.join(response.streaming_content)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', body)), 2)
+        # the font is set up once for the whole packet
+        self.assertEqual(len(re.findall(rb'/BaseFont /Helvetica\b', body)), 1)
+
+    def test_null_amounts(self):
+        # make_rentals leaves addl_tax_fees NULL
+        Rental.objects.filter(pk=self.rentals[1].pk).update(total_cost=None)
+        make_services(1)
+        Service.objects.update(rate=None, total=None)
+        picked = {'rentals': Rental.objects.all(), 'services': Service.objects.all()}
+        for kind, queryset in picked.items():
+            with self.subTest(kind=kind):
+                ids = ','.join(str(pk) for pk in queryset.values_list('pk', flat=True))
+                response = self.client.get(reverse('detail_packet', args=[kind]), {'ids': ids})
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        page = packets.PACKETS['rentals'].lines(packets.PACKETS['rentals'].select(ids=[self.rentals[1].pk]).get())
+        self.assertIn("Additional Tax Fees: ", page)
+        self.assertIn("Total Cost: ", page)
+
+    def test_pages_by_search(self):
+        packet = packets.PACKETS['rentals']
+        pages = [packet.lines(obj) for obj in packet.select(query='>0 item')]
+        self.assertEqual([page[4] for page in pages], [f"Rental Item: item {i}" for i in range(3)])
+
+    def test_nothing_picked(self):
+        url = reverse('detail_packet', args=['rentals'])
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ids': '9999'}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('detail_packet', args=['users']), {'ids': '1'}).status_code, 404)
+
+    def test_large_packet_is_queued(self):
+        with mock.patch('rentals.views.QUEUE_AFTER', 2):
+            response = self.client.get(reverse('detail_packet', args=['rentals']), {'q': 'item'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], ReportJob.QUEUED)
+
+        self.assertEqual(run_pending(), 1)
+
+        download = self.client.get(reverse('report_job_download', args=[response.json()['id']]))
+        body = b''.join(download.streaming_content)
+        self.assertIn('rental_packet.pdf', download['Content-Disposition'])
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', body)), 3)
+
+
+class CategoryReportTests(ReportRootMixin, TestCase):
+    """ Every category goes through the same list and report views. """
+
+    def setUp(self):
+        super().setUp()
+        make_rentals(2, category='misc_equipment')
+        make_rentals(1, category='set_equipment')
+
+    def test_every_category_and_format(self):
+        for category, label in Rental._meta.get_field('category').choices:
+            with self.subTest(category=category):
+                response = self.client.get(reverse('category_list', args=[category]))
+                self.assertEqual(response.status_code, 200)
+                for fmt in ('txt', 'csv', 'pdf'):
+                    self.assertContains(response, reverse('category_report', args=[category, fmt]))
+                    report = self.client.get(reverse('category_report', args=[category, fmt]))
+                    self.assertEqual(report.status_code, 200)
+
+    def test_old_urls_are_aliases(self):
+        self.assertEqual(reverse('set_equipment_csv'), '/set_equipment_csv/')
+        old = self.client.get(reverse('set_equipment_csv'))
+        new = self.client.get(reverse('category_report', args=['set_equipment', 'csv']))
+        self.assertEqual(b''.join(old.streaming_content), b''.join(new.streaming_content))
+        self.assertEqual(self.client.get(reverse('misc_equipment')).context['rentals'],
+                         self.client.get(reverse('category_list', args=['misc_equipment'])).context['rentals'])
+
+    def test_old_headings(self):
+        response = self.client.get(reverse('category_list', args=['set_equipment']))
+        self.assertContains(response, '<h1>SET PRODUCTION EQUIPMENT RENTAL LIST</h1>', html=True)
+        self.assertContains(response, '<th scope="col">Scene</th>', html=True)
+        response = self.client.get(reverse('category_list', args=['office_equipment']))
+        self.assertContains(response, '<h1>PRODUCTION OFFICE RENTAL LIST</h1>', html=True)
+
+    def test_rental_form_address_is_unchanged(self):
+        self.assertEqual(reverse('rental_form'), '/rental_form')
+        self.assertRedirects(self.client.get('/rental_form/'), '/rental_form', status_code=301,
+                             fetch_redirect_response=False)
+
+    def test_list_shows_one_category(self):
+        response = self.client.get(reverse('category_list', args=['misc_equipment']))
+        self.assertEqual(len(response.context['rentals']), 2)
+        self.assertEqual(response.context['total_cost'], 200)
+        self.assertContains(response, 'MISC RENTAL LIST')
+
+    def test_unknown_category_or_format(self):
+        self.assertEqual(self.client.get('/lighting_equipment/csv/').status_code, 404)
+        self.assertEqual(self.client.get('/set_equipment/xlsx/').status_code, 404)
+
+
+class ServiceListQueryTests(QueryCountMixin, TestCase):
+    """ Service list and exports must not run a query per service. """
+
+    def setUp(self):
+        super().setUp()
+        make_services(2)
+
+    def test_service_list(self):
+        self.assertConstantQueries(reverse('service_list'), make_services)
+
+    def test_search_services(self):
+        self.assertConstantQueries(reverse('search_services') + '?q=service', make_services)
+
+    def test_service_exports(self):
+        for name in ('service_list_text', 'service_list_csv', 'service_list_pdf'):
+            with self.subTest(name=name):
+                self.assertConstantQueries(reverse(name), make_services)
+
+
+class TotalsTests(TestCase):
+    """ Database totals for the list views. """
+
+    def test_totals_skip_null_rows(self):
+        make_rentals(3)
+        Rental.objects.filter(rental_item="item 0").update(total_cost=None)
+        totals = Rental.objects.totals()
+        self.assertEqual(totals['total'], 200)
+        self.assertEqual(totals['count'], 3)
+        self.assertEqual(totals['unpriced'], 1)
+
+    def test_empty_total_is_zero(self):
+        self.assertEqual(Service.objects.total(), 0)
+
+
+class DateAnnotationTests(TestCase):
+    """ Weekday, duration and days until/past worked out in the list query. """
+
+    def test_annotations_match_properties(self):
+        make_rentals(3)
+        today = datetime.date(2030, 1, 1)
+        Rental.objects.update(start_rental_date=datetime.date(2030, 1, 10))
+        Rental.objects.filter(rental_item="item 2").update(end_rental_date=datetime.date(2029, 12, 25))
+        for rental in Rental.objects.for_list(today):
+            self.assertEqual(rental.start_weekday, rental.start_day_of_week)
+            self.assertEqual(rental.end_weekday, rental.end_day_of_week)
+            self.assertEqual(rental.duration_days, rental.rental_duration)
+            self.assertEqual(rental.days_until, (rental.start_rental_date - today).days)
+            self.assertEqual(rental.days_past, (today - rental.end_rental_date).days)
+            self.assertEqual(rental.days_left, (rental.end_rental_date - today).days)
+
+    def test_missing_service_dates_are_none(self):
+        make_services(1)
+        Service.objects.update(end_service_date=None)
+        service = Service.objects.for_list().get()
+        self.assertIsNone(service.end_weekday)
+        self.assertIsNone(service.days_left)
+        self.assertEqual(service.days_until, 0)
+
+    def test_list_page_shows_annotated_weekday(self):
+        make_rentals(1)
+        start = Rental.objects.get().start_rental_date
+        response = self.client.get(reverse('rental_list'))
+        self.assertContains(response, f"{start.strftime('%A')}, ")
+
+
+class BookingConflictTests(TestCase):
+    """ Double bookings of one item from one vendor. """
+
+    def setUp(self):
+        make_rentals(2)
+        self.first, self.second = Rental.objects.order_by('pk')
+        # the same item from the same vendor, out on overlapping dates
+        Rental.objects.filter(pk=self.second.pk).update(
+            vendor=self.first.vendor, production=self.first.production, rental_item=self.first.rental_item,
+            start_rental_date=self.first.end_rental_date)
+
+    def values(self, rental, **changes):
+        return {'vendor': rental.vendor, 'rental_item': rental.rental_item,
+                'start_rental_date': rental.start_rental_date, 'end_rental_date': rental.end_rental_date, **changes}
+
+    def test_overlap_found_with_one_query(self):
+        rule = RULES['rentals']
+        with self.assertNumQueries(1):
+            conflicts = list(rule.conflicts(self.values(self.first)))
+        self.assertEqual(len(conflicts), 2)
+        # the booking being edited is not a conflict with itself
+        self.assertEqual([rental.pk for rental in rule.conflicts(self.values(self.first), self.second.pk)],
+                         [self.first.pk])
+        later = self.first.end_rental_date + datetime.timedelta(days=10)
+        self.assertFalse(rule.conflicts(self.values(self.first, start_rental_date=later, end_rental_date=later)))
+
+    def test_default_item_never_conflicts(self):
+        Rental.objects.update(rental_item='item')
+        rule = RULES['rentals']
+        self.assertFalse(rule.conflicts(self.values(Rental.objects.get(pk=self.first.pk))))
+        self.assertEqual(rule.production_conflicts(self.first.production_id), [])
+
+    def test_production_report_pairs_overlaps(self):
+        third = Rental.objects.get(pk=self.second.pk)
+        third.pk = None
+        third.start_rental_date += datetime.timedelta(days=30)
+        third.end_rental_date = third.start_rental_date
+        third.save()
+        response = self.client.get(reverse('booking_conflicts', args=[self.first.production_id]))
+        groups = {group['type']: group['conflicts'] for group in response.json()['groups']}
+        self.assertEqual([(pair['first']['id'], pair['second']['id']) for pair in groups['rentals']],
+                         [(self.first.pk, self.second.pk)])
+        self.assertEqual(groups['vehicles'], [])
+
+
+class TimelineTests(TestCase):
+    """ Daily bookings out and spend of a production. """
+
+    def setUp(self):
+        # cached timelines outlive the rolled back test data
+        cache.clear()
+
+    def test_daily_spreads_cost_over_days(self):
+        first = datetime.date(2030, 1, 1)
+        bookings = [
+            (first, first + datetime.timedelta(days=2), Decimal('100.00')),
+            (first + datetime.timedelta(days=1), first + datetime.timedelta(days=1), Decimal('5.00')),
+            # ends before it starts, left out
+            (first, first - datetime.timedelta(days=1), Decimal('1.00')),
+        ]
+        out, spend = daily(bookings, first, 4)
+        self.assertEqual(out, [1, 2, 1, 0])
+        # 100.00 over 3 days is 33.33 a day with the odd cent on the first day
+        self.assertEqual(spend, [3334, 3833, 3333, 0])
+
+    def test_timeline_is_cached_per_data_version(self):
+        make_rentals(3)
+        production = Rental.objects.first().production
+        Rental.objects.update(production=production)
+        with self.assertNumQueries(1 + 3):
+            result = timeline(production)
+        self.assertEqual(result['series'][0]['out'], [3, 2, 1])
+        self.assertEqual(result['series'][0]['accrued'][-1], Decimal('300'))
+        # one data version query on a cache hit
+        with self.assertNumQueries(1):
+            self.assertEqual(timeline(production), result)
+        Rental.objects.first().save()
+        with self.assertNumQueries(1 + 3):
+            timeline(production)
+        # the rebuild replaced the old copy under the same key
+        self.assertEqual(cache.get(f"timeline:{production.pk}")['timeline'], timeline(production))
+
+    def test_endpoint(self):
+        production = Production.objects.create(show_name="empty")
+        response = self.client.get(reverse('production_timeline', args=[production.pk]))
+        self.assertEqual(response.json()['days'], [])
+        self.assertEqual(self.client.get(reverse('production_timeline', args=[0])).status_code, 404)
+
+
+class StreamingExportTests(ReportRootMixin, TestCase):
+    """ CSV exports stream their rows and gzip on request. """
+
+    def setUp(self):
+        super().setUp()
+        make_rentals(3)
+
+    def test_csv_streams_every_row(self):
+        response = self.client.get(reverse('rental_csv'))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Rental Item')
+        self.assertEqual(len(lines), 4)
+
+    def test_csv_gzip(self):
+        response = self.client.get(reverse('rental_csv'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertIn('item 2', body)
+
+
+class PDFReportTests(ReportRootMixin, TestCase):
+    """ PDF reports break long lists over several pages. """
+
+    def test_long_report_has_several_pages(self):
+        make_rentals(80)
+        response = self.client.get(reverse('rental_pdf'))
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertGreater(len(re.findall(rb'/Type /Page\b', body)), 1)
+
+
+class ReportJobTests(ReportRootMixin, TestCase):
+    """ Reports queued for the background worker. """
+
+    def setUp(self):
+        super().setUp()
+        make_rentals(3)
+
+    def test_job_runs_and_downloads(self):
+        response = self.client.post(reverse('report_job_submit', args=['rentals', 'csv']))
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status'], ReportJob.QUEUED)
+
+        self.assertEqual(run_pending(), 1)
+
+        status = self.client.get(reverse('report_job_status', args=[job_id])).json()
+        self.assertEqual(status['status'], ReportJob.DONE)
+        self.assertEqual(status['progress'], 100)
+        download = self.client.get(reverse('report_job_download', args=[job_id]))
+        body = b''.join(download.streaming_content).decode()
+        self.assertEqual(len(body.splitlines()), 4)
+
+    def test_unknown_report(self):
+        response = self.client.post(reverse('report_job_submit', args=['nothing', 'csv']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_download_before_done(self):
+        job = ReportJob.objects.create(report='rentals', format='pdf')
+        response = self.client.get(reverse('report_job_download', args=[job.pk]))
+        self.assertEqual(response.status_code, 409)
+
+    def test_broken_job_fails_and_the_worker_goes_on(self):
+        broken = ReportJob.objects.create(report='packet:nothing', format='pdf')
+        job = ReportJob.objects.create(report='rentals', format='csv')
+        self.assertEqual(run_pending(), 2)
+        broken.refresh_from_db()
+        job.refresh_from_db()
+        self.assertEqual(broken.status, ReportJob.FAILED)
+        self.assertEqual(job.status, ReportJob.DONE)
+
+    def test_stale_running_job_fails(self):
+        started = timezone.now() - datetime.timedelta(hours=2)
+        stale = ReportJob.objects.create(report='rentals', format='csv', status=ReportJob.RUNNING, started_at=started)
+        busy = ReportJob.objects.create(report='rentals', format='csv', status=ReportJob.RUNNING,
+                                        started_at=timezone.now())
+        self.assertEqual(run_pending(), 0)
+        stale.refresh_from_db()
+        busy.refresh_from_db()
+        self.assertEqual(stale.status, ReportJob.FAILED)
+        self.assertEqual(busy.status, ReportJob.RUNNING)
+
+
+class ReportCacheTests(QueryCountMixin, TestCase):
+    """ Repeat downloads come from the report cache until the data changes. """
+
+    def setUp(self):
+        super().setUp()
+        make_rentals(2)
+
+    def test_repeat_download_skips_report_query(self):
+        first = self.fetch(reverse('main_equipment_csv'))
+        with CaptureQueriesContext(connection) as queries:
+            second = self.fetch(reverse('main_equipment_csv'))
+        self.assertEqual(first, second)
+        # only the data version lookup
+        self.assertEqual(len(queries), 1)
+
+    def test_write_invalidates_only_affected_reports(self):
+        self.fetch(reverse('main_equipment_csv'))
+        self.fetch(reverse('vendor_csv'))
+        Rental.objects.filter(rental_item="item 0").first().save()
+        with CaptureQueriesContext(connection) as rental_queries:
+            self.fetch(reverse('main_equipment_csv'))
+        with CaptureQueriesContext(connection) as vendor_queries:
+            self.fetch(reverse('vendor_csv'))
+        self.assertGreater(len(rental_queries), 1)
+        self.assertEqual(len(vendor_queries), 1)
+
+    def test_new_rows_show_up(self):
+        self.fetch(reverse('main_equipment_csv'))
+        make_rentals(1)
+        body = self.fetch(reverse('main_equipment_csv')).decode()
+        self.assertEqual(len(body.splitlines()), 4)
+
+
+class ConditionalGetTests(ReportRootMixin, TestCase):
+    """ Unchanged pages answer 304 after one data version lookup. """
+
+    def setUp(self):
+        super().setUp()
+        make_rentals(3)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_list_is_not_modified(self):
+        url = reverse('rental_list')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.revalidate(url, first)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        # the rows themselves are not read
+        self.assertIn('rentals_dataversion', queries[0]['sql'])
+        self.assertNotIn('rentals_rental', queries[0]['sql'])
+
+    def test_edit_and_delete_change_the_etag(self):
+        url = reverse('main_equipment')
+        first = self.client.get(url)
+        Rental.objects.first().save()
+        second = self.revalidate(url, first)
+        self.assertEqual(second.status_code, 200)
+        Rental.objects.order_by('pk').first().delete()
+        self.assertEqual(self.revalidate(url, second).status_code, 200)
+
+    def test_detail_page(self):
+        rental = Rental.objects.first()
+        url = reverse('rental_detail', args=[rental.pk])
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        rental.vendor.save()
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_department_and_show_rename_change_the_etag(self):
+        rental = Rental.objects.first()
+        for url in (reverse('rental_list'), reverse('rental_detail', args=[rental.pk])):
+            for related in (rental.department, rental.production):
+                with self.subTest(url=url, related=related):
+                    first = self.client.get(url)
+                    related.save()
+                    self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_unchanged_export_is_not_modified(self):
+        url = reverse('rental_csv')
+        first = self.client.get(url)
+        b''.join(first.streaming_content)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.revalidate(url, first)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+
+class IndexUsageTests(TestCase):
+    """ The hot list queries read through their indexes instead of scanning and sorting. """
+
+    def setUp(self):
+        make_rentals(20)
+        make_services(20)
+        if connection.vendor == 'postgresql':
+            # tiny test tables are cheaper to scan, make the planner show its index choice
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+
+    def test_category_list(self):
+        self.assertUsesIndex(Rental.objects.for_category('main_equipment').for_list(), 'rental_category_start_idx')
+
+    def test_service_list(self):
+        self.assertUsesIndex(Service.objects.for_list().order_by('start_service_date'), 'service_start_idx')
+
+    def test_purchase_order_lookup(self):
+        self.assertUsesIndex(Rental.objects.filter(purchase_order='PO-1'), 'rental_po_idx')
+
+
+class KeysetPaginationTests(TestCase):
+    """ Cursor pages walk the whole list once, in order, at the same cost. """
+
+    def setUp(self):
+        # every rental starts the same day, so the id has to break the ties
+        make_rentals(120)
+        make_services(60)
+        # services without a start date sort last
+        Service.objects.filter(pk__in=Service.objects.order_by('pk').values('pk')[:5]).update(start_service_date=None)
+
+    def walk(self, url, name):
+        seen = []
+        response = self.client.get(url)
+        while True:
+            seen += [row.pk for row in response.context[name]]
+            page = response.context['page']
+            if not page.has_next:
+                return seen, response
+            response = self.client.get(f"{url}?{page.next_query}")
+
+    def test_pages_cover_every_row_once(self):
+        seen, last = self.walk(reverse('rental_list'), 'rentals')
+        self.assertEqual(seen, list(Rental.objects.order_by('start_rental_date', 'pk').values_list('pk', flat=True)))
+        # and back again
+        page = last.context['page']
+        previous = self.client.get(f"{reverse('rental_list')}?{page.previous_query}")
+        self.assertEqual([row.pk for row in previous.context['rentals']], seen[50:100])
+
+    def test_empty_dates_sort_last(self):
+        seen, _ = self.walk(reverse('service_list'), 'services')
+        self.assertEqual(len(seen), 60)
+        self.assertEqual(len(set(seen)), 60)
+        self.assertEqual(seen[-5:], list(Service.objects.filter(start_service_date=None).order_by('pk')
+                                         .values_list('pk', flat=True)))
+
+    def test_totals_cover_every_page(self):
+        response = self.client.get(reverse('service_list'))
+        self.assertEqual(len(response.context['services']), 50)
+        self.assertEqual(response.context['total_cost'], 60 * 50)
+
+    def test_later_pages_cost_the_same(self):
+        url = reverse('rental_list')
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url)
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(f"{url}?{response.context['page'].next_query}")
+        self.assertEqual(len(first), len(second))
+
+    def test_broken_cursor_shows_first_page(self):
+        response = self.client.get(reverse('rental_list'), {'after': 'not a cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page'].has_previous)
+
+
+class FullTextSearchTests(TestCase):
+    """ Searches read the search document and come back best match first. """
+
+    def setUp(self):
+        make_rentals(3)
+        self.first, self.second, self.third = Rental.objects.order_by('pk')
+
+    def rename(self, rental, item):
+        rental.rental_item = item
+        rental.save()
+
+    def test_every_word_must_match_as_prefix(self):
+        self.rename(self.first, "Arri Alexa camera")
+        self.rename(self.second, "Arri skypanel")
+        found = search(Rental.objects.all(), "arr alex")
+        self.assertEqual(list(found), [self.first])
+
+    def test_vendor_rename_updates_documents(self):
+        vendor = self.second.vendor
+        vendor.name = "Acme Grip"
+        vendor.save()
+        self.assertEqual(list(search(Rental.objects.all(), "acme")), [self.second])
+
+    def test_vendor_save_without_rename_leaves_documents(self):
+        vendor = self.second.vendor
+        vendor.contact = "Front desk"
+        with CaptureQueriesContext(connection) as queries:
+            vendor.save()
+        self.assertFalse([query for query in queries if 'rentals_rental' in query['sql']])
+
+    def test_best_match_first(self):
+        self.rename(self.first, "lens case and spare items")
+        self.rename(self.third, "lens lens lens")
+        response = self.client.get(reverse('search_rentals'), {'q': 'lens'})
+        self.assertEqual(list(response.context['rentals']), [self.third, self.first])
+        self.assertEqual(response.context['total_cost'], 200)
+
+    def test_deleted_rows_leave_the_index(self):
+        self.rename(self.first, "dolly track")
+        self.first.delete()
+        self.assertFalse(search(Rental.objects.all(), "dolly").exists())
+
+
+class FuzzyLookupTests(TestCase):
+    """ Identifier lookups tolerate typos and partial numbers. """
+
+    def setUp(self):
+        fuzzy._indexes.clear()
+        make_rentals(3)
+        make_services(2)
+        self.rental = Rental.objects.order_by('pk').first()
+        self.rental.purchase_order = 'PO-48213'
+        self.rental.save()
+        Service.objects.update(purchase_order='PO-77001')
+
+    def test_typo_finds_the_record(self):
+        matches = fuzzy.fuzzy_lookup(Rental, 'PO-48123')
+        self.assertEqual(matches[0].obj, self.rental)
+        self.assertEqual(matches[0].field, 'purchase_order')
+        self.assertLess(matches[0].score, 1)
+
+    def test_index_follows_saves(self):
+        self.assertEqual(fuzzy.fuzzy_lookup(Rental, 'Q-5521'), [])
+        self.rental.quote_number = 'Q-5521'
+        self.rental.save()
+        self.assertEqual(fuzzy.fuzzy_lookup(Rental, 'Q-5521')[0].score, 1)
+
+    def test_saves_and_deletes_update_the_loaded_index(self):
+        fuzzy.fuzzy_lookup(Rental, 'PO-48213')
+        index = fuzzy._indexes['rentals.rental'][1]
+        self.rental.purchase_order = 'PO-31337'
+        self.rental.save()
+        other = Rental.objects.exclude(pk=self.rental.pk).first()
+        other_pk = other.pk
+        other.delete()
+        with mock.patch.object(fuzzy, 'TrigramIndex') as reload:
+            self.assertEqual(fuzzy.fuzzy_lookup(Rental, 'PO-31337')[0].obj, self.rental)
+            self.assertEqual(fuzzy.fuzzy_lookup(Rental, 'PO-48213'), [])
+        reload.assert_not_called()
+        self.assertNotIn(other_pk, index.numbers)
+
+    def test_lookup_endpoint(self):
+        response = self.client.get(reverse('identifier_lookup'), {'q': '48213'})
+        results = response.json()['results']
+        self.assertEqual(results[0]['type'], 'rental')
+        self.assertEqual(results[0]['url'], reverse('rental_detail', args=[self.rental.pk]))
+        self.assertNotIn('service', [result['type'] for result in results])
+
+
+class QueryParserTests(TestCase):
+    """ Structured search tokens compile to column filters. """
+
+    def setUp(self):
+        make_rentals(4)
+        self.rentals = list(Rental.objects.order_by('pk'))
+        for rental, cost in zip(self.rentals, (50, 150, 250, 900)):
+            rental.total_cost = cost
+            rental.save()
+        self.rentals[3].category = 'set_equipment'
+        self.rentals[3].rental_item = 'dolly'
+        self.rentals[3].save()
+
+    def find(self, query):
+        return set(apply_query(Rental.objects.all(), query, RENTAL_QUERY))
+
+    def test_amounts(self):
+        self.assertEqual(self.find('>500'), {self.rentals[3]})
+        self.assertEqual(self.find('100..250'), {self.rentals[1], self.rentals[2]})
+        self.assertEqual(self.find('..$99'), {self.rentals[0]})
+        self.assertEqual(self.find('=1,000'), set())
+
+    def test_keys_and_free_text(self):
+        self.assertEqual(self.find('category:set_equipment'), {self.rentals[3]})
+        self.assertEqual(self.find(f'vendor:"{self.rentals[1].vendor.name}" >100'), {self.rentals[1]})
+        self.assertEqual(self.find('dolly <1000'), {self.rentals[3]})
+
+    def test_related_names_filter_on_ids(self):
+        department = self.rentals[2].department
+        department.department_name = 'Grip Truck'
+        department.save()
+        self.assertEqual(self.find('department:grip'), {self.rentals[2]})
+        # the start of the name, not any part of it
+        self.assertEqual(self.find('department:truck'), set())
+        sql = str(apply_query(Rental.objects.all(), 'department:grip', RENTAL_QUERY).query)
+        self.assertIn('"department_id" IN (SELECT', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_dates(self):
+        today = datetime.date.today()
+        # rental i runs from today to today + i days
+        later = today + datetime.timedelta(days=2)
+        self.assertEqual(self.find(f'{later}'), {self.rentals[2], self.rentals[3]})
+        self.assertEqual(self.find(f'end:..{today + datetime.timedelta(days=1)}'), set(self.rentals[:2]))
+
+    def test_bad_tokens_are_free_text(self):
+        parsed = parse_query('>abc colour:red 2025-13-45', RENTAL_QUERY)
+        self.assertEqual(parsed.text, '>abc colour:red 2025-13-45')
+
+    def test_search_view_without_free_text(self):
+        response = self.client.get(reverse('search_rentals'), {'q': '>100'})
+        self.assertEqual(len(response.context['rentals']), 3)
+        self.assertEqual(response.context['total_cost'], 1300)
+
+
+class FacetTests(TestCase):
+
+    def setUp(self):
+        make_rentals(5)
+        self.rentals = list(Rental.objects.order_by('pk'))
+        for rental in self.rentals[:2]:
+            rental.category = 'set_equipment'
+            rental.payment_type = 'check'
+            rental.save()
+
+    def facet(self, response, param):
+        return {option['label']: option for option in
+                next(group for group in response.context['facets'] if group['param'] == param)['values']}
+
+    def test_one_group_per_value(self):
+        with CaptureQueriesContext(connection) as queries:
+            counts = Rental.objects.facet_counts({'category': None, 'department': 'department__department_name'})
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(counts['category'], [('main_equipment', 'main_equipment', 3),
+                                              ('set_equipment', 'set_equipment', 2)])
+        self.assertEqual(len(counts['department']), 5)
+
+    def test_narrowing(self):
+        url = reverse('search_rentals')
+        response = self.client.get(url, {'q': 'item'})
+        self.assertEqual(self.facet(response, 'category')['set_equipment']['count'], 2)
+        self.assertEqual(self.facet(response, 'payment_type')['Check']['count'], 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"{url}?{self.facet(response, 'category')['set_equipment']['query']}")
+        self.assertEqual(len(response.context['rentals']), 2)
+        self.assertEqual(response.context['total_cost'], 200)
+        category = self.facet(response, 'category')
+        self.assertEqual(list(category), ['set_equipment'])
+        self.assertTrue(category['set_equipment']['selected'])
+        # unchecking it brings the other categories back
+        self.assertNotIn('category=', category['set_equipment']['query'])
+        # totals, one page, one GROUP BY per facet
+        self.assertEqual(sum('GROUP BY' in query['sql'] for query in queries.captured_queries),
+                         len(response.context['facets']))
+
+    def test_bad_value(self):
+        response = self.client.get(reverse('search_rentals'), {'q': 'item', 'vendor': 'abc'})
+        self.assertEqual(len(response.context['rentals']), 0)
+
+
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        for source in autocomplete.SOURCES.values():
+            source.index = None
+        make_rentals(3)
+        self.grip = Vendor.objects.create(name="Acme Grip", services="dollies", address="a", phone="5",
+                                          email="g@example.com")
+
+    def suggest(self, source, query):
+        response = self.client.get(reverse('autocomplete', args=[source]), {'q': query})
+        return [result['text'] for result in response.json()['results']]
+
+    def test_prefix_index(self):
+        index = autocomplete.PrefixIndex([(1, 'Acme Grip Co'), (2, 'Grip House'), (3, 'Acme Lights')])
+        self.assertEqual(index.search('grip'), [(1, 'Acme Grip Co'), (2, 'Grip House')])
+        self.assertEqual(index.search('acme l'), [(3, 'Acme Lights')])
+        index.add(1, 'Camera Co')
+        index.remove(2)
+        self.assertEqual(index.search('grip'), [])
+        self.assertEqual(index.search('c'), [(1, 'Camera Co')])
+
+    def test_endpoint(self):
+        self.assertEqual(self.suggest('vendors', 'gri'), ['Acme Grip - dollies'])
+        self.assertEqual(self.suggest('departments', 'department 1'), ['department 1'])
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['users']), {'q': 'a'}).status_code, 404)
+
+    def test_kept_up_to_date_on_save(self):
+        self.suggest('vendors', 'acme')
+        self.grip.name = 'Best Grip'
+        self.grip.save()
+        Vendor.objects.create(name="Acme Lights", address="a", phone="5", email="l@example.com")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.suggest('vendors', 'acme'), ['Acme Lights'])
+        # the version check only, no reload
+        self.assertEqual(len(queries), 1)
+        self.grip.delete()
+        self.assertEqual(self.suggest('vendors', 'grip'), [])
+
+    def test_shared_labels_tell_the_rows_apart(self):
+        twin = Vendor.objects.create(name="Acme Grip", services="dollies", address="b", phone="6",
+                                     email="t@example.com")
+        response = self.client.get(reverse('autocomplete', args=['vendors']), {'q': 'acme'})
+        results = {result['text']: result['id'] for result in response.json()['results']}
+        self.assertEqual(results, {f'Acme Grip - dollies (#{self.grip.pk})': self.grip.pk,
+                                   f'Acme Grip - dollies (#{twin.pk})': twin.pk})
+        self.assertEqual(autocomplete.SOURCES['vendors'].label_for(twin.pk), f'Acme Grip - dollies (#{twin.pk})')
+        twin.delete()
+        self.assertEqual(self.suggest('vendors', 'acme'), ['Acme Grip - dollies'])
+
+    def test_write_from_another_process(self):
+        self.suggest('vendors', 'acme')
+        Vendor.objects.filter(pk=self.grip.pk).update(name='Zed Grip')
+        bump_version('rentals.vendor')
+        self.assertEqual(self.suggest('vendors', 'zed'), ['Zed Grip - dollies'])
+
+    def test_form_does_not_embed_lookup_tables(self):
+        rental = Rental.objects.select_related('vendor').first()
+        response = self.client.get(reverse('rental_update', args=[rental.pk]))
+        content = response.content.decode()
+        self.assertNotIn('Acme Grip', content)
+        self.assertIn(f'value="{rental.vendor.name}', content)
+        self.assertIn('js/autocomplete.js', content)
+
+
+class GlobalSearchTests(TransactionTestCase):
+    """
+    Global search runs on worker threads with their own connections, so the
+    rows have to be committed for them to see.
+    """
+
+    def setUp(self):
+        make_rentals(7)
+        make_services(2)
+        crane = Rental.objects.order_by('pk')[0]
+        crane.rental_item = 'camera crane'
+        crane.save()
+
+    def group(self, groups, key):
+        return next(group for group in groups if group['type'] == key)
+
+    def test_grouped_hits_with_per_type_limit(self):
+        groups = global_search.global_search('item', per_type=5, budget=5)
+        self.assertEqual([group['type'] for group in groups], ['rentals', 'services', 'vendors', 'vehicles'])
+        rentals = self.group(groups, 'rentals')
+        # the renamed one no longer says item
+        self.assertEqual(len(rentals['hits']), 5)
+        self.assertTrue(rentals['more'])
+        self.assertEqual(self.group(groups, 'services')['hits'], [])
+        self.assertFalse(any(group['timed_out'] for group in groups))
+
+    def test_structured_tokens(self):
+        groups = global_search.global_search('vendor 1', budget=5)
+        vendors = self.group(groups, 'vendors')
+        self.assertIn('vendor 1', [hit['label'].split(' - ')[0] for hit in vendors['hits']])
+        self.assertEqual(len(self.group(groups, 'services')['hits']), 1)
+
+    def test_worker_connections_are_kept(self):
+        global_search.global_search('crane', budget=5)
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection)
+        connection_created.connect(count)
+        self.addCleanup(connection_created.disconnect, count)
+        global_search.global_search('crane', budget=5)
+        self.assertEqual(opened, [])
+
+    def test_slow_type_times_out(self):
+        slow = global_search.SearchTarget('slow', 'Slow', Rental.objects.all, 'rental_detail')
+        slow.find = lambda text, limit: time.sleep(0.5) or []
+        global_search.TARGETS.append(slow)
+        self.addCleanup(global_search.TARGETS.remove, slow)
+        started = time.monotonic()
+        groups = global_search.global_search('crane', budget=0.2)
+        self.assertLess(time.monotonic() - started, 0.45)
+        self.assertTrue(self.group(groups, 'slow')['timed_out'])
+        self.assertEqual(len(self.group(groups, 'rentals')['hits']), 1)
+
+    def test_view(self):
+        response = self.client.get(reverse('global_search'), {'q': 'crane'})
+        data = response.json()
+        self.assertEqual(data['query'], 'crane')
+        hit = self.group(data['groups'], 'rentals')['hits'][0]
+        self.assertEqual(hit['url'], reverse('rental_detail', args=[hit['id']]))
+        self.assertEqual(self.client.get(reverse('global_search')).json()['groups'], [])
+
+
+class ExportBundleTests(ReportRootMixin, TransactionTestCase):
+    """
+    The bundle builds reports on worker threads, so the rows are committed.
+    """
+
+    def setUp(self):
+        super().setUp()
+        make_rentals(3, category='set_equipment')
+        make_services(2)
+
+    def download(self, *formats):
+        response = self.client.get(reverse('export_bundle'), {'format': formats} if formats else {})
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_every_report(self):
+        archive = self.download()
+        expected = {report.get_filename(fmt) for report, fmt in bundle_members()}
+        self.assertEqual(set(archive.namelist()), expected)
+        self.assertIn('set_equipment_report.pdf', expected)
+        self.assertIn('service_report.csv', expected)
+        csv_file = b''.join(self.client.get(reverse('category_report', args=['set_equipment', 'csv'])).streaming_content)
+        self.assertEqual(archive.read('set_equipment_report.csv'), csv_file)
+
+    def test_uses_report_cache(self):
+        report = REPORTS['services']
+        path = cached_file(report, 'csv')
+        with open(path, 'wb') as cached:
+            cached.write(b'cached copy')
+        self.assertEqual(self.download('csv').read('service_report.csv'), b'cached copy')
+
+    def test_formats(self):
+        names = self.download('txt').namelist()
+        self.assertTrue(names)
+        self.assertTrue(all(name.endswith('.txt') for name in names))
@@ -0,0 +1,150 @@
+"""
+Daily utilization timeline of a production: how many rentals, services and
+vehicles are out on each day of the shoot and what they cost per day.
+Each booking's cost is spread evenly over its days, end date included, in
+whole cents. Every booking adds its count and daily cost at its start day and
+takes them off the day after its end, then one running sum over the days
+turns those changes into the daily figures, so the work grows with the
+number of bookings and days, not with their product.
+Results are cached per production and data version of the tables read.
+"""
+import datetime
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.cache import cache
+
+from .cache import data_versions
+
+# timelines longer than this are cut at the end
+MAX_DAYS = 3 * 366
+# seconds a cached timeline is kept for productions nobody looks at any more
+TIMEOUT = 24 * 60 * 60
+
+# timeline series in the order they are shown
+SERIES = []
+
+
+class Series:
+    """
+    One line of the timeline. label is the model, start_field, end_field
+    and cost_field its date and money columns.
+    """
+
+    def __init__(self, name, title, label, start_field, end_field, cost_field):
+        self.name = name
+        self.title = title
+        self.label = label.lower()
+        self.start_field = start_field
+        self.end_field = end_field
+        self.cost_field = cost_field
+
+    def bookings(self, production):
+        """
+        (start, end, cost) of every dated booking in a production.
+        """
+        model = apps.get_model(self.label)
+        return (model.objects.filter(production=production)
+                .exclude(**{f'{self.start_field}__isnull': True})
+                .exclude(**{f'{self.end_field}__isnull': True})
+                .order_by(self.start_field)
+                .values_list(self.start_field, self.end_field, self.cost_field))
+
+
+def register(series):
+    """
+    Add a line to the timeline.
+    """
+    SERIES.append(series)
+    return series
+
+
+def daily(bookings, first, days):
+    """
+    Bookings out and cents spent on each of days days from first, from the
+    (start, end, cost) of the bookings.
+    """
+    # changes on each day, one slot past the end for bookings running to the last day
+    count_changes = [0] * (days + 1)
+    cent_changes = [0] * (days + 1)
+    for start, end, cost in bookings:
+        if end < start:
+            continue
+        length = (end - start).days + 1
+        begin = (start - first).days
+        stop = min(begin + length, days)
+        if stop <= 0 or begin >= days:
+            continue
+        cents = int((cost or 0) * 100)
+        per_day, remainder = divmod(cents, length)
+        # days before the timeline starts were already spent
+        count_changes[max(begin, 0)] += 1
+        count_changes[stop] -= 1
+        cent_changes[max(begin, 0)] += per_day
+        cent_changes[stop] -= per_day
+        # the odd cents go on the first day
+        if begin >= 0:
+            cent_changes[begin] += remainder
+            cent_changes[begin + 1] -= remainder
+    out, spend = [], []
+    count = cents = 0
+    for day in range(days):
+        count += count_changes[day]
+        cents += cent_changes[day]
+        out.append(count)
+        spend.append(cents)
+    return out, spend
+
+
+def build_timeline(production):
+    """
+    Timeline of a production from the database, one query per series.
+    """
+    bookings = {series.name: list(series.bookings(production)) for series in SERIES}
+    starts = [start for rows in bookings.values() for start, end, cost in rows]
+    ends = [end for rows in bookings.values() for start, end, cost in rows]
+    if not starts:
+        return {'production': production.pk, 'start': None, 'end': None, 'days': [], 'series': []}
+    first = min(starts)
+    days = min((max(ends) - first).days + 1, MAX_DAYS)
+    lines = []
+    for series in SERIES:
+        out, spend = daily(bookings[series.name], first, days)
+        accrued, total = [], 0
+        for cents in spend:
+            total += cents
+            accrued.append(Decimal(total) / 100)
+        lines.append({
+            'type': series.name,
+            'title': series.title,
+            'out': out,
+            'spend': [Decimal(cents) / 100 for cents in spend],
+            'accrued': accrued,
+        })
+    return {
+        'production': production.pk,
+        'start': first,
+        'end': first + datetime.timedelta(days=days - 1),
+        'days': [first + datetime.timedelta(days=day) for day in range(days)],
+        'series': lines,
+    }
+
+
+def timeline(production):
+    """
+    Cached timeline of a production, built again once a table it reads changes.
+    One cache entry per production holds the data versions it was built at,
+    so a rebuild overwrites the old copy instead of leaving it behind.
+    """
+    versions = data_versions(sorted(series.label for series in SERIES))
+    key = f"timeline:{production.pk}"
+    cached = cache.get(key)
+    if cached is not None and cached['versions'] == versions:
+        return cached['timeline']
+    result = build_timeline(production)
+    cache.set(key, {'versions': versions, 'timeline': result}, TIMEOUT)
+    return result
+
+
+register(Series('rentals', 'Equipment rentals', 'rentals.Rental', 'start_rental_date', 'end_rental_date', 'total_cost'))
+register(Series('services', 'Services', 'rentals.Service', 'start_service_date', 'end_service_date', 'total'))
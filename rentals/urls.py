@@ -1,7 +1,11 @@
 
-from django.urls import path
+from django.urls import path, register_converter
+from django.views.generic import RedirectView
 
-from . import views
+from . import converters, views
+
+register_converter(converters.CategoryConverter, 'category')
+register_converter(converters.ReportFormatConverter, 'report_format')
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -15,13 +19,14 @@ urlpatterns = [
     path('production_form', views.ProductionInfoFormView.as_view(), name='production_form'),
     path('vendor_form/', views.VendorFormView.as_view(), name='vendor_form'),
     path('department_form/', views.DepartmentFormView.as_view(), name='department_form'),
-    path('rental_form/', views.RentalFormView.as_view(), name='rental_form'),
+    path('rental_form', views.RentalFormView.as_view(), name='rental_form'),
+    # the form used to answer here too, send old links to the one above
+    path('rental_form/', RedirectView.as_view(pattern_name='rental_form', permanent=True)),
     #path('vendor_list/', views.VendorListView.as_view(), name='vendor_list'),
     path('vendor_detail/<int:pk>/', views.VendorDetailView.as_view(), name='vendor_detail'),
     path('vendor_update/<int:pk>/', views.VendorUpdateView.as_view(), name='vendor_update'),
     path('vendor_delete/<int:pk>/', views.VendorDeleteView.as_view(), name='vendor_delete'),
     path('vendor_list/', views.vendor_list, name='vendor_list'),
-    path('rental_form', views.RentalFormView.as_view(), name='rental_form'),
     path('vendor_category/', views.VendorCategoryFormView.as_view(), name='vendor_category'),
     path('rental_list/', views.RentalListView.as_view(), name='rental_list'),
     path('rental_detail/<int:pk>/', views.RentalDetailView.as_view(), name='rental_detail'),
@@ -32,27 +37,30 @@ urlpatterns = [
     path('vendor_text', views.vendor_text, name='vendor_text'),
     path('vendor_csv', views.vendor_csv, name='vendor_csv'),
     path('vendor_pdf', views.vendor_pdf, name='vendor_pdf'),
-    path('main_equipment', views.main_equipment_list, name='main_equipment'),
-    path('special_equipment', views.special_equipment_list, name='special_equipment'),
-    path('set_equipment', views.set_equipment_list, name='set_equipment'),
-    path('office_equipment', views.production_office_equipment_list, name='office_equipment'),
-    path('misc_equipment', views.misc_equipment_list, name='misc_equipment'),
-    path('service_list/', views.service_list, name='service_list'),
+    # one list page and report per rental category, the named category
+    # urls below are the old addresses of the same views
+    path('<category:category>/', views.category_list, name='category_list'),
+    path('<category:category>/<report_format:fmt>/', views.category_report, name='category_report'),
+    path('main_equipment', views.category_list, {'category': 'main_equipment'}, name='main_equipment'),
+    path('special_equipment', views.category_list, {'category': 'special_equipment'}, name='special_equipment'),
+    path('set_equipment', views.category_list, {'category': 'set_equipment'}, name='set_equipment'),
+    path('office_equipment', views.category_list, {'category': 'office_equipment'}, name='office_equipment'),
+    path('misc_equipment', views.category_list, {'category': 'misc_equipment'}, name='misc_equipment'),
     path('rental_text/', views.rental_txt, name='rental_text'),
     path('rental_pdf/', views.rental_pdf, name='rental_pdf'),
     path('rental_csv/', views.rental_csv, name='rental_csv'),
-    path('main_equipment_text/', views.main_equipment_txt, name='main_equipment_text'),
-    path('main_equipment_csv/', views.main_equipment_csv, name='main_equipment_csv'),
-    path('main_equipment_pdf/', views.main_equipment_pdf, name='main_equipment_pdf'),
-    path('special_equipment/txt/', views.special_equipment_txt, name='special_equipment_txt'),
-    path('special_equipment_csv/', views.special_equipment_csv, name='special_equipment_csv'),
-    path('special_equipment_pdf/', views.special_equipment_pdf, name='special_equipment_pdf'),
-    path('set_equipment_txt/', views.set_equipment_txt, name='set_equipment_txt'),
-    path('set_equipment_csv/', views.set_equipment_csv, name='set_equipment_csv'),
-    path('set_equipment_pdf/', views.set_equipment_pdf, name='set_equipment_pdf'),
-    path('office_equipment_txt/', views.office_equipment_txt, name='office_equipment_txt'),
-    path('office_equipment_csv/', views.office_equipment_csv, name='office_equipment_csv'),
-    path('office_equipment_pdf/', views.office_equipment_pdf, name='office_equipment_pdf'),
+    path('main_equipment_text/', views.category_report, {'category': 'main_equipment', 'fmt': 'txt'}, name='main_equipment_text'),
+    path('main_equipment_csv/', views.category_report, {'category': 'main_equipment', 'fmt': 'csv'}, name='main_equipment_csv'),
+    path('main_equipment_pdf/', views.category_report, {'category': 'main_equipment', 'fmt': 'pdf'}, name='main_equipment_pdf'),
+    path('special_equipment/txt/', views.category_report, {'category': 'special_equipment', 'fmt': 'txt'}, name='special_equipment_txt'),
+    path('special_equipment_csv/', views.category_report, {'category': 'special_equipment', 'fmt': 'csv'}, name='special_equipment_csv'),
+    path('special_equipment_pdf/', views.category_report, {'category': 'special_equipment', 'fmt': 'pdf'}, name='special_equipment_pdf'),
+    path('set_equipment_txt/', views.category_report, {'category': 'set_equipment', 'fmt': 'txt'}, name='set_equipment_txt'),
+    path('set_equipment_csv/', views.category_report, {'category': 'set_equipment', 'fmt': 'csv'}, name='set_equipment_csv'),
+    path('set_equipment_pdf/', views.category_report, {'category': 'set_equipment', 'fmt': 'pdf'}, name='set_equipment_pdf'),
+    path('office_equipment_txt/', views.category_report, {'category': 'office_equipment', 'fmt': 'txt'}, name='office_equipment_txt'),
+    path('office_equipment_csv/', views.category_report, {'category': 'office_equipment', 'fmt': 'csv'}, name='office_equipment_csv'),
+    path('office_equipment_pdf/', views.category_report, {'category': 'office_equipment', 'fmt': 'pdf'}, name='office_equipment_pdf'),
     path('service_list/', views.service_list, name='service_list'),
     path('service_form/', views.ServiceFormView.as_view(), name='service_form'),
     path('service_detail/<int:pk>/', views.ServiceDetailView.as_view(), name='service_detail'),
@@ -67,4 +75,15 @@ urlpatterns = [
     path('search_rentals/', views.SearchRentals.as_view(), name='search_rentals'),
     path('search_services/', views.SearchServices.as_view(), name='search_services'),
     path('search_vendors/', views.SearchVendors.as_view(), name='search_vendors'),
+    path('lookup/identifiers/', views.identifier_lookup, name='identifier_lookup'),
+    path('bookings/conflicts/<int:production>/', views.booking_conflicts, name='booking_conflicts'),
+    path('timeline/<int:production>/', views.production_timeline, name='production_timeline'),
+    path('search/', views.global_search_view, name='global_search'),
+    path('autocomplete/<str:source>/', views.autocomplete, name='autocomplete'),
+    path('reports/bundle/', views.export_bundle, name='export_bundle'),
+    path('packets/<str:kind>/', views.detail_packet, name='detail_packet'),
+    # Background report jobs
+    path('reports/<str:report>/<str:fmt>/queue/', views.report_job_submit, name='report_job_submit'),
+    path('reports/jobs/<int:pk>/', views.report_job_status, name='report_job_status'),
+    path('reports/jobs/<int:pk>/download/', views.report_job_download, name='report_job_download'),
 ]
\ No newline at end of file
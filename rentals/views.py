@@ -12,29 +12,39 @@ from django.urls import reverse, reverse_lazy
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from django.contrib.auth.forms import UserCreationForm
 from django import forms
-from django.urls import reverse
-from django.http import HttpResponse # <---- Import to generate text file
-import csv # <---- Import to generate excel file
-from django.db.models import Q
-
-# below imports are for generating pdf file
-from django.http import FileResponse
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib.pagesizes import letter
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.http import require_POST
+from django.utils.decorators import method_decorator
+import time
 from django.utils import timezone
 
 
-from django.views.generic import (TemplateView, FormView,
+from django.views.generic import (FormView,
                                   ListView, DetailView, CreateView, UpdateView, DeleteView)
 from .forms import SignUpForm, UpdateUserForm, PasswordChangeForm
 
 #import logging
-from .models import Production, Vendor, Department, Rental, Service, VendorCategory
-from .mixins import RentalListMixin
+from .models import Production, Vendor, Department, Rental, Service, VendorCategory, ReportJob
+from .mixins import AutocompleteFormMixin, BookingFormMixin
+from .cache import report_response
+from .documents import (document_response, rental_pdf_lines, rental_text_lines, service_pdf_lines,
+                        service_text_lines)
+from .reports import FORMATS, get_report
+from .bundle import BUNDLE_FORMATS, bundle_members, zip_chunks
+from .packets import PACKETS, QUEUE_AFTER, packet_file, parse_ids
+from .exports import streaming_response
+from .conditional import PAGE_RELATED, conditional_page
+from .pagination import KeysetListMixin, SearchListMixin, keyset_page
+from .search import search
+from .query_parser import RENTAL_QUERY, SERVICE_QUERY, apply_query
+from .facets import RENTAL_FACETS, SERVICE_FACETS, apply_facets, facet_groups
+from .fuzzy import DETAIL_URLS, closest_matches
+from .autocomplete import FORM_FIELDS, SOURCES
+from .global_search import global_search
+from .jobs import submit_job, submit_packet
+from .bookings import RULES
+from .timeline import timeline
 
 # Create your views here.
 
@@ -148,8 +158,8 @@ def update_password(request):
 # user list view
 def user_list(request):
     """ User list page view. This is for admins to view all users."""
-    users = User.objects.all().order_by('first_name')
-    return render(request, 'user_list.html', {'users': users})
+    page = keyset_page(request, User.objects.all(), ('first_name',))
+    return render(request, 'user_list.html', {'users': page.object_list, 'page': page})
 
 
 
@@ -177,8 +187,8 @@ class ProductionInfoFormView(CreateView):
 # Vendor List function view
 def vendor_list(request):
     """ User list page view. This is for admins to view all users."""
-    vendors = Vendor.objects.all().order_by('name')
-    return render(request, 'vendor_list.html', {'vendors': vendors})
+    page = keyset_page(request, Vendor.objects.select_related('category'), ('name',))
+    return render(request, 'vendor_list.html', {'vendors': page.object_list, 'page': page})
 
 # Vendor detail view
 class VendorDetailView(DetailView):
@@ -256,74 +266,18 @@ class VendorCategoryFormView(CreateView):
 
 ### Generate text file Vendor List
 def vendor_text(request):
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="vendor_list.txt"'
-
-    vendors = Vendor.objects.all()
-    lines = []
-    for vendor in vendors:
-        lines.append(f"Vendor Name: {vendor.name}\n Vender Services: {vendor.services}\n Address: {vendor.address}\n Contact: {vendor.contact}\n Phone: {vendor.phone}\n Email: {vendor.email}\n Agreement Signed: {vendor.agreement_signed}\n Agreement Date: {vendor.agreement_date}\n COI Issued: {vendor.COI_issued}\n Notes: {vendor.notes}\n\n")
-    response.writelines(lines)
-    return response
+    """ Text file of the vendor list, served from the report cache."""
+    return report_response(request, 'vendors', 'txt')
 
 ### Generate text file Vendor List
 def vendor_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="vendor_list.csv"'
-
-    # Create a csv writer
-    writer = csv.writer(response)
-
-    # Designate The Model
-    vendors = Vendor.objects.all()
-
-    # Add colum headings to the csv file
-    writer.writerow(['Vendor Name', 'Services', 'Address', 'Contact', 'Phone', 'Email', 'Notes'])
-
-    # Loop through the vendors and write to the csv file
-    for vendor in vendors:
-            writer.writerow([vendor.name, vendor.services, vendor.address, vendor.contact, vendor.phone, vendor.email, vendor.notes])
-
-    return response
+    """ Csv file of the vendor list, served from the report cache."""
+    return report_response(request, 'vendors', 'csv')
 
 # Generate PDF file Vendor List
 def vendor_pdf(request):
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-
-
-    # Get all vendors from the database
-    vendors = Vendor.objects.all()
-
-    lines = []
-
-    for vendor in vendors:
-        lines.append(vendor.name)
-        lines.append(vendor.services)
-        lines.append(vendor.address)
-        lines.append(vendor.contact)
-        lines.append(vendor.phone)
-        lines.append(vendor.email)
-        lines.append(vendor.notes)
-        lines.append("")
-
-    for line in lines:
-        textob.textLine(line)
-
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='vendor_list.pdf')
+    """ PDF table of the vendor list, served from the report cache."""
+    return report_response(request, 'vendors', 'pdf')
 
 
 
@@ -365,21 +319,24 @@ class DepartmentFormView(CreateView):
 ########################################## RENTAL VIEWS ###############################################
 
 # rentals list view
-class RentalListView(ListView):
+@method_decorator(conditional_page(Rental, related=PAGE_RELATED), name='dispatch')
+class RentalListView(KeysetListMixin, ListView):
     """ Rental list view. This is for the admin to view all rentals."""
     model = Rental
     template_name = 'rental_list.html'
     context_object_name = 'rentals'
-    # arrange results in alphabetical order
-    ordering = ['rental_item']
+    # arrange results by start date, one page at a time
+    keyset_ordering = ('start_rental_date',)
 
     def get_queryset(self):
-        return Rental.objects.all()
+        return Rental.objects.for_list()
 
 # rentals update view
-class RentalUpdateView(UpdateView):
+class RentalUpdateView(BookingFormMixin, AutocompleteFormMixin, UpdateView):
     """ Rental update view. This is for the admin to update rental information."""
     model = Rental
+    booking_rule = 'rentals'
+    autocomplete_fields = FORM_FIELDS
     template_name = 'rental_update.html'
     fields = ['rental_item', 'first_name', 'last_name', 'title', 'department', 'production', 'vendor', 'scene_info',
               'start_rental_date', 'end_rental_date', 'drop_off_location', 'drop_off_time', 'pick_up_location',
@@ -389,6 +346,9 @@ class RentalUpdateView(UpdateView):
     success_url = reverse_lazy('rental_list')
 
     def form_valid(self, form):
+        # same item from the same vendor already out on these dates
+        if self.booking_conflicts(form):
+            return self.form_invalid(form)
         messages.success(self.request, "Rental information updated successfully.")
         return super().form_valid(form)
 
@@ -409,6 +369,7 @@ class RentalDeleteView(DeleteView):
         return super().delete(request, *args, **kwargs)
 
 # rentals details view
+@method_decorator(conditional_page(Rental, related=PAGE_RELATED), name='dispatch')
 class RentalDetailView(DetailView):
     """ Rental detail view. This is for the admin to view rental details. """
     model = Rental
@@ -418,73 +379,25 @@ class RentalDetailView(DetailView):
 # rental detail text
 def rental_detail_txt(request, pk):
     """ This will print a text file of rental details."""
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="rental_detail_report.txt"'
-    rental = get_object_or_404(Rental, pk=pk)
-    lines = []
-    lines.append(f"Rental Item: {rental.rental_item}\n First Name: {rental.first_name}\n Last Name: {rental.last_name}\n Title: {rental.title}\n Department: {rental.department}\n Production: {rental.production}\n Vendor: {rental.vendor}\n Scene Info: {rental.scene_info}\n Start Rental Date: {rental.start_rental_date}\n End Rental Date: {rental.end_rental_date}\n Drop Off Location: {rental.drop_off_location}\n Drop Off Time: {rental.drop_off_time}\n Pick Up Location: {rental.pick_up_location}\n Pick Up Time: {rental.pick_up_time}\n Rental Type: {rental.rental_type}\n Category: {rental.category}\n Additional Tax Fees: ${rental.addl_tax_fees:,.2F}\n Total Cost: ${rental.total_cost:,.2F}\n Purchase Order: {rental.purchase_order}\n Quote Number: {rental.quote_number}\n Notes 1: {rental.notes1}\n Notes 2: {rental.notes2}\n Notes 3: {rental.notes3}")
-    response.writelines(lines)
-    return response
+    rental = get_object_or_404(Rental.objects.select_related('department', 'production', 'vendor'), pk=pk)
+    lines = rental_text_lines(rental)
+    # served from the document cache while the text is unchanged
+    return document_response(request, rental, 'txt', lines, 'rental_detail_report.txt')
 
 # rental detail pdf
 def rental_detail_pdf(request, pk):
     """ PDF view of rental detail """
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas and set multiple pages
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-
-    rental = get_object_or_404(Rental, pk=pk)
-
-    lines = []
-    lines.append("")
-    lines.append(f'{rental.production}')
-    lines.append('___________________________')
-    lines.append('')
-    lines.append(f"Rental Item: {rental.rental_item}")
-    lines.append(f"First Name: {rental.first_name}")
-    lines.append(f"Last Name: {rental.last_name}")
-    lines.append(f"Title: {rental.title}")
-    lines.append(f"Department: {rental.department}")
-    lines.append(f"Production: {rental.production}")
-    lines.append(f"Vendor: {rental.vendor}")
-    lines.append(f"Purpose/Scene Info: {rental.scene_info}")
-    lines.append(f"Start Rental Date: {rental.start_rental_date}")
-    lines.append(f"End Rental Date: {rental.end_rental_date}")
-    lines.append(f"Drop Off Location: {rental.drop_off_location}")
-    lines.append(f"Drop Off Time: {rental.drop_off_time}")
-    lines.append(f"Pick Up Location: {rental.pick_up_location}")
-    lines.append(f"Pick Up Time: {rental.pick_up_time}")
-    lines.append(f"Rental Type: {rental.rental_type}")
-    lines.append(f"Category: {rental.category}")
-    lines.append(f"Additional Tax Fees: ${rental.addl_tax_fees:,.2F}")
-    lines.append(f"Total Cost: ${rental.total_cost:,.2F}")
-    lines.append(f"Purchase Order: {rental.purchase_order}")
-    lines.append(f"Quote Number: {rental.quote_number}")
-    lines.append(f"Notes 1: {rental.notes1}")
-    lines.append(f"Notes 2: {rental.notes2}")
-    lines.append(f"Notes 3: {rental.notes3}")
-    lines.append("")
-    for line in lines:
-        textob.textLine(line)
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='Rental_Detail_Report.pdf')
+    rental = get_object_or_404(Rental.objects.select_related('department', 'production', 'vendor'), pk=pk)
+    # ReportLab only runs when the text changed since the last download
+    return document_response(request, rental, 'pdf', rental_pdf_lines(rental), 'Rental_Detail_Report.pdf')
 
 
 # rentals form view
-class RentalFormView(CreateView):
+class RentalFormView(BookingFormMixin, AutocompleteFormMixin, CreateView):
     """ Rental information form view. This is for the admin to enter rental information."""
     model = Rental
+    booking_rule = 'rentals'
+    autocomplete_fields = FORM_FIELDS
     template_name = 'rental_form.html'
     fields = ['rental_item', 'first_name', 'last_name', 'title', 'department', 'production', 'vendor', 'scene_info', 'start_rental_date', 'end_rental_date', 'drop_off_location', 'drop_off_time', 'pick_up_location', 'pick_up_time', 'rental_type', 'category', 'addl_tax_fees', 'total_cost', 'purchase_order', 'quote_number', 'payment_type', 'notes1', 'notes2', 'notes3']
     context_object_name = 'form'
@@ -504,6 +417,10 @@ class RentalFormView(CreateView):
              form.add_error('start_rental_date', "Start rental date must be before end rental date.")
              return self.form_invalid(form)
 
+         # same item from the same vendor already out on these dates
+         if self.booking_conflicts(form):
+             return self.form_invalid(form)
+
          messages.success(self.request, "Rental information saved successfully.")
          return super().form_valid(form)
 
@@ -523,560 +440,57 @@ class RentalFormView(CreateView):
 
 # rental equipment print txt report
 def rental_txt(request):
-    """ This will print a text file of all the rental equipment."""
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="rental_report.txt"'
-    rentals = Rental.objects.all()
-    lines = []
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}\n First Name: {rental.first_name}\n Last Name: {rental.last_name}\n Title: {rental.title}\n Department: {rental.department}\n Production: {rental.production}\n Vendor: {rental.vendor}\n Scene Info: {rental.scene_info}\n Start Rental Date: {rental.start_rental_date}\n End Rental Date: {rental.end_rental_date}\n Drop Off Location: {rental.drop_off_location}\n Drop Off Time: {rental.drop_off_time}\n Pick Up Location: {rental.pick_up_location}\n Pick Up Time: {rental.pick_up_time}\n Rental Type: {rental.rental_type}\n Category: {rental.category}\n Additional Tax Fees: {rental.addl_tax_fees}\n Total Cost: {rental.total_cost}\n Purchase Order: {rental.purchase_order}\n Quote Number: {rental.quote_number}\n Notes 1: {rental.notes1}\n Notes 2: {rental.notes2}\n Notes 3: {rental.notes3}\n\n ")
-        response.writelines(lines)
-    return response
+    """ Text file of all the rental equipment, served from the report cache."""
+    return report_response(request, 'rentals', 'txt', compress=True)
 
 # rental equipment print csv report
 def rental_csv(request):
-    """" create csv file of rental equipment report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="rental_report.csv"'
-
-    # Create a csv writer
-    writer = csv.writer(response)
-
-    # Designate The Model
-    rentals = Rental.objects.all()
-
-    # Add colum headings to the csv file
-    writer.writerow(['Rental Item', 'First Name', 'Last Name', 'Title', 'Department', 'Vendor', 'Purpose', 'Start Rental', 'End Rental', 'Rental Type', 'Category', 'Total Cost', 'Purchase Order', 'Quote Number'])
-
-    # Loop through the rentals and write to the csv file
-    for rental in rentals:
-        writer.writerow([rental.rental_item, rental.first_name, rental.last_name, rental.title, rental.department, rental.vendor.name, rental.scene_info, rental.start_rental_date, rental.end_rental_date, rental.rental_type, rental.category, rental.total_cost, rental.purchase_order, rental.quote_number])
-
-    return response
+    """ Csv file of the rental equipment report, served from the report cache."""
+    return report_response(request, 'rentals', 'csv', compress=True)
 
 # rental equipment print pdf report
 def rental_pdf(request):
-    """ PDF view of rental list"""
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas and set multiple pages
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-
-    rentals = Rental.objects.all()
-
-    lines = []
-
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}")
-        lines.append(f"First Name: {rental.first_name}")
-        lines.append(f"Last Name: {rental.last_name}")
-        lines.append(f"Title: {rental.title}")
-        lines.append(f"Department: {rental.department} ")
-        lines.append(f"Production: {rental.production}" )
-        lines.append(f"Vendor: {rental.vendor}" )
-        lines.append(f"Purpose/Scene Info: {rental.scene_info}")
-        lines.append(f"Start Rental Date: {rental.start_rental_date}")
-        lines.append(f"End Rental Date: {rental.end_rental_date}")
-        lines.append(f"Drop Off Location: {rental.drop_off_location}")
-        lines.append(f"Drop Off Time: {rental.drop_off_time}")
-        lines.append(f"Pick Up Location: {rental.pick_up_location}")
-        lines.append(f"Pick Up Time: {rental.pick_up_time}")
-        lines.append(f"Rental Type: {rental.rental_type}")
-        lines.append(f"Category: {rental.category}")
-        lines.append(f"Additional Tax Fees:{rental.addl_tax_fees} ")
-        lines.append(f"Total Cost: {rental.total_cost}")
-        lines.append(f"Purchase Order: {rental.purchase_order}")
-        lines.append(f"Quote Number: {rental.quote_number}")
-        lines.append(f"Notes 1: {rental.notes1}")
-        lines.append(f"Notes 2: {rental.notes2}")
-        lines.append(f"Notes 3: {rental.notes3}")
-        lines.append("")
-
-    for line in lines:
-        textob.textLine(line)
-
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='Rental_Report.pdf')
-
-
-#################  main equipment rental list view #####################
-#################  main equipment rental list view #####################
-
-def main_equipment_list(request):
-    """ User list page view. This is for admins to view all users."""
-    rentals = Rental.objects.filter(category='main_equipment').order_by('start_rental_date')
-    # add up total cost totals
-    total_cost = 0
-    for rental in rentals:
-        total_cost += rental.total_cost
-    # add total cost to context
-    context = {'rentals': rentals, 'total_cost': total_cost}
-    return render(request, 'equipment_list_main.html', context)
-
-
-# Generate text report of main equipment rentals
-def main_equipment_txt(request):
-    """ This will print a text file of all the rental equipment."""
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="main_rentals_report.txt"'
-    rentals = Rental.objects.filter(category='main_equipment').order_by('start_rental_date')
-    lines = []
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}\n First Name: {rental.first_name}\n Last Name: {rental.last_name}\n Title: {rental.title}\n Department: {rental.department}\n Production: {rental.production}\n Vendor: {rental.vendor}\n Scene Info: {rental.scene_info}\n Start Rental Date: {rental.start_rental_date}\n End Rental Date: {rental.end_rental_date}\n Drop Off Location: {rental.drop_off_location}\n Drop Off Time: {rental.drop_off_time}\n Pick Up Location: {rental.pick_up_location}\n Pick Up Time: {rental.pick_up_time}\n Rental Type: {rental.rental_type}\n Category: {rental.category}\n Additional Tax Fees: {rental.addl_tax_fees}\n Total Cost: {rental.total_cost}\n Purchase Order: {rental.purchase_order}\n Quote Number: {rental.quote_number}\n Notes 1: {rental.notes1}\n Notes 2: {rental.notes2}\n Notes 3: {rental.notes3}\n\n ")
-        response.writelines(lines)
-    return response
-
-
-# Generate csv report of main equipment rentals
-def main_equipment_csv(request):
-    """" create csv file of rental equipment report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="rental_report.csv"'
-
-    # Create a csv writer
-    writer = csv.writer(response)
-
-    # Designate The Model
-    rentals = Rental.objects.filter(category='main_equipment').order_by('start_rental_date')
-
-    # Add colum headings to the csv file
-    writer.writerow(
-        ['Rental Item', 'First Name', 'Last Name', 'Title', 'Department', 'Vendor', 'Purpose',
-         'Start Rental', 'End Rental',
-         'Rental Type', 'Category', 'Total Cost', 'Purchase Order',
-         'Quote Number'])
-
-    # Loop through the rentals and write to the csv file
-    for rental in rentals:
-        writer.writerow([rental.rental_item, rental.first_name, rental.last_name, rental.title, rental.department,
-                         rental.vendor.name, rental.scene_info, rental.start_rental_date,
-                         rental.end_rental_date, rental.rental_type, rental.category,
-                         rental.total_cost, rental.purchase_order, rental.quote_number,
-                         ])
-
-    return response
-
-# Generate pdf report of main equipment rentals
-def main_equipment_pdf(request):
-    """ PDF view of rental list """
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas and set multiple pages
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-
-    rentals = Rental.objects.filter(category='main_equipment').order_by('start_rental_date')
-
-    lines = []
-
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}")
-        lines.append(f"First Name: {rental.first_name}")
-        lines.append(f"Last Name: {rental.last_name}")
-        lines.append(f"Title: {rental.title}")
-        lines.append(f"Department: {rental.department}")
-        lines.append(f"Production: {rental.production}")
-        lines.append(f"Vendor: {rental.vendor}")
-        lines.append(f"Purpose/Scene Info: {rental.scene_info}")
-        lines.append(f"Start Rental Date: {rental.start_rental_date}")
-        lines.append(f"End Rental Date: {rental.end_rental_date}")
-        lines.append(f"Drop Off Location: {rental.drop_off_location}")
-        lines.append(f"Drop Off Time: {rental.drop_off_time}")
-        lines.append(f"Pick Up Location: {rental.pick_up_location}")
-        lines.append(f"Pick Up Time: {rental.pick_up_time}")
-        lines.append(f"Rental Type: {rental.rental_type}")
-        lines.append(f"Category: {rental.category}")
-        lines.append(f"Additional Tax Fees: {rental.addl_tax_fees}")
-        lines.append(f"Total Cost: {rental.total_cost}")
-        lines.append(f"Purchase Order: {rental.purchase_order}")
-        lines.append(f"Quote Number: {rental.quote_number}")
-        lines.append(f"Notes 1: {rental.notes1}")
-        lines.append(f"Notes 2: {rental.notes2}")
-        lines.append(f"Notes 3: {rental.notes3}")
-        lines.append("")
-
-    for line in lines:
-        textob.textLine(line)
-
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='main_equipment_report.pdf')
-
-
-
-#################  spacial equipment rental list view #####################
-#################  special equipment rental list view #####################
-
-# special equipment list view
-def special_equipment_list(request):
-    """ User list page view. This is for admins to view all users."""
-    rentals = Rental.objects.filter(category='special_equipment').order_by('start_rental_date')
-    # add up total cost totals
-    total_cost = 0
-    for rental in rentals:
-        total_cost += rental.total_cost
-    # add total cost to context
-    context = {'rentals': rentals, 'total_cost': total_cost}
-    return render(request, 'equipment_list_special.html', context)
-
-
-# Generate text report of special equipment rentals
-def special_equipment_txt(request):
-    """ This will print a text file of all the rental equipment."""
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="special_rentals_report.txt"'
-    rentals = Rental.objects.filter(category='special_equipment').order_by('start_rental_date')
-    lines = []
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}\n First Name: {rental.first_name}\n Last Name: {rental.last_name}\n Title: {rental.title}\n Department: {rental.department}\n Production: {rental.production}\n Vendor: {rental.vendor}\n Scene Info: {rental.scene_info}\n Start Rental Date: {rental.start_rental_date}\n End Rental Date: {rental.end_rental_date}\n Drop Off Location: {rental.drop_off_location}\n Drop Off Time: {rental.drop_off_time}\n Pick Up Location: {rental.pick_up_location}\n Pick Up Time: {rental.pick_up_time}\n Rental Type: {rental.rental_type}\n Category: {rental.category}\n Additional Tax Fees: {rental.addl_tax_fees}\n Total Cost: {rental.total_cost}\n Purchase Order: {rental.purchase_order}\n Quote Number: {rental.quote_number}\n Notes 1: {rental.notes1}\n Notes 2: {rental.notes2}\n Notes 3: {rental.notes3}\n\n ")
-        response.writelines(lines)
-    return response
-
-# Generate csv report of special equipment rentals
-def special_equipment_csv(request):
-    """" create csv file of rental equipment report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="special_equipment_report.csv"'
-
-    # Create a csv writer
-    writer = csv.writer(response)
-
-    # Designate The Model
-    rentals = Rental.objects.filter(category='special_equipment').order_by('start_rental_date')
-
-    # Add colum headings to the csv file
-    writer.writerow(
-        ['Rental Item', 'First Name', 'Last Name', 'Title', 'Department', 'Vendor', 'Purpose',
-         'Start Rental', 'End Rental',
-         'Rental Type', 'Category', 'Total Cost', 'Purchase Order',
-         'Quote Number'])
-
-    # Loop through the rentals and write to the csv file
-    for rental in rentals:
-        writer.writerow([rental.rental_item, rental.first_name, rental.last_name, rental.title, rental.department,
-                         rental.vendor.name, rental.scene_info, rental.start_rental_date,
-                         rental.end_rental_date,
-                         rental.rental_type, rental.category,
-                         rental.total_cost, rental.purchase_order, rental.quote_number])
-
-    return response
-
-# Generate pdf report of special equipment rentals
-def special_equipment_pdf(request):
-    """ PDF view of rental list """
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas and set multiple pages
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-
-    rentals = Rental.objects.filter(category='special_equipment').order_by('start_rental_date')
-
-    lines = []
-
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}")
-        lines.append(f"First Name: {rental.first_name}")
-        lines.append(f"Last Name: {rental.last_name}")
-        lines.append(f"Title: {rental.title}")
-        lines.append(f"Department: {rental.department}")
-        lines.append(f"Production: {rental.production}")
-        lines.append(f"Vendor: {rental.vendor}")
-        lines.append(f"Purpose/Scene Info: {rental.scene_info}")
-        lines.append(f"Start Rental Date: {rental.start_rental_date}")
-        lines.append(f"End Rental Date: {rental.end_rental_date}")
-        lines.append(f"Drop Off Location: {rental.drop_off_location}")
-        lines.append(f"Drop Off Time: {rental.drop_off_time}")
-        lines.append(f"Pick Up Location: {rental.pick_up_location}")
-        lines.append(f"Pick Up Time: {rental.pick_up_time}")
-        lines.append(f"Rental Type: {rental.rental_type}")
-        lines.append(f"Category: {rental.category}")
-        lines.append(f"Additional Tax Fees: {rental.addl_tax_fees}")
-        lines.append(f"Total Cost: {rental.total_cost}")
-        lines.append(f"Purchase Order: {rental.purchase_order}")
-        lines.append(f"Quote Number: {rental.quote_number}")
-        lines.append(f"Notes 1: {rental.notes1}")
-        lines.append(f"Notes 2: {rental.notes2}")
-        lines.append(f"Notes 3: {rental.notes3}")
-        lines.append("")
-
-    for line in lines:
-        textob.textLine(line)
-
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='special_equipment_report.pdf')
-
-
-#################  set production equipment rental list view #####################
-#################  set production equipment rental list view #####################
-
-# Set production equipment list view
-def set_equipment_list(request):
-    """ User list page view. This is for admins to view all users."""
-    rentals = Rental.objects.filter(category='set_equipment').order_by('start_rental_date')
-    # add up total cost totals
-    total_cost = 0
-    for rental in rentals:
-        total_cost += rental.total_cost
-    # add total cost to context
-    context = {'rentals': rentals, 'total_cost': total_cost}
-    return render(request, 'equipment_list_set.html', context)
-
-
-# Generate text report of set equipment rentals
-def set_equipment_txt(request):
-    """ This will print a text file of all the rental equipment."""
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="set_rentals_report.txt"'
-    rentals = Rental.objects.filter(category='set_equipment').order_by('start_rental_date')
-    lines = []
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}\n First Name: {rental.first_name}\n Last Name: {rental.last_name}\n Title: {rental.title}\n Department: {rental.department}\n Production: {rental.production}\n Vendor: {rental.vendor}\n Scene Info: {rental.scene_info}\n Start Rental Date: {rental.start_rental_date}\n End Rental Date: {rental.end_rental_date}\n Drop Off Location: {rental.drop_off_location}\n Drop Off Time: {rental.drop_off_time}\n Pick Up Location: {rental.pick_up_location}\n Pick Up Time: {rental.pick_up_time}\n Rental Type: {rental.rental_type}\n Category: {rental.category}\n Additional Tax Fees: {rental.addl_tax_fees}\n Total Cost: {rental.total_cost}\n Purchase Order: {rental.purchase_order}\n Quote Number: {rental.quote_number}\n Notes 1: {rental.notes1}\n Notes 2: {rental.notes2}\n Notes 3: {rental.notes3}\n\n ")
-        response.writelines(lines)
-    return response
-
-# Generate csv report of set equipment rentals
-def set_equipment_csv(request):
-    """" create csv file of rental equipment report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="set_equipment_report.csv"'
-
-    # Create a csv writer
-    writer = csv.writer(response)
-
-    # Designate The Model
-    rentals = Rental.objects.filter(category='set_equipment').order_by('start_rental_date')
-
-    # Add colum headings to the csv file
-    writer.writerow(
-        ['Rental Item', 'First Name', 'Last Name', 'Title', 'Department', 'Vendor', 'Scene Info',
-         'Start Rental', 'End Rental',
-         'Rental Type', 'Category', 'Total Cost', 'Purchase Order',
-         'Quote Number'])
-
-    # Loop through the rentals and write to the csv file
-    for rental in rentals:
-        writer.writerow([rental.rental_item, rental.first_name, rental.last_name, rental.title, rental.department,
-                         rental.vendor.name, rental.scene_info, rental.start_rental_date,
-                         rental.end_rental_date,
-                         rental.rental_type, rental.category,
-                         rental.total_cost, rental.purchase_order, rental.quote_number
-                         ])
-
-    return response
-
-# Generate pdf report of set equipment rentals
-def set_equipment_pdf(request):
-    """ PDF view of rental list """
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas and set multiple pages
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-
-    rentals = Rental.objects.filter(category='set_equipment').order_by('start_rental_date')
-
-    lines = []
-
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}")
-        lines.append(f"First Name: {rental.first_name}")
-        lines.append(f"Last Name: {rental.last_name}")
-        lines.append(f"Title: {rental.title}")
-        lines.append(f"Department: {rental.department}")
-        lines.append(f"Production: {rental.production}")
-        lines.append(f"Vendor: {rental.vendor}")
-        lines.append(f"Purpose/Scene Info: {rental.scene_info}")
-        lines.append(f"Start Rental Date: {rental.start_rental_date}")
-        lines.append(f"End Rental Date: {rental.end_rental_date}")
-        lines.append(f"Drop Off Location: {rental.drop_off_location}")
-        lines.append(f"Drop Off Time: {rental.drop_off_time}")
-        lines.append(f"Pick Up Location: {rental.pick_up_location}")
-        lines.append(f"Pick Up Time: {rental.pick_up_time}")
-        lines.append(f"Rental Type: {rental.rental_type}")
-        lines.append(f"Category: {rental.category}")
-        lines.append(f"Additional Tax Fees: {rental.addl_tax_fees}")
-        lines.append(f"Total Cost: {rental.total_cost}")
-        lines.append(f"Purchase Order: {rental.purchase_order}")
-        lines.append(f"Quote Number: {rental.quote_number}")
-        lines.append(f"Notes 1: {rental.notes1}")
-        lines.append(f"Notes 2: {rental.notes2}")
-        lines.append(f"Notes 3: {rental.notes3}")
-        lines.append("")
-
-    for line in lines:
-        textob.textLine(line)
-
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='set_equipment_report.pdf')
-
-
-
-#################  office equipment rental list view #####################
-#################  office equipment rental list view #####################
-
-# production office equipment list view
-def production_office_equipment_list(request):
-     """ User list page view. This is for admins to view all users."""
-     rentals = Rental.objects.filter(category='office_equipment').order_by('start_rental_date')
-     # add up total cost totals
-     total_cost = 0
-     for rental in rentals:
-         total_cost += rental.total_cost
-     # add total cost to context
-     context = {'rentals': rentals, 'total_cost': total_cost}
-     return render(request, 'equipment_list_office.html', context)
-
-# Generate text report of set equipment rentals
-def office_equipment_txt(request):
-    """ This will print a text file of all the rental equipment."""
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="office_rentals_report.txt"'
-    rentals = Rental.objects.filter(category='office_equipment').order_by('start_rental_date')
-    lines = []
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}\n First Name: {rental.first_name}\n Last Name: {rental.last_name}\n Title: {rental.title}\n Department: {rental.department}\n Production: {rental.production}\n Vendor: {rental.vendor}\n Scene Info: {rental.scene_info}\n Start Rental Date: {rental.start_rental_date}\n End Rental Date: {rental.end_rental_date}\n Drop Off Location: {rental.drop_off_location}\n Drop Off Time: {rental.drop_off_time}\n Pick Up Location: {rental.pick_up_location}\n Pick Up Time: {rental.pick_up_time}\n Rental Type: {rental.rental_type}\n Category: {rental.category}\n Additional Tax Fees: {rental.addl_tax_fees}\n Total Cost: {rental.total_cost}\n Purchase Order: {rental.purchase_order}\n Quote Number: {rental.quote_number}\n Notes 1: {rental.notes1}\n Notes 2: {rental.notes2}\n Notes 3: {rental.notes3}\n\n ")
-        response.writelines(lines)
-    return response
-
-# Generate csv report of set equipment rentals
-def office_equipment_csv(request):
-    """" create csv file of rental equipment report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="office_equipment_report.csv"'
-
-    # Create a csv writer
-    writer = csv.writer(response)
-
-    # Designate The Model
-    rentals = Rental.objects.filter(category='office_equipment').order_by('start_rental_date')
-
-    # Add colum headings to the csv file
-    writer.writerow(
-        ['Rental Item', 'First Name', 'Last Name', 'Title', 'Department', 'Vendor', 'Purpose',
-         'Start Rental', 'End Rental',
-         'Rental Type', 'Category','Total Cost', 'Purchase Order',
-         'Quote Number'])
-
-    # Loop through the rentals and write to the csv file
-    for rental in rentals:
-        writer.writerow([rental.rental_item, rental.first_name, rental.last_name, rental.title, rental.department,
-                         rental.vendor.name, rental.scene_info, rental.start_rental_date,
-                         rental.end_rental_date,
-                        rental.rental_type, rental.category,
-                         rental.total_cost, rental.purchase_order, rental.quote_number])
-
-    return response
-
-# Generate pdf report of set equipment rentals
-def office_equipment_pdf(request):
-    """ PDF view of rental list """
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas and set multiple pages
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-
-    rentals = Rental.objects.filter(category='office_equipment').order_by('start_rental_date')
-
-    lines = []
-
-    for rental in rentals:
-        lines.append(f"Rental Item: {rental.rental_item}")
-        lines.append(f"First Name: {rental.first_name}")
-        lines.append(f"Last Name: {rental.last_name}")
-        lines.append(f"Title: {rental.title}")
-        lines.append(f"Department: {rental.department}")
-        lines.append(f"Production: {rental.production}")
-        lines.append(f"Vendor: {rental.vendor}")
-        lines.append(f"Purpose/Scene Info: {rental.scene_info}")
-        lines.append(f"Start Rental Date: {rental.start_rental_date}")
-        lines.append(f"End Rental Date: {rental.end_rental_date}")
-        lines.append(f"Drop Off Location: {rental.drop_off_location}")
-        lines.append(f"Drop Off Time: {rental.drop_off_time}")
-        lines.append(f"Pick Up Location: {rental.pick_up_location}")
-        lines.append(f"Pick Up Time: {rental.pick_up_time}")
-        lines.append(f"Rental Type: {rental.rental_type}")
-        lines.append(f"Category: {rental.category}")
-        lines.append(f"Additional Tax Fees: {rental.addl_tax_fees}")
-        lines.append(f"Total Cost: {rental.total_cost}")
-        lines.append(f"Purchase Order: {rental.purchase_order}")
-        lines.append(f"Quote Number: {rental.quote_number}")
-        lines.append(f"Notes 1: {rental.notes1}")
-        lines.append(f"Notes 2: {rental.notes2}")
-        lines.append(f"Notes 3: {rental.notes3}")
-        lines.append("")
-
-    for line in lines:
-        textob.textLine(line)
-
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='office_equipment_report.pdf')
-
-#################  misc equipment rental list view #####################
-#################  misc equipment rental list view #####################
-
-# Misc equipment list view
-def misc_equipment_list(request):
-    """ User list page view. This is for admins to view all users."""
-    rentals = Rental.objects.filter(category='misc_equipment').order_by('start_rental_date')
-    # add up total cost totals
-    total_cost = 0
-    for rental in rentals:
-        total_cost += rental.total_cost
-    # add total cost to context
-    context = {'rentals': rentals, 'total_cost': total_cost}
-    return render(request, 'equipment_list_misc.html', context)
+    """ PDF table of the rental list with running totals, served from the report cache."""
+    return report_response(request, 'rentals', 'pdf')
+
+
+#################  category rental list views #####################
+#################  category rental list views #####################
+
+# heading and scene column header of each category's list page, as on the
+# per-category pages these views replaced
+CATEGORY_PAGES = {
+    'main_equipment': ('MAIN EQUIPMENT RENTAL LIST', 'Purpose/Scene'),
+    'special_equipment': ('SPECIAL EQUIPMENT RENTAL LIST', 'Purpose/Scene'),
+    'set_equipment': ('SET PRODUCTION EQUIPMENT RENTAL LIST', 'Scene'),
+    'office_equipment': ('PRODUCTION OFFICE RENTAL LIST', 'Purpose/Scene'),
+    'misc_equipment': ('MISC RENTAL LIST', 'Purpose/Scene'),
+}
+
+
+# rentals in one category, every Rental.category choice shares these views
+@conditional_page(Rental, related=PAGE_RELATED)
+def category_list(request, category):
+    """ Rental list page for one category, one page at a time with the category total."""
+    rentals = Rental.objects.for_category(category)
+    page = keyset_page(request, rentals.for_list(), ('start_rental_date',))
+    title, scene_header = CATEGORY_PAGES.get(category, (get_report(category).title, 'Purpose/Scene'))
+    context = {
+        'category': category,
+        'title': title,
+        'scene_header': scene_header,
+        'rentals': page.object_list,
+        'page': page,
+        # add up total cost totals in the database
+        'total_cost': rentals.total(),
+    }
+    return render(request, 'equipment_list.html', context)
+
+
+# text, csv or pdf report of the rentals in one category
+def category_report(request, category, fmt):
+    """ Report of one category's rentals in fmt, served from the report cache."""
+    return report_response(request, category, fmt)
 
 
 
@@ -1086,104 +500,37 @@ def misc_equipment_list(request):
 # service list view
 def service_list(request):
     """ User list page view. This is for admins to view all users."""
-    services = Service.objects.all().order_by('start_service_date')
-    days_till_end = Service.days_to_end_service
-    # add up total cost totals
-    total_cost = 0
-    for service in services:
-        total_cost += service.total
+    services = Service.objects.for_list()
+    # add up total cost totals in the database, over every service not just this page
+    total_cost = services.total()
+    page = keyset_page(request, services, ('start_service_date',))
     # add total cost to context
-    context = {'services': services, 'total_cost': total_cost, 'days_till_end': days_till_end}
+    context = {'services': page.object_list, 'page': page, 'total_cost': total_cost}
     return render(request, 'services_list.html', context)
 
 
 # Print Service list as text
 # Generate text report of set equipment rentals
 def service_list_txt(request):
-    """ This will print a text file of the service list."""
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="set_rentals_report.txt"'
-    services = Service.objects.all().order_by('start_service_date')
-    lines = []
-    #fields = ['service', 'description', 'rate', 'total', 'start_service_date', 'end_service_date', 'vendor', 'service_location', 'requestor', 'title', 'production', 'department', 'purchase_order', 'payment_type', 'notes1', 'notes2', 'notes3',]
-    for service in services:
-        lines.append(f"Service: {service.service}\n Description: {service.description}\n Rate: {service.rate}\n Total: {service.total}\n Start Service Date: {service.start_service_date}\n End Service Date: {service.end_service_date}\n Vendor: {service.vendor}\n Service Location: {service.service_location}\n Requestor: {service.requestor}\n Title: {service.title}\n Production: {service.production}\n Department: {service.department}\n Purchase Order: {service.purchase_order}\n Payment Type: {service.payment_type}\n Notes 1: {service.notes1}\n Notes 2: {service.notes2}\n Notes 3: {service.notes3}\n\n ")
-        response.writelines(lines)
-    return response
+    """ Text file of the service list, served from the report cache."""
+    return report_response(request, 'services', 'txt', compress=True)
 
 # Print service list as csv
 def service_list_csv(request):
-    """" create csv file of rental equipment report"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="service_report.csv"'
-
-    # Create a csv writer
-    writer = csv.writer(response)
-
-    # Designate The Model
-    services = Service.objects.all().order_by('start_service_date')
-
-    # Add colum headings to the csv file
-    writer.writerow(
-        ['Service', 'Description', 'Total', 'Start Date', 'End Date', 'Vendor', 'Service Location',
-         'Requestor', 'Title', 'Department', 'Purchase Order', 'Payment Type'])
-
-    # Loop through the rentals and write to the csv file
-    for service in services:
-        writer.writerow([service.service, service.description, service.total, service.start_service_date,
-                         service.end_service_date, service.vendor.name, service.service_location, service.requestor,
-                         service.title, service.department, service.purchase_order,
-                         service.payment_type])
-
-    return response
+    """ Csv file of the service report, served from the report cache."""
+    return report_response(request, 'services', 'csv', compress=True)
 
 # print service list as pdf
 def service_list_pdf(request):
-    """ PDF view of service list """
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas and set multiple pages
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-    services = Service.objects.all().order_by('start_service_date')
-    lines = []
-    for service in services:
-        lines.append(f"Service: {service.service}")
-        lines.append(f"Description: {service.description}")
-        lines.append(f"Rate: {service.rate}")
-        lines.append(f"Total: {service.total}")
-        lines.append(f"Start Service Date: {service.start_service_date}")
-        lines.append(f"End Service Date: {service.end_service_date}")
-        lines.append(f"Vendor: {service.vendor}")
-        lines.append(f"Service Location: {service.service_location}")
-        lines.append(f"Requestor: {service.requestor}")
-        lines.append(f"Title: {service.title}")
-        lines.append(f"Production: {service.production}")
-        lines.append(f"Department: {service.department} ")
-        lines.append(f"Purchase Order: {service.purchase_order} ")
-        lines.append(f"Payment Type: {service.payment_type} ")
-        lines.append(f"Notes 1: {service.notes1} ")
-        lines.append(f"Notes 2: {service.notes2} ")
-        lines.append(f"Notes 3: {service.notes3} ")
-        lines.append("")
-    for line in lines:
-        textob.textLine(line)
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='service_report.pdf')
+    """ PDF table of the service list with running totals, served from the report cache."""
+    return report_response(request, 'services', 'pdf')
 
 
 # Service form
-class ServiceFormView(CreateView):
+class ServiceFormView(AutocompleteFormMixin, CreateView):
     """ Rental information form view. This is for the admin to enter rental information."""
     model = Service
+    autocomplete_fields = FORM_FIELDS
     template_name = 'service_form.html'
     fields = ['service', 'description', 'rate', 'total', 'start_service_date', 'end_service_date', 'vendor', 'service_location', 'requestor', 'title', 'production', 'department', 'purchase_order', 'payment_type', 'notes1', 'notes2', 'notes3',]
     context_object_name = 'form'
@@ -1223,63 +570,23 @@ class ServiceDetailView(DetailView):
 # print service details as txt
 def service_detail_txt(request, pk):
     """ This will print a text file of the service details."""
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="service_report.txt"'
-    service = get_object_or_404(Service, pk=pk)
-    lines = []
-    lines.append(f"\n\n\n SERVICE DETAILS\n Production: {service.production}\n Service: {service.service}\n Description: {service.description}\n Rate: ${service.rate:,.2F}\n Total: ${service.total:,.2F}\n Start Service Date: {service.start_service_date}\n End Service Date: {service.end_service_date}\n Vendor: {service.vendor}\n Service Location: {service.service_location}\n Requestor: {service.requestor}\n Title: {service.title}\n Production: {service.production}\n Department: {service.department}\n Purchase Order: {service.purchase_order}\n Payment Type: {service.payment_type}\n Notes 1: {service.notes1}\n Notes 2: {service.notes2}\n Notes 3: {service.notes3}")
-    response.writelines(lines)
-    return response
+    service = get_object_or_404(Service.objects.select_related('department', 'production', 'vendor'), pk=pk)
+    lines = service_text_lines(service)
+    # served from the document cache while the text is unchanged
+    return document_response(request, service, 'txt', lines, 'service_report.txt')
 
 # print service details as pdf
 def service_detail_pdf(request, pk):
     """ PDF view of service details """
-    # create Bytestream buffer
-    buffer = io.BytesIO()
-    # create a canvas and set multiple pages
-    p = canvas.Canvas(buffer, pagesize=letter, bottomup=0)
-    # create text object
-    textob = p.beginText()
-    textob.setTextOrigin(inch, inch)
-    textob.setFont("Helvetica", 14)
-    service = get_object_or_404(Service, pk=pk)
-    lines = []
-    lines.append('')
-    lines.append('SERVICE DETAILS')
-    lines.append('___________________')
-    lines.append('')
-    lines.append(f'Production: {service.production}')
-    lines.append(f'Service: {service.service}')
-    lines.append(f'Description: {service.description}')
-    lines.append(f'Rate: ${service.rate:,.2f}')
-    lines.append(f'Total: ${service.total:,.2f}')
-    lines.append(f'Start Service Date: {service.start_service_date}')
-    lines.append(f'End Service Date: {service.end_service_date}')
-    lines.append(f'Vendor: {service.vendor}')
-    lines.append(f'Service Location: {service.service_location}')
-    lines.append(f'Requestor: {service.requestor}')
-    lines.append(f'Title: {service.title}')
-    lines.append(f'Department: {service.department}')
-    lines.append(f'Purchase Order: {service.purchase_order}')
-    lines.append(f'Payment Type: {service.payment_type}')
-    lines.append(f'Notes 1: {service.notes1}')
-    lines.append(f'Notes 2: {service.notes2}')
-    lines.append(f'Notes 3: {service.notes3}')
-    lines.append("")
-    for line in lines:
-        textob.textLine(line)
-    # Draw the text object on the canvas
-    p.drawText(textob)
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-    # Return response
-    return FileResponse(buffer, as_attachment=True, filename='service_report.pdf')
+    service = get_object_or_404(Service.objects.select_related('department', 'production', 'vendor'), pk=pk)
+    # ReportLab only runs when the text changed since the last download
+    return document_response(request, service, 'pdf', service_pdf_lines(service), 'service_report.pdf')
 
 # Vendor update view
-class ServiceUpdateView(UpdateView):
+class ServiceUpdateView(AutocompleteFormMixin, UpdateView):
     """ Vendor update view. This is for the admin to update vendor information."""
     model = Service
+    autocomplete_fields = FORM_FIELDS
     template_name = 'service_update.html'
     fields = ['service', 'description', 'rate', 'total', 'start_service_date', 'end_service_date', 'vendor',
               'service_location', 'requestor', 'title', 'production', 'department', 'purchase_order', 'payment_type', 'notes1', 'notes2', 'notes3',]
@@ -1316,32 +623,21 @@ class ServiceDeleteView(DeleteView):
 
 
 # search_by_category
-class SearchRentals(ListView):
+class SearchRentals(SearchListMixin, ListView):
     model = Rental
     template_name = 'search_rentals.html'
     context_object_name = 'rentals'
+    keyset_ordering = ('start_rental_date',)
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = apply_facets(Rental.objects.for_list(), self.request.GET, RENTAL_FACETS)
         query = self.request.GET.get('q')
         if query:
-            queryset = queryset.filter(
-                 Q(category__icontains=query) |
-                 Q(rental_item__icontains=query) |
-                 Q(first_name__icontains=query) |
-                 Q(last_name__icontains=query) |
-                 Q(rental_type__icontains=query) |
-                 Q(total_cost__icontains=query) |
-                 Q(purchase_order__contains=query) |
-                 Q(quote_number__icontains=query) |
-                 Q(department__department_name__icontains=query) |
-                 Q(vendor__name__icontains=query)
-            )
-
-            # add up total cost totals
-            total_cost = 0
-            for rental in queryset:
-                total_cost += rental.total_cost
+            # structured tokens become column filters, the rest is ranked full text search
+            queryset = apply_query(queryset, query, RENTAL_QUERY)
+
+            # add up total cost totals in the database
+            total_cost = queryset.total()
             # add total cost to context
             self.extra_context = {'total_cost': total_cost}
 
@@ -1350,31 +646,27 @@ class SearchRentals(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('q', '')
-        data = context
+        if context['search_query']:
+            # counts for every facet value, one GROUP BY per facet
+            context['facets'] = facet_groups(self.object_list, self.request.GET, RENTAL_FACETS)
         return context
 
 # search_by_service
-class SearchServices(ListView):
+class SearchServices(SearchListMixin, ListView):
     model = Service
     template_name = 'search_service.html'
     context_object_name = 'services'
+    keyset_ordering = ('start_service_date',)
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = apply_facets(Service.objects.for_list(), self.request.GET, SERVICE_FACETS)
         query = self.request.GET.get('q')
         if query:
-            queryset = queryset.filter(
-                Q(service__icontains=query) |
-                Q(vendor__name__icontains=query) |
-                Q(requestor__icontains=query) |
-                Q(purchase_order__contains=query) |
-                Q(department__department_name__icontains=query)
-            )
-
-            # add up total cost totals
-            total_cost = 0
-            for service in queryset:
-                total_cost += service.total
+            # structured tokens become column filters, the rest is ranked full text search
+            queryset = apply_query(queryset, query, SERVICE_QUERY)
+
+            # add up total cost totals in the database
+            total_cost = queryset.total()
             # add total cost to context
             self.extra_context = {'total_cost': total_cost}
 
@@ -1384,24 +676,26 @@ class SearchServices(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('q', '')
+        if context['search_query']:
+            # counts for every facet value, one GROUP BY per facet
+            context['facets'] = facet_groups(self.object_list, self.request.GET, SERVICE_FACETS)
         return context
 
 
 
 # Search vendors
-class SearchVendors(ListView):
+class SearchVendors(SearchListMixin, ListView):
     model = Vendor
     template_name = 'search_vendors.html'
     context_object_name = 'vendors'
+    keyset_ordering = ('name',)
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = Vendor.objects.select_related('category')
         query = self.request.GET.get('q')
         if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) |
-                Q(category__name__icontains=query)
-            )
+            # ranked full text search over the vendor search document
+            queryset = search(queryset, query)
 
         return queryset
 
@@ -1409,3 +703,137 @@ class SearchVendors(ListView):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('q', '')
         return context
+
+
+
+# vendor, department, production and driver suggestions for the forms
+def autocomplete(request, source):
+    """ Suggestions from one autocomplete source for what was typed, as JSON."""
+    if source not in SOURCES:
+        raise Http404("No such autocomplete source")
+    query = request.GET.get('q', '')
+    return JsonResponse({'query': query, 'results': SOURCES[source].suggest(query)})
+
+
+# one search box for rentals, services, vendors and vehicles
+def global_search_view(request):
+    """ Grouped search results across every entity type, as JSON."""
+    query = request.GET.get('q', '').strip()
+    started = time.monotonic()
+    groups = global_search(query) if query else []
+    took = round((time.monotonic() - started) * 1000, 1)
+    return JsonResponse({'query': query, 'took_ms': took, 'groups': groups})
+
+
+# closest plate, PO, contract and quote numbers to what was typed
+def identifier_lookup(request):
+    """ Fuzzy identifier lookup across rentals, services and vehicles, as JSON."""
+    query = request.GET.get('q', '')
+    results = [{
+        'type': match.obj._meta.model_name,
+        'id': match.obj.pk,
+        'field': match.field,
+        'value': match.value,
+        'score': round(match.score, 3),
+        'label': str(match.obj),
+        'url': reverse(DETAIL_URLS[match.obj._meta.label_lower], args=[match.obj.pk]),
+    } for match in closest_matches(query)]
+    return JsonResponse({'query': query, 'results': results})
+
+
+
+# overlapping bookings of the same item or plate in one production
+def booking_conflicts(request, production):
+    """ Every double booking in a production, by booking rule, as JSON."""
+    production = get_object_or_404(Production, pk=production)
+    groups = [{'type': name, 'conflicts': rule.production_conflicts(production)} for name, rule in RULES.items()]
+    return JsonResponse({'production': production.pk, 'groups': groups})
+
+
+
+# rentals, services and vehicles out on each day of a production
+def production_timeline(request, production):
+    """ Daily counts and spend of a production's bookings, as JSON."""
+    production = get_object_or_404(Production, pk=production)
+    return JsonResponse(timeline(production))
+
+
+################## REPORT JOB VIEWS #####################
+################## REPORT JOB VIEWS #####################
+
+# detail pdf of many records in one file
+def detail_packet(request, kind):
+    """ Detail pages of the picked rentals, services or vehicles as one pdf packet, queued when large."""
+    if kind not in PACKETS:
+        raise Http404("No such packet")
+    packet = PACKETS[kind]
+    ids = parse_ids(request.GET.getlist('id') + request.GET.getlist('ids'))
+    query = request.GET.get('q', '').strip()
+    if not ids and not query:
+        return HttpResponseBadRequest("Pick the records by id or with a search.")
+    # one row past the limit tells a large packet without counting them all
+    records = list(packet.select(ids, query)[:QUEUE_AFTER + 1])
+    if not records:
+        raise Http404("No records match")
+    if len(records) > QUEUE_AFTER:
+        # too big to draw in the request, the report worker draws it
+        job = submit_packet(kind, ids, query)
+        return JsonResponse(job_status(request, job), status=202)
+    pages = (packet.lines(obj) for obj in records)
+    return FileResponse(packet_file(pages), as_attachment=True, filename=f"{packet.filename}.pdf")
+
+
+# every report in one zip
+def export_bundle(request):
+    """ ZIP of every report, built in parallel and streamed as each one finishes."""
+    formats = [fmt for fmt in request.GET.getlist('format') if fmt in FORMATS] or BUNDLE_FORMATS
+    filename = f"reports_{timezone.localdate():%Y-%m-%d}.zip"
+    return streaming_response(request, zip_chunks(bundle_members(formats)), 'application/zip', filename)
+
+
+def job_status(request, job):
+    """ Status of a report job as a dict for JsonResponse."""
+    data = {
+        'id': job.pk,
+        'report': job.report,
+        'format': job.format,
+        'status': job.status,
+        'progress': job.progress,
+        'status_url': request.build_absolute_uri(reverse('report_job_status', args=[job.pk])),
+        'download_url': None,
+        'error': job.error,
+    }
+    if job.status == ReportJob.DONE:
+        data['download_url'] = request.build_absolute_uri(reverse('report_job_download', args=[job.pk]))
+    return data
+
+
+# queue a report for the background worker
+@require_POST
+def report_job_submit(request, report, fmt):
+    """ Queue a report and return the job id and the url to poll."""
+    try:
+        job = submit_job(report, fmt)
+    except (KeyError, ValueError):
+        raise Http404("Unknown report or format.")
+    return JsonResponse(job_status(request, job), status=202)
+
+
+# report job status
+def report_job_status(request, pk):
+    """ Status and progress of a queued report."""
+    job = get_object_or_404(ReportJob, pk=pk)
+    return JsonResponse(job_status(request, job))
+
+
+# download a finished report
+def report_job_download(request, pk):
+    """ Serve the finished report file from disk."""
+    job = get_object_or_404(ReportJob, pk=pk)
+    if job.status != ReportJob.DONE:
+        return JsonResponse(job_status(request, job), status=409)
+    try:
+        report_file = open(job.file_path, 'rb')
+    except FileNotFoundError:
+        raise Http404("Report file is no longer available.")
+    return FileResponse(report_file, as_attachment=True, filename=job.filename)
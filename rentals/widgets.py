@@ -0,0 +1,51 @@
+"""
+Autocomplete form widgets for the rental, service and vehicle forms.
+They render the chosen value only and fetch suggestions from the
+autocomplete endpoint as the user types (see autocomplete.py), instead of a
+<select> holding every vendor, department and production.
+"""
+from django import forms
+from django.urls import reverse
+
+from .autocomplete import SOURCES
+
+
+class AutocompleteSelect(forms.Widget):
+    """
+    Widget for a foreign key: a text box with suggestions and a hidden input
+    holding the chosen row's id.
+    """
+    template_name = 'widgets/autocomplete_select.html'
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, source, attrs=None):
+        super().__init__(attrs)
+        self.source = source
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['url'] = reverse('autocomplete', args=[self.source])
+        context['widget']['label'] = SOURCES[self.source].label_for(value) if value not in (None, '') else ''
+        return context
+
+
+class AutocompleteInput(forms.TextInput):
+    """
+    Widget for a free text column (a driver name) that suggests values
+    already entered.
+    """
+    template_name = 'widgets/autocomplete_input.html'
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, source, attrs=None):
+        super().__init__(attrs)
+        self.source = source
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['url'] = reverse('autocomplete', args=[self.source])
+        return context
@@ -0,0 +1,38 @@
+// Suggestions for the autocomplete widgets (rentals/widgets.py).
+// Each box with data-autocomplete fills its datalist from the endpoint as
+// the user types. Boxes with data-target copy the chosen suggestion's id
+// into that hidden input.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('input[data-autocomplete]').forEach(function (box) {
+        var list = document.getElementById(box.getAttribute('list'));
+        var target = box.dataset.target ? document.getElementById(box.dataset.target) : null;
+        var ids = {};
+        var timer = null;
+
+        box.addEventListener('input', function () {
+            if (target) {
+                target.value = ids[box.value] || '';
+            }
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                if (!box.value.trim()) {
+                    return;
+                }
+                fetch(box.dataset.autocomplete + '?q=' + encodeURIComponent(box.value))
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) {
+                        list.innerHTML = '';
+                        data.results.forEach(function (result) {
+                            ids[result.text] = result.id;
+                            var option = document.createElement('option');
+                            option.value = result.text;
+                            list.appendChild(option);
+                        });
+                        if (target) {
+                            target.value = ids[box.value] || '';
+                        }
+                    });
+            }, 150);
+        });
+    });
+});
@@ -6,7 +6,10 @@ from django.contrib import admin
 from .models import Vehicle
 
 # Register your models here.
-admin.site.register(Vehicle)
+@admin.register(Vehicle)
+class VehicleAdmin(admin.ModelAdmin):
+    # autocomplete boxes instead of a <select> of every vendor, department and production
+    autocomplete_fields = ['department', 'production', 'vendor']
 
 
 
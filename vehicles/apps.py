@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class VehiclesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vehicles'
+
+    def ready(self):
+        # register the vehicle reports with the rentals report registry
+        from . import reports
+        # add vehicles to the full text search
+        from . import search
+        # refuse double bookings of a plate
+        from . import bookings
+        # add vehicles to the production timeline
+        from . import timeline
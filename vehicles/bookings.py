@@ -0,0 +1,10 @@
+"""
+Plate booking rule for the double-booking checks and the conflict report in
+rentals/bookings.py.
+Imported from VehiclesConfig.ready().
+"""
+from rentals.bookings import BookingRule, register
+
+# the default plate_number is a placeholder, not a plate
+register(BookingRule('vehicles', 'vehicles.Vehicle', ('plate_number',), 'start_rental_date', 'end_rental_date',
+                     blank=('', 'plate_number')))
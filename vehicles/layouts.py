@@ -0,0 +1,65 @@
+"""
+Report layouts for the vehicles app.
+Same (column heading, attribute path) format as rentals/layouts.py.
+"""
+
+# Vehicle csv columns
+VEHICLE_CSV = [
+    ('Driver', 'driver'),
+    ('Title', 'title'),
+    ('Department', 'department'),
+    ('Vendor', 'vendor.name'),
+    ('Vehicle Type', 'vehicle_type'),
+    ('Plate Number', 'plate_number'),
+    ('Make', 'make'),
+    ('Model', 'model'),
+    ('Color', 'color'),
+    ('Start Rental', 'start_rental_date'),
+    ('End Rental', 'end_rental_date'),
+    ('Contract #', 'contract_number'),
+    ('PO Number', 'purchase_order'),
+    ('Daily Rate', 'daily_rate'),
+    ('Weekly Rate', 'weekly_rate'),
+    ('Monthly Rate', 'monthly_rate'),
+    ('Tax', 'tax'),
+    ('Misc Fees', 'misc_fees'),
+    ('PO Total', 'po_total'),
+]
+
+# Vehicle record fields
+VEHICLE_FIELDS = [
+    ('Driver', 'driver'),
+    ('Title', 'title'),
+    ('Department', 'department'),
+    ('Vendor', 'vendor'),
+    ('Vehicle Type', 'vehicle_type'),
+    ('Plate Number', 'plate_number'),
+    ('Make', 'make'),
+    ('Model', 'model'),
+    ('Color', 'color'),
+    ('Start Rental Date', 'start_rental_date'),
+    ('End Rental Date', 'end_rental_date'),
+    ('Contract Number', 'contract_number'),
+    ('Purchase Order', 'purchase_order'),
+    ('Daily Rate', 'daily_rate'),
+    ('Weekly Rate', 'weekly_rate'),
+    ('Monthly Rate', 'monthly_rate'),
+    ('Tax', 'tax'),
+    ('Misc Fees', 'misc_fees'),
+    ('PO Total', 'po_total'),
+]
+
+# Vehicle pdf table columns
+VEHICLE_PDF = [
+    ('Driver', 'driver', 2),
+    ('Department', 'department', 2),
+    ('Vendor', 'vendor.name', 2),
+    ('Type', 'vehicle_type', 1.5),
+    ('Plate', 'plate_number', 1.5),
+    ('Make/Model', 'model', 2),
+    ('Start', 'start_rental_date', 1.5),
+    ('End', 'end_rental_date', 1.5),
+    ('PO', 'purchase_order', 1.5),
+    ('Status', 'rental_status', 1.5),
+    ('PO Total', 'po_total', 1.7),
+]
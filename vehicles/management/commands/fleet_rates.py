@@ -0,0 +1,38 @@
+"""
+Fleet cost projection from the vectorized rate engine (see vehicles/rates.py).
+python manage.py fleet_rates [--production ID] [--check]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from vehicles.models import Vehicle
+from vehicles.rates import fleet_rates, reconcile, summary
+
+
+class Command(BaseCommand):
+    help = "Price every vehicle's rental at once and print the fleet totals by rate tier."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--production', type=int, help="Only price the vehicles of this production id.")
+        parser.add_argument('--check', action='store_true',
+                            help="Reconcile the totals with the per-vehicle rate methods to the cent.")
+
+    def handle(self, *args, **options):
+        vehicles = Vehicle.objects.all()
+        if options['production'] is not None:
+            vehicles = vehicles.filter(production_id=options['production'])
+        priced = fleet_rates(vehicles)
+        totals = summary(priced)
+        self.stdout.write(f"Vehicles: {totals['count']} ({totals['unpriced']} unpriced)")
+        for tier, row in totals['tiers'].items():
+            self.stdout.write(f"  {tier:<8} {row['count']:>6}  ${row['total']:,.2f}")
+        self.stdout.write(f"Rates: ${totals['rates']:,.2f}")
+        self.stdout.write(f"Tax: ${totals['tax']:,.2f}")
+        self.stdout.write(f"Misc fees: ${totals['misc_fees']:,.2f}")
+        self.stdout.write(f"Total: ${totals['total']:,.2f}")
+        if options['check']:
+            differences = reconcile(vehicles, priced)
+            for pk, column, expected, engine in differences[:20]:
+                self.stderr.write(f"Vehicle {pk} {column}: method {expected}, engine {engine}")
+            if differences:
+                raise CommandError(f"{len(differences)} value(s) do not reconcile.")
+            self.stdout.write("Reconciled with the per-vehicle methods.")
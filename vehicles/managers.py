@@ -0,0 +1,88 @@
+"""
+Custom querysets for the vehicles app.
+Keeps the stored rental_days column in step with the dates on bulk writes,
+which skip Vehicle.save().
+"""
+from django.db import models
+from django.db.models import Case, F, Value, When
+
+from rentals.managers import DaysBetween, TotalsQuerySet
+
+DATE_FIELDS = ('start_rental_date', 'end_rental_date')
+
+# longest rental billed at each rate, see Vehicle.cal_rates
+DAILY_DAYS = 7
+WEEKLY_DAYS = 30
+
+
+def date_value(value):
+    """
+    Date given to update() as an expression, columns and expressions as is.
+    """
+    if hasattr(value, 'resolve_expression'):
+        return value
+    return Value(value, output_field=models.DateField())
+
+
+# Vehicle queryset
+class VehicleQuerySet(TotalsQuerySet):
+    """
+    Queryset for rental vehicles. Totals add up po_total.
+    """
+    total_field = 'po_total'
+    start_field = 'start_rental_date'
+    end_field = 'end_rental_date'
+    list_related = ('department', 'vendor')
+    list_fields = ('driver', 'title', 'vehicle_type', 'plate_number', 'make', 'model', 'color',
+                   'start_rental_date', 'end_rental_date', 'rental_days', 'po_total', 'purchase_order',
+                   'rental_status', 'department__department_name', 'vendor__name')
+    export_related = ('department', 'production', 'vendor')
+
+    def update(self, **kwargs):
+        """
+        Update, working rental_days out again in the same statement when the
+        dates change.
+        """
+        if any(field in kwargs for field in DATE_FIELDS):
+            # SET reads the old row, so use the new dates where they are given
+            start, end = (date_value(kwargs.get(field, F(field))) for field in DATE_FIELDS)
+            kwargs['rental_days'] = DaysBetween(start, end)
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.rental_days = obj.rental_duration
+        return super().bulk_create(objs, *args, **kwargs)
+
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if any(field in fields for field in DATE_FIELDS):
+            for obj in objs:
+                obj.rental_days = obj.rental_duration
+            fields = [*fields, 'rental_days']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    bulk_update.alters_data = True
+
+    def long_rentals(self, days=WEEKLY_DAYS):
+        """
+        Get the vehicles out for more than days, longest first.
+        """
+        return self.filter(rental_days__gt=days).order_by('-rental_days', 'pk')
+
+    def with_rate_tier(self):
+        """
+        Annotate rate_tier, the rate a vehicle is billed at for its rental
+        length: daily, weekly or monthly.
+        """
+        return self.annotate(rate_tier=Case(
+            When(rental_days__lte=DAILY_DAYS, then=Value('daily')),
+            When(rental_days__lte=WEEKLY_DAYS, then=Value('weekly')),
+            When(rental_days__isnull=False, then=Value('monthly')),
+            output_field=models.CharField(),
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-17 17:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0006_vehicle_production'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
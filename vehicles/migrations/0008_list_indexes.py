@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0032_list_indexes'),
+        ('vehicles', '0007_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['start_rental_date'], name='vehicle_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['purchase_order'], name='vehicle_po_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['plate_number'], name='vehicle_plate_idx'),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2 on 2026-10-17 17:41
+
+from django.db import DatabaseError, migrations, models
+
+# the code is copied here rather than imported from rentals.search, so later
+# changes to the app do not change what this migration does
+
+# fields copied into the vehicle search document when the column was added
+VEHICLE_SEARCH = ['driver', 'title', 'vehicle_type', 'plate_number', 'make', 'model', 'color', 'contract_number',
+                  'purchase_order', 'department.department_name', 'vendor.name']
+
+
+def document_text(obj, paths):
+    texts = []
+    for path in paths:
+        value = obj
+        for name in path.split('.'):
+            value = None if value is None else getattr(value, name)
+        if value is not None and str(value):
+            texts.append(str(value))
+    return ' '.join(texts)
+
+
+def backfill(model, paths, batch_size=500):
+    related = sorted({path.split('.')[0] for path in paths if '.' in path})
+    batch = []
+    for row in model.objects.select_related(*related).iterator(chunk_size=batch_size):
+        row.search_document = document_text(row, paths)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ['search_document'])
+
+
+def create_index(schema_editor, table):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table}_search_idx" ON "{table}" '
+            f"USING GIN (to_tsvector('english'::regconfig, search_document))")
+    elif schema_editor.connection.vendor == 'sqlite':
+        fts = f"{table}_fts"
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" '
+                f'USING fts5(search_document, content="{table}", content_rowid="id")')
+        except DatabaseError:
+            # sqlite built without fts5, search falls back to LIKE
+            return
+        schema_editor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS "{fts}_insert" AFTER INSERT ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"(rowid, search_document) VALUES (new.id, new.search_document); END')
+        schema_editor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS "{fts}_delete" AFTER DELETE ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"("{fts}", rowid, search_document) '
+            f'VALUES (\'delete\', old.id, old.search_document); END')
+        schema_editor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS "{fts}_update" AFTER UPDATE ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"("{fts}", rowid, search_document) '
+            f'VALUES (\'delete\', old.id, old.search_document); '
+            f'INSERT INTO "{fts}"(rowid, search_document) VALUES (new.id, new.search_document); END')
+        schema_editor.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+
+
+def drop_index(schema_editor, table):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_search_idx"')
+    elif schema_editor.connection.vendor == 'sqlite':
+        fts = f"{table}_fts"
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{trigger}"')
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+
+
+def build_search(apps, schema_editor):
+    model = apps.get_model('vehicles', 'Vehicle')
+    backfill(model, VEHICLE_SEARCH)
+    create_index(schema_editor, model._meta.db_table)
+
+
+def drop_search(apps, schema_editor):
+    drop_index(schema_editor, apps.get_model('vehicles', 'Vehicle')._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0008_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(build_search, drop_search),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+IDENTIFIERS = ['plate_number', 'purchase_order', 'contract_number']
+
+
+# the index SQL is written out here rather than imported from rentals.fuzzy,
+# so later changes to the app do not change what this migration does
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in IDENTIFIERS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "vehicles_vehicle_{column}_trgm" ON "vehicles_vehicle" '
+            f'USING GIN ("{column}" gin_trgm_ops)')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in IDENTIFIERS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "vehicles_vehicle_{column}_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0009_search_document'),
+        # pg_trgm extension
+        ('rentals', '0034_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+# end - start in days, per database, written out here rather than imported
+# from the app so later changes there do not change this migration
+DAYS_SQL = {
+    'sqlite': 'CAST(julianday(end_rental_date) - julianday(start_rental_date) AS integer)',
+    'mysql': 'DATEDIFF(end_rental_date, start_rental_date)',
+}
+
+
+def backfill_rental_days(apps, schema_editor):
+    table = apps.get_model('vehicles', 'Vehicle')._meta.db_table
+    days = DAYS_SQL.get(schema_editor.connection.vendor, '(end_rental_date - start_rental_date)')
+    # one UPDATE over the table, not a save() per row
+    schema_editor.execute(f'UPDATE "{table}" SET rental_days = {days}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0034_trigram_indexes'),
+        ('vehicles', '0010_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='rental_days',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_rental_days, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['rental_days'], name='vehicle_days_idx'),
+        ),
+    ]
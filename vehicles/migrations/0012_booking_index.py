@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0035_booking_indexes'),
+        ('vehicles', '0011_rental_days'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='vehicle',
+            name='vehicle_plate_idx',
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['plate_number', 'start_rental_date'], name='vehicle_plate_idx'),
+        ),
+    ]
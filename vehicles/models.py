@@ -1,12 +1,14 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
-from rentals.models import Rental, Department, Vendor, Production
-import datetime
+from rentals.models import Rental, Department, Vendor, Production, TimeStampedModel
+
+from .managers import DATE_FIELDS, VehicleQuerySet
 
 # Create your models here.
 
 
-class Vehicle(models.Model):
+class Vehicle(TimeStampedModel):
     """
     Vehicle models for rental vehicles
     """
@@ -22,6 +24,8 @@ class Vehicle(models.Model):
     color = models.CharField(max_length=100)
     start_rental_date = models.DateField()
     end_rental_date = models.DateField()
+    # end - start in days, set by save() and by the queryset bulk writes
+    rental_days = models.IntegerField(null=True, blank=True, editable=False)
     contract_number = models.CharField(max_length=100, blank=True, null=True)
     purchase_order = models.CharField(max_length=100)
     daily_rate = models.DecimalField(max_digits=10, decimal_places=0, null=True, blank=True)
@@ -45,21 +49,46 @@ class Vehicle(models.Model):
     notes1 = models.CharField(max_length=300, blank=True)
     notes2 = models.CharField(max_length=300, blank=True)
     notes3 = models.CharField(max_length=300, blank=True)
+    # text searched by the search views, kept up to date by search.py
+    search_document = models.TextField(blank=True, default='', editable=False)
+
+    objects = VehicleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_rental_date'], name='vehicle_start_idx'),
+            models.Index(fields=['purchase_order'], name='vehicle_po_idx'),
+            # plate lookups and the double-booking check of one plate, see rentals/bookings.py
+            models.Index(fields=['plate_number', 'start_rental_date'], name='vehicle_plate_idx'),
+            # long rental and rate tier reports filter and sort on it
+            models.Index(fields=['rental_days'], name='vehicle_days_idx'),
+        ]
 
     def __str__(self):
         return f"{self.driver} - {self.title} - {self.department} - {self.vehicle_type} - {self.make} - {self.model} - {self.color}"
 
     def save(self, *args, **kwargs):
-        self.days = self.rental_duration  # Access the property without parentheses
+        self.rental_days = self.rental_duration
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and any(field in update_fields for field in DATE_FIELDS):
+            kwargs['update_fields'] = {*update_fields, 'rental_days'}
         super().save(*args, **kwargs)
 
     @property
     def rental_duration(self):
-        if self.start_rental_date and self.end_rental_date:
-            if isinstance(self.start_rental_date, datetime.date) and isinstance(self.end_rental_date, datetime.date):
-                delta = self.end_rental_date - self.start_rental_date
-                return delta.days
+        """
+        Days from the start to the end date. Dates not read from the database
+        yet, like the strings of create(start_rental_date='2025-01-01'), are
+        read the way the date fields read them.
+        """
+        try:
+            start, end = (self._meta.get_field(field).to_python(getattr(self, field)) for field in DATE_FIELDS)
+        except ValidationError:
+            # not a date, the database refuses the row anyway
             return None
+        if start and end:
+            delta = end - start
+            return delta.days
 
     def cal_rates(self):
         """
@@ -79,7 +108,7 @@ class Vehicle(models.Model):
         Calculate the tax based on the rental rate.
         """
         rental_rate = self.cal_rates()  # Use the cal_rates method to get the rental rate
-        if rental_rate:
+        if rental_rate and tax_rate is not None:
             return rental_rate * tax_rate
         return None
 
@@ -88,6 +117,7 @@ class Vehicle(models.Model):
         """
         Calculate the total rental cost.
         """
-        sub_total = self.cal_rates() + self.cal_tax(self.tax) + (self.misc_fees or 0)
+        # unpriced vehicles (no rental days or no tax) count as 0, see rates.py for whole fleets
+        sub_total = (self.cal_rates() or 0) + (self.cal_tax(self.tax) or 0) + (self.misc_fees or 0)
         return sub_total
 
@@ -0,0 +1,127 @@
+"""
+Fleet rate engine: Vehicle.cal_rates, cal_tax and cal_total for a whole
+fleet at once.
+The rates, tax, fees and stored rental_days of every vehicle are loaded with
+one query into NumPy arrays and priced in one vectorized pass. Money is kept
+in integer cents the whole way, so the results are exact to the cent and
+reconcile with the per-vehicle methods (see reconcile).
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import DecimalField, Value
+from django.db.models.functions import Coalesce
+
+from .managers import DAILY_DAYS, WEEKLY_DAYS
+
+# columns loaded for every vehicle, NULL read as 0
+MONEY_COLUMNS = ('daily_rate', 'weekly_rate', 'monthly_rate', 'tax', 'misc_fees')
+
+TIERS = np.array(['daily', 'weekly', 'monthly'])
+
+
+def cents(values):
+    """
+    Integer cents of a column of decimal amounts with at most 2 places.
+    """
+    return np.rint(np.array(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def load(queryset):
+    """
+    Column arrays for the vehicles in queryset: ids, rental days (0 when the
+    dates are missing) and the money columns in cents, tax in hundredths.
+    """
+    zero = Value(Decimal('0'), output_field=DecimalField(max_digits=10, decimal_places=2))
+    rows = list(queryset.order_by('pk').values_list(
+        'pk', Coalesce('rental_days', 0), *(Coalesce(column, zero) for column in MONEY_COLUMNS)))
+    columns = list(zip(*rows)) or [()] * (2 + len(MONEY_COLUMNS))
+    arrays = {
+        'ids': np.array(columns[0], dtype=np.int64),
+        'days': np.array(columns[1], dtype=np.int64),
+    }
+    for column, values in zip(MONEY_COLUMNS, columns[2:]):
+        arrays[column] = cents(values)
+    return arrays
+
+
+def price(arrays):
+    """
+    Price loaded vehicles like Vehicle.cal_rates / cal_tax / cal_total.
+    Rates are billed per day up to DAILY_DAYS, per whole week up to
+    WEEKLY_DAYS and per whole 30 day month past that. Vehicles with no
+    rental days are unpriced and cost their misc fees only.
+    Returns the arrays with tier, rates, tax and total (cents) added.
+    """
+    days = arrays['days']
+    daily = days <= DAILY_DAYS
+    weekly = ~daily & (days <= WEEKLY_DAYS)
+    # rates have no cents, drop them like int() does in cal_rates
+    rate = np.where(daily, arrays['daily_rate'], np.where(weekly, arrays['weekly_rate'], arrays['monthly_rate'])) // 100
+    units = np.where(daily, days, np.where(weekly, days // 7, days // 30))
+    priced = days != 0
+    dollars = np.where(priced, rate * units, 0)
+    # whole dollars times the tax in hundredths is the tax in cents, exactly
+    tax = dollars * arrays['tax']
+    rates = dollars * 100
+    return {
+        **arrays,
+        'priced': priced,
+        'tier': np.where(daily, 0, np.where(weekly, 1, 2)),
+        'rates': rates,
+        'tax_amount': tax,
+        'total': rates + tax + arrays['misc_fees'],
+    }
+
+
+def fleet_rates(queryset):
+    """
+    Priced arrays for every vehicle in queryset.
+    """
+    return price(load(queryset))
+
+
+def to_decimal(value):
+    return (Decimal(int(value)) / 100).quantize(Decimal('0.01'))
+
+
+def summary(priced):
+    """
+    Fleet totals as Decimals, overall and by rate tier.
+    """
+    tiers = {}
+    for number, name in enumerate(TIERS):
+        mask = priced['priced'] & (priced['tier'] == number)
+        tiers[str(name)] = {'count': int(mask.sum()), 'total': to_decimal(priced['total'][mask].sum())}
+    return {
+        'count': len(priced['ids']),
+        'unpriced': int((~priced['priced']).sum()),
+        'rates': to_decimal(priced['rates'].sum()),
+        'tax': to_decimal(priced['tax_amount'].sum()),
+        'misc_fees': to_decimal(priced['misc_fees'].sum()),
+        'total': to_decimal(priced['total'].sum()),
+        'tiers': tiers,
+    }
+
+
+def reconcile(queryset, priced=None):
+    """
+    Compare the engine with the per-vehicle methods to the cent.
+    Returns (pk, column, method value, engine value) for every difference.
+    """
+    if priced is None:
+        priced = fleet_rates(queryset)
+    position = {int(pk): i for i, pk in enumerate(priced['ids'])}
+    differences = []
+    for vehicle in queryset.order_by('pk').iterator(chunk_size=2000):
+        i = position[vehicle.pk]
+        expected = {
+            'rates': vehicle.cal_rates() or 0,
+            'tax_amount': vehicle.cal_tax(vehicle.tax) or 0,
+            'total': vehicle.cal_total(),
+        }
+        for column, value in expected.items():
+            engine = to_decimal(priced[column][i])
+            if Decimal(value).quantize(Decimal('0.01')) != engine:
+                differences.append((vehicle.pk, column, value, engine))
+    return differences
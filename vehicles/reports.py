@@ -0,0 +1,78 @@
+"""
+Vehicle reports for the report registry in rentals/reports.py and the
+vehicle pages of the paperwork packets in rentals/packets.py.
+Imported from VehiclesConfig.ready().
+"""
+from rentals.packets import PacketType, register as register_packet
+from rentals.pdf import money
+from rentals.reports import Report, register
+
+from .layouts import VEHICLE_CSV, VEHICLE_FIELDS, VEHICLE_PDF
+from .models import Vehicle
+from .search import VEHICLE_QUERY
+
+register(Report('vehicles', 'VEHICLE LIST', lambda: Vehicle.objects.for_export().order_by('start_rental_date'),
+                csv=VEHICLE_CSV, txt=VEHICLE_FIELDS, pdf=VEHICLE_PDF, total_path='po_total',
+                filename='vehicle_list',
+                depends_on=('vehicles.vehicle', 'rentals.department', 'rentals.production', 'rentals.vendor')))
+
+
+def vehicle_pdf_lines(vehicle):
+    """
+    Lines of the vehicle detail pdf, also one page of a packet.
+    """
+    lines = []
+    lines.append("")
+    lines.append(f'{vehicle.production}')
+    lines.append('___________________________')
+    lines.append('')
+    lines.append(f"Driver: {vehicle.driver}")
+    lines.append(f"Title: {vehicle.title}")
+    lines.append(f"Department: {vehicle.department}")
+    lines.append(f"Vendor: {vehicle.vendor}")
+    lines.append(f"Vehicle Type: {vehicle.vehicle_type}")
+    lines.append(f"Plate Number: {vehicle.plate_number}")
+    lines.append(f"Make: {vehicle.make}")
+    lines.append(f"Model: {vehicle.model}")
+    lines.append(f"Color: {vehicle.color}")
+    lines.append(f"Start Rental Date: {vehicle.start_rental_date}")
+    lines.append(f"End Rental Date: {vehicle.end_rental_date}")
+    lines.append(f"Contract Number: {vehicle.contract_number}")
+    lines.append(f"Purchase Order: {vehicle.purchase_order}")
+    lines.append(f"Daily Rate: {money(vehicle.daily_rate)}")
+    lines.append(f"Weekly Rate: {money(vehicle.weekly_rate)}")
+    lines.append(f"Monthly Rate: {money(vehicle.monthly_rate)}")
+    lines.append(f"Tax: {vehicle.tax}")
+    lines.append(f"Misc Fees: {money(vehicle.misc_fees)}")
+    lines.append(f"PO Total: {money(vehicle.po_total)}")
+    lines.append("")
+    return lines
+
+
+def vehicle_text_lines(vehicle):
+    """
+    Text of the vehicle detail txt download.
+    """
+    return [f"Driver: {vehicle.driver}\n"
+            f"Title: {vehicle.title}\n"
+            f"Department: {vehicle.department}\n"
+            f"Vendor: {vehicle.vendor}\n"
+            f"Vehicle Type: {vehicle.vehicle_type}\n"
+            f"Plate Number: {vehicle.plate_number}\n"
+            f"Make: {vehicle.make}\n"
+            f"Model: {vehicle.model}\n"
+            f"Color: {vehicle.color}\n"
+            f"Start Rental Date: {vehicle.start_rental_date}\n"
+            f"End Rental Date: {vehicle.end_rental_date}\n"
+            f"Contract Number: {vehicle.contract_number}\n"
+            f"Purchase Order: {vehicle.purchase_order}\n"
+            f"Daily Rate: {money(vehicle.daily_rate)}\n"
+            f"Weekly Rate: {money(vehicle.weekly_rate)}\n"
+            f"Monthly Rate: {money(vehicle.monthly_rate)}\n"
+            f"Tax: {vehicle.tax}\n"
+            f"Misc Fees: {money(vehicle.misc_fees)}\n"
+            f"PO Total: {money(vehicle.po_total)}"]
+
+
+register_packet(PacketType('vehicles', lambda: Vehicle.objects.select_related('department', 'production', 'vendor'),
+                           vehicle_pdf_lines, VEHICLE_QUERY, 'start_rental_date', 'vehicle_packet'))
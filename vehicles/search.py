@@ -0,0 +1,32 @@
+"""
+Vehicle search document for the full text search in rentals/search.py and
+identifier columns for the fuzzy lookup in rentals/fuzzy.py, plus the
+vehicle entries of the global search and the driver autocomplete.
+Imported from VehiclesConfig.ready().
+"""
+from rentals import autocomplete, fuzzy, global_search
+from rentals.query_parser import RELATED_NAMES, QuerySpec
+from rentals.search import register
+
+from .models import Vehicle
+
+# fields copied into the vehicle search document
+VEHICLE_SEARCH = ['driver', 'title', 'vehicle_type', 'plate_number', 'make', 'model', 'color', 'contract_number',
+                  'purchase_order', 'department.department_name', 'vendor.name']
+
+register('vehicles.Vehicle', VEHICLE_SEARCH)
+
+# structured search box tokens for the vehicle search
+VEHICLE_QUERY = QuerySpec(
+    'po_total', 'start_rental_date', 'end_rental_date',
+    fields={'plate': 'plate_number', 'po': 'purchase_order', 'contract': 'contract_number',
+            'status': 'rental_status', 'type': 'vehicle_type'},
+    related=RELATED_NAMES)
+
+fuzzy.register('vehicles.Vehicle', ['plate_number', 'purchase_order', 'contract_number'], 'vehicle_detail')
+
+global_search.register(global_search.SearchTarget(
+    'vehicles', 'Vehicles', lambda: Vehicle.objects.select_related('department'), 'vehicle_detail', VEHICLE_QUERY))
+
+# driver names already entered, for the vehicle forms
+autocomplete.register('drivers', 'vehicles.Vehicle', ['driver'], distinct=True)
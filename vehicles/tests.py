@@ -1,3 +1,244 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.forms.models import model_to_dict
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from rentals import autocomplete
+from rentals.models import Production, Department, Vendor
+from rentals.tests import QueryCountMixin, ReportRootMixin
+
+from .models import Vehicle
+from .views import VehicleUpdateView
+from .rates import fleet_rates, reconcile, summary
 
 # Create your tests here.
+
+def make_vehicles(count):
+    """
+    Create vehicles that each have their own department, production and vendor.
+    """
+    today = datetime.date.today()
+    for i in range(count):
+        Vehicle.objects.create(
+            driver=f"driver {i}",
+            title="title",
+            production=Production.objects.create(show_name=f"show {i}"),
+            department=Department.objects.create(department_name=f"department {i}"),
+            vendor=Vendor.objects.create(name=f"vendor {i}", address="address", phone="555", email="v@example.com"),
+            vehicle_type="van",
+            plate_number=f"PLATE{i}",
+            make="make",
+            model="model",
+            color="white",
+            start_rental_date=today,
+            end_rental_date=today + datetime.timedelta(days=i),
+            purchase_order=f"PO{i}",
+            po_total=100,
+        )
+
+
+class VehicleListQueryTests(QueryCountMixin, TestCase):
+    """ Vehicle list and exports must not run a query per vehicle. """
+
+    def setUp(self):
+        make_vehicles(2)
+
+    def test_vehicle_list(self):
+        self.assertConstantQueries(reverse('vehicle_list'), make_vehicles)
+
+    def test_vehicle_search(self):
+        self.assertConstantQueries(reverse('vehicle_search') + '?q=driver', make_vehicles)
+
+    def test_vehicle_exports(self):
+        for name in ('vehicle_list_text', 'vehicle_list_csv'):
+            with self.subTest(name=name):
+                self.assertConstantQueries(reverse(name), make_vehicles)
+
+
+class VehicleTextReportTests(TestCase):
+    """ The text report writes every vehicle exactly once. """
+
+    def test_each_vehicle_written_once(self):
+        make_vehicles(4)
+        response = self.client.get(reverse('vehicle_list_text'))
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('Driver: '), 4)
+        for i in range(4):
+            self.assertEqual(body.count(f'Driver: driver {i}\n'), 1)
+
+
+class VehicleDetailDocumentTests(ReportRootMixin, TestCase):
+    """ The vehicle detail text prints money like the other detail documents. """
+
+    def test_money_and_null_rates(self):
+        make_vehicles(1)
+        vehicle = Vehicle.objects.get()
+        Vehicle.objects.update(daily_rate=None, misc_fees=Decimal('1234.5'))
+        response = self.client.get(reverse('vehicle_detail_txt', args=[vehicle.pk]))
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn("Daily Rate: \n", body)
+        self.assertIn("Misc Fees: $1,234.50\n", body)
+        self.assertIn("PO Total: $100.00", body)
+        self.assertTrue(response['ETag'])
+
+
+class VehicleTotalsTests(TestCase):
+    """ Vehicle totals add up po_total in the database. """
+
+    def test_totals_add_po_total(self):
+        make_vehicles(3)
+        Vehicle.objects.filter(driver="driver 2").update(po_total=Decimal('250.50'))
+        totals = Vehicle.objects.totals()
+        self.assertEqual(totals['total'], Decimal('450.50'))
+        self.assertEqual(totals['count'], 3)
+        self.assertEqual(totals['unpriced'], 0)
+
+    def test_list_total_covers_every_vehicle(self):
+        make_vehicles(3)
+        response = self.client.get(reverse('vehicle_list'))
+        self.assertEqual(response.context['total_cost'], 300)
+
+    def test_empty_total_is_zero(self):
+        self.assertEqual(Vehicle.objects.total(), 0)
+
+
+class VehicleIndexUsageTests(TestCase):
+    """ Vehicle list and lookups read through their indexes. """
+
+    def setUp(self):
+        make_vehicles(20)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def test_vehicle_list(self):
+        self.assertIn('vehicle_start_idx', Vehicle.objects.for_list().order_by('start_rental_date').explain())
+
+    def test_plate_lookup(self):
+        self.assertIn('vehicle_plate_idx', Vehicle.objects.filter(plate_number='ABC123').explain())
+
+
+class DriverAutocompleteTests(TestCase):
+
+    def test_each_driver_once(self):
+        autocomplete.SOURCES['drivers'].index = None
+        make_vehicles(3)
+        Vehicle.objects.filter(driver="driver 2").update(driver="driver 1")
+        response = self.client.get(reverse('autocomplete', args=['drivers']), {'q': 'driv'})
+        self.assertEqual(response.json()['results'], [{'id': 'driver 0', 'text': 'driver 0'},
+                                                      {'id': 'driver 1', 'text': 'driver 1'}])
+
+
+class RentalDaysTests(TestCase):
+    """ Stored rental length kept in step with the dates. """
+
+    def test_save_sets_rental_days(self):
+        make_vehicles(3)
+        self.assertEqual(sorted(Vehicle.objects.values_list('rental_days', flat=True)), [0, 1, 2])
+
+    def test_date_strings_count(self):
+        make_vehicles(1)
+        vehicle = Vehicle.objects.get()
+        vehicle.pk = None
+        vehicle.start_rental_date, vehicle.end_rental_date = '2025-01-01', '2025-01-11'
+        vehicle.save()
+        self.assertEqual(Vehicle.objects.get(pk=vehicle.pk).rental_days, 10)
+        vehicle.pk = None
+        vehicle.end_rental_date = datetime.datetime(2025, 1, 4, 12, 0)
+        Vehicle.objects.bulk_create([vehicle])
+        self.assertEqual(sorted(Vehicle.objects.values_list('rental_days', flat=True)), [0, 3, 10])
+
+    def test_update_works_rental_days_out_again(self):
+        make_vehicles(2)
+        start = datetime.date(2030, 1, 1)
+        Vehicle.objects.update(start_rental_date=start, end_rental_date=start + datetime.timedelta(days=40))
+        self.assertEqual(set(Vehicle.objects.values_list('rental_days', flat=True)), {40})
+        Vehicle.objects.update(end_rental_date=start + datetime.timedelta(days=10))
+        self.assertEqual(set(Vehicle.objects.values_list('rental_days', flat=True)), {10})
+
+    def test_bulk_update_and_save_with_update_fields(self):
+        make_vehicles(1)
+        vehicle = Vehicle.objects.get()
+        vehicle.end_rental_date = vehicle.start_rental_date + datetime.timedelta(days=5)
+        Vehicle.objects.bulk_update([vehicle], ['end_rental_date'])
+        self.assertEqual(Vehicle.objects.get().rental_days, 5)
+        vehicle.end_rental_date = vehicle.start_rental_date + datetime.timedelta(days=8)
+        vehicle.save(update_fields=['end_rental_date'])
+        self.assertEqual(Vehicle.objects.get().rental_days, 8)
+
+    def test_long_rentals_and_rate_tiers_filter_in_sql(self):
+        make_vehicles(3)
+        Vehicle.objects.filter(driver="driver 1").update(end_rental_date=datetime.date.today() + datetime.timedelta(days=45))
+        Vehicle.objects.filter(driver="driver 2").update(end_rental_date=datetime.date.today() + datetime.timedelta(days=14))
+        self.assertEqual([vehicle.driver for vehicle in Vehicle.objects.long_rentals()], ["driver 1"])
+        tiers = dict(Vehicle.objects.with_rate_tier().values_list('driver', 'rate_tier'))
+        self.assertEqual(tiers, {"driver 0": 'daily', "driver 1": 'monthly', "driver 2": 'weekly'})
+
+
+class FleetRateTests(TestCase):
+    """ Vectorized fleet pricing against the per-vehicle rate methods. """
+
+    def setUp(self):
+        make_vehicles(5)
+        start = datetime.date(2030, 1, 1)
+        # 0 (unpriced), 5 (daily), 20 (weekly), 75 (monthly) and 3 days with no tax
+        for i, days in enumerate([0, 5, 20, 75, 3]):
+            Vehicle.objects.filter(driver=f"driver {i}").update(
+                start_rental_date=start, end_rental_date=start + datetime.timedelta(days=days),
+                daily_rate=125, weekly_rate=600, monthly_rate=2100,
+                tax=None if i == 4 else Decimal('0.10'), misc_fees=Decimal('12.34'))
+
+    def test_engine_reconciles_with_methods(self):
+        self.assertEqual(reconcile(Vehicle.objects.all()), [])
+
+    def test_summary_by_tier(self):
+        totals = summary(fleet_rates(Vehicle.objects.all()))
+        self.assertEqual(totals['unpriced'], 1)
+        # 625 + 1200 + 4200 + 375 in rates, 10% tax on all but the last
+        self.assertEqual(totals['rates'], Decimal('6400.00'))
+        self.assertEqual(totals['tax'], Decimal('602.50'))
+        self.assertEqual(totals['total'], Decimal('6400.00') + Decimal('602.50') + 5 * Decimal('12.34'))
+        self.assertEqual(totals['tiers']['monthly'], {'count': 1, 'total': Decimal('4632.34')})
+
+    def test_command_checks_and_prints_totals(self):
+        out = io.StringIO()
+        call_command('fleet_rates', '--check', stdout=out)
+        self.assertIn("Total: $7,064.20", out.getvalue())
+        self.assertIn("Reconciled", out.getvalue())
+
+
+class DoubleBookingTests(TestCase):
+    """ The same plate cannot be out twice on the same dates. """
+
+    def setUp(self):
+        make_vehicles(2)
+        self.first, self.second = Vehicle.objects.order_by('pk')
+        Vehicle.objects.filter(pk=self.second.pk).update(start_rental_date=datetime.date(2030, 1, 1),
+                                                           end_rental_date=datetime.date(2030, 1, 31))
+
+    def post(self, vehicle, **changes):
+        data = {key: '' if value is None else value
+                for key, value in model_to_dict(vehicle, fields=VehicleUpdateView.fields).items()}
+        # the model default is not one of the rental_status choices
+        data.update({'rental_status': 'on_rental', **changes})
+        return self.client.post(reverse('vehicle_update', args=[vehicle.pk]), data)
+
+    def test_overlapping_plate_is_refused(self):
+        response = self.post(self.first, plate_number="PLATE1", start_rental_date='2030-01-20',
+                             end_rental_date='2030-02-05')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Already booked Jan 01, 2030 to Jan 31, 2030")
+        self.assertEqual(Vehicle.objects.get(pk=self.first.pk).plate_number, "PLATE0")
+
+    def test_back_to_back_plate_is_saved(self):
+        response = self.post(self.first, plate_number="PLATE1", start_rental_date='2030-02-01',
+                             end_rental_date='2030-02-05')
+        self.assertEqual(response.status_code, 302)
+        # editing a booking does not conflict with itself
+        response = self.post(self.second, end_rental_date='2030-01-25')
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,7 @@
+"""
+Vehicle line of the production timeline in rentals/timeline.py.
+Imported from VehiclesConfig.ready().
+"""
+from rentals.timeline import Series, register
+
+register(Series('vehicles', 'Vehicles', 'vehicles.Vehicle', 'start_rental_date', 'end_rental_date', 'po_total'))
@@ -15,5 +15,4 @@ urlpatterns = [
     path('vehicle_search/', views.VehicleSearchView.as_view(), name='vehicle_search'),
     path('vehicle_detail_txt/<int:pk>/', views.vehicle_detail_txt, name='vehicle_detail_txt'),
     path('vehicle_detail_pdf/<int:pk>/', views.vehicle_detail_pdf, name='vehicle_detail_pdf'),
-    path('vehicle_detail_pdf/<int:pk>/', views.vehicle_detail_pdf, name='vehicle_detail_pdf'),
     ]